@@ -0,0 +1,179 @@
+"""
+Server-sent events for generation and payment status.
+
+Replaces polling of /generate/jobs/{job_id} and /payments/charge-status/{tx_ref}:
+the client opens one long-lived stream and receives every state change pushed
+by the workers and the payment reconciler (see app.utils.events).
+
+Browsers first get a stream ticket (POST /ticket, with their bearer token)
+and open the stream with `?ticket=`: access tokens never go in URLs.
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Security
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from app.auth import get_current_user, verify_supabase_token
+from app.config import settings
+from app.supabase_client import get_supabase_client
+from app.utils.events import get_event_broker, issue_stream_ticket, redeem_stream_ticket
+from app.utils.job_status import read_job_status
+
+router = APIRouter()
+
+# Comment line sent when idle, keeps proxies from closing the connection
+HEARTBEAT_INTERVAL = 15
+
+# Local transaction status -> status reported to the client (as in /payments/charge-status)
+PAYMENT_STATUSES = {
+    "completed": "successful",
+    "failed": "failed",
+    "expired": "failed",
+    "pending": "pending",
+}
+
+
+def _sse(data: dict) -> str:
+    return f"data: {json.dumps(data, default=str)}\n\n"
+
+
+def _initial_job_event(client, user_id: str, job_id: str) -> dict:
+    cached = read_job_status(job_id)
+    if cached is not None:
+        if cached["user_id"] != user_id:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return {
+            "type": "job",
+            "job_id": cached["id"],
+            "project_id": cached["project_id"],
+            "status": cached["status"],
+            "video_status": cached["video_status"],
+            "error_message": cached["error_message"],
+        }
+
+    jobs = client.select(
+        "generation_jobs",
+        columns="id,project_id,status,error_message,metadata",
+        filters={"id": job_id, "user_id": user_id},
+        limit=1
+    )
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = jobs[0]
+    return {
+        "type": "job",
+        "job_id": job["id"],
+        "project_id": job["project_id"],
+        "status": job["status"],
+        "video_status": (job.get("metadata") or {}).get("video_status"),
+        "error_message": job.get("error_message"),
+    }
+
+
+def _initial_payment_event(client, user_id: str, tx_ref: str) -> dict:
+    transactions = client.select(
+        "transactions",
+        columns="id,user_id,status",
+        filters={"id": tx_ref},
+        limit=1
+    )
+    if not transactions:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    if transactions[0]["user_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return {
+        "type": "payment",
+        "tx_ref": tx_ref,
+        "status": PAYMENT_STATUSES.get(transactions[0]["status"], "pending"),
+    }
+
+
+@router.post("/ticket")
+async def create_stream_ticket(
+    job_id: Optional[str] = None,
+    tx_ref: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Issue a ticket opening the event stream (for `job_id` / `tx_ref` if given).
+
+    EventSource cannot set headers: pass the ticket as `?ticket=` instead of
+    the access token. It expires after `expires_in` seconds.
+    """
+    return {"ticket": issue_stream_ticket(user_id, job_id, tx_ref), "expires_in": settings.STREAM_TICKET_TTL}
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    job_id: Optional[str] = None,
+    tx_ref: Optional[str] = None,
+    ticket: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(HTTPBearer(auto_error=False))
+):
+    """
+    Stream the current user's job and payment events (text/event-stream).
+
+    Pass `job_id` or `tx_ref` to follow a single resource; its current state
+    is sent first. Authenticate with a bearer token, or a `ticket` from
+    POST /ticket issued for the same job_id / tx_ref.
+    """
+    if credentials:
+        user_id = (await verify_supabase_token(credentials.credentials))["sub"]
+    elif ticket:
+        user_id = redeem_stream_ticket(ticket, job_id, tx_ref)
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    # Subscribe before reading the current state: an event published in
+    # between is then queued instead of lost
+    broker = get_event_broker()
+    queue = broker.subscribe(user_id)
+    await broker.wait_ready()
+    try:
+        initial = None
+        if job_id:
+            initial = _initial_job_event(get_supabase_client(), user_id, job_id)
+        elif tx_ref:
+            initial = _initial_payment_event(get_supabase_client(), user_id, tx_ref)
+    except BaseException:
+        broker.unsubscribe(user_id, queue)
+        raise
+
+    def wanted(message: str) -> bool:
+        if not (job_id or tx_ref):
+            return True
+        event = json.loads(message)
+        if job_id:
+            return event.get("job_id") == job_id
+        return event.get("tx_ref") == tx_ref
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if initial:
+                yield _sse(initial)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if wanted(message):
+                    yield f"data: {message}\n\n"
+        finally:
+            broker.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
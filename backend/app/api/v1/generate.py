@@ -4,7 +4,6 @@ Generation API routes - Migrated to Supabase REST API.
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from rq import Queue
-from redis import Redis, ConnectionPool
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 import logging
@@ -13,21 +12,23 @@ import asyncio
 from functools import partial
 
 from app.supabase_client import get_supabase_client
+from app.redis_client import get_redis
 from app.auth import get_current_user
 import re
 from app.schemas import GenerateRequest, JobStatusResponse, GenerateLyricsRequest, LyricsResponse, SuccessResponse
 from app.utils.credits import reserve_credits_supabase, debit_credits_supabase
-from app.config import settings
 from app.providers.suno import get_suno_provider
+from app.styles import get_registry_version
+from app.utils.job_status import TERMINAL_STATUSES, read_job_status, write_job_status
+from app.utils.share_cache import invalidate_share_payload
 
 logger = logging.getLogger(__name__)
 
 limiter = Limiter(key_func=get_remote_address)
 router = APIRouter()
 
-# Initialize Redis with connection pool and RQ
-redis_pool = ConnectionPool.from_url(settings.REDIS_URL, max_connections=20)
-redis_conn = Redis(connection_pool=redis_pool)
+# RQ queue on the shared Redis connection pool
+redis_conn = get_redis()
 job_queue = Queue("music_generation", connection=redis_conn)
 
 
@@ -171,15 +172,24 @@ async def start_generation(
             "user_id": user_id,
             "status": "queued",
             "credits_cost": credits_cost,
-            "metadata": {"style_id": project.get("style_id"), "language": project.get("language")}
+            "metadata": {
+                "style_id": project.get("style_id"),
+                "language": project.get("language"),
+                "style_registry_version": get_registry_version()
+            }
         })
+        write_job_status(job, status="queued", stage="queued")
         
         # Update project status
         client.update(
             "projects",
             {"status": "generating"},
-            {"id": body.project_id}
+            {"id": body.project_id},
+            returning="minimal"
         )
+        if project.get("status") == "completed":
+            # No longer shareable until this generation completes
+            invalidate_share_payload(body.project_id)
         
         # Queue job for async processing
         job_queue.enqueue(
@@ -209,7 +219,15 @@ async def get_job_status(
     Get generation job status.
 
     Returns current status, progress, and error information if applicable.
+    Reads the status record the worker keeps in Redis; Supabase only when
+    there is none (expired, or the job was changed outside the worker).
     """
+    job = read_job_status(job_id)
+    if job is not None:
+        if job["user_id"] != user_id:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
     client = get_supabase_client()
 
     jobs = client.select(
@@ -227,6 +245,18 @@ async def get_job_status(
     if isinstance(metadata, dict):
         job["video_status"] = metadata.get("video_status")
 
+    # Finished jobs no longer change: cache them for the next polls. In-flight
+    # ones are left to the worker, which may be writing a newer status.
+    if job.get("status") in TERMINAL_STATUSES:
+        write_job_status(
+            job,
+            status=job["status"],
+            stage="done" if job["status"] == "completed" else "failed",
+            video_status=job.get("video_status"),
+            error_message=job.get("error_message"),
+            completed_at=job.get("completed_at")
+        )
+
     return job
 
 
@@ -293,7 +323,7 @@ async def generate_video_clip(
         if match:
             provider_audio_id = match.group(1)
             # Save it for future use
-            client.update("audio_files", {"provider_audio_id": provider_audio_id}, {"id": first_af["id"]})
+            client.update("audio_files", {"provider_audio_id": provider_audio_id}, {"id": first_af["id"]}, returning="minimal")
 
     if not provider_audio_id:
         raise HTTPException(status_code=400, detail="Cannot determine Suno audio ID for this track")
@@ -0,0 +1,156 @@
+"""
+Audio streaming proxy - no authentication required (like /share).
+
+Serves audio files from the local disk cache (app.utils.media_cache) with
+HTTP Range support, so playback and seeking don't depend on the provider's
+CDN latency or URL lifetime. Cached files are served without a database
+query; a miss looks up the origin URL and streams while the cache fills.
+
+Also serves the precomputed waveform peaks of a clip (app.utils.waveform).
+"""
+
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.supabase_client import get_supabase_client
+from app.utils.catalog_cache import CatalogEntry, catalog_response
+from app.utils.media_cache import MediaFetchError, get_media_cache, is_valid_id, parse_range
+from app.utils.waveform import RESOLUTIONS, decode_peaks
+
+limiter = Limiter(key_func=get_remote_address)
+router = APIRouter()
+
+# An audio file id always points to the same bytes
+MEDIA_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+
+# Peaks of a clip never change once computed
+PEAKS_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _origin_url(audio_file_id: str) -> Optional[str]:
+    client = get_supabase_client()
+    rows = client.select(
+        "audio_files",
+        columns="file_url,stream_url",
+        filters={"id": audio_file_id},
+        limit=1
+    )
+    if not rows:
+        return None
+    return rows[0].get("file_url") or rows[0].get("stream_url")
+
+
+def _media_response(
+    body: AsyncIterator[bytes],
+    content_type: str,
+    size: Optional[int],
+    byte_range: Optional[tuple]
+) -> StreamingResponse:
+    headers: Dict[str, str] = {"Accept-Ranges": "bytes", "Cache-Control": MEDIA_CACHE_CONTROL}
+    status_code = 200
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+    elif size is not None:
+        headers["Content-Length"] = str(size)
+    return StreamingResponse(body, status_code=status_code, media_type=content_type, headers=headers)
+
+
+def _range_or_416(request: Request, size: int) -> Optional[tuple]:
+    try:
+        return parse_range(request.headers.get("range"), size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"}
+        )
+
+
+@router.get("/{audio_file_id}/peaks")
+@limiter.limit("120/minute")
+async def get_waveform_peaks(request: Request, audio_file_id: str, resolution: int = 1024) -> Response:
+    """
+    Waveform peaks of a clip at `resolution` buckets.
+
+    Body: `resolution` x (min, max) signed bytes. The track duration in seconds
+    is in the X-Duration header. 404 until the analysis worker has run.
+    """
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {list(RESOLUTIONS)}")
+    if not is_valid_id(audio_file_id):
+        raise HTTPException(status_code=404, detail="Waveform not found")
+
+    client = get_supabase_client()
+    rows = client.select(
+        "audio_files",
+        columns="waveform_peaks",
+        filters={"id": audio_file_id},
+        limit=1
+    )
+    if not rows or not rows[0].get("waveform_peaks"):
+        raise HTTPException(status_code=404, detail="Waveform not found")
+
+    # bytea comes back as a "\\x..." hex string
+    levels, duration = decode_peaks(bytes.fromhex(rows[0]["waveform_peaks"][2:]))
+    if resolution not in levels:
+        raise HTTPException(status_code=404, detail="Waveform not found")
+
+    response = catalog_response(
+        request, CatalogEntry(levels[resolution].tobytes()), PEAKS_CACHE_CONTROL, "application/octet-stream"
+    )
+    response.headers["X-Duration"] = f"{duration:.3f}"
+    return response
+
+
+@router.get("/{audio_file_id}")
+@limiter.limit("300/minute")
+async def stream_audio(request: Request, audio_file_id: str) -> Response:
+    """
+    Stream an audio file, honouring a single `Range: bytes=` request.
+
+    Players issue several range requests per track (metadata, seeking), hence
+    the higher rate limit.
+    """
+    if not is_valid_id(audio_file_id):
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    cache = get_media_cache()
+
+    cached = cache.get(audio_file_id)
+    if cached is None:
+        download = cache.in_progress(audio_file_id)
+        if download is None:
+            origin_url = _origin_url(audio_file_id)
+            if not origin_url:
+                raise HTTPException(status_code=404, detail="Audio file not found")
+            download = cache.download(audio_file_id, origin_url)
+        await download.headers_ready.wait()
+        if download.error is not None:
+            raise HTTPException(status_code=502, detail="Audio origin unavailable")
+
+        if download.size is not None:
+            byte_range = _range_or_416(request, download.size)
+            start, end = byte_range if byte_range is not None else (0, None)
+            return _media_response(
+                cache.read_download(download, start, end), download.content_type, download.size, byte_range
+            )
+        if not request.headers.get("range"):
+            # Origin sent no length: stream as it arrives, without Content-Length
+            return _media_response(cache.read_download(download, 0, None), download.content_type, None, None)
+        # Ranges need the size: wait for the download to finish
+        try:
+            await download.wait_done()
+        except MediaFetchError:
+            raise HTTPException(status_code=502, detail="Audio origin unavailable")
+        cached = cache.get(audio_file_id)
+        if cached is None:
+            raise HTTPException(status_code=502, detail="Audio origin unavailable")
+
+    byte_range = _range_or_416(request, cached.size)
+    start, end = byte_range if byte_range is not None else (0, cached.size - 1)
+    return _media_response(cache.read_file(cached, start, end), cached.content_type, cached.size, byte_range)
@@ -76,19 +76,19 @@ async def subscribe_notification(
     if jobs[0]["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="Not your job")
 
-    # Upsert: delete existing preference for this job, then insert
-    try:
-        client.delete("notification_preferences", filters={"job_id": body.job_id})
-    except Exception:
-        pass
-
-    client.insert("notification_preferences", {
-        "job_id": body.job_id,
-        "user_id": user_id,
-        "channel": channel,
-        "destination": body.destination,
-        "notified": False,
-    })
+    # Single round trip: replace any existing preference for this job (unique on job_id)
+    client.upsert(
+        "notification_preferences",
+        {
+            "job_id": body.job_id,
+            "user_id": user_id,
+            "channel": channel,
+            "destination": body.destination,
+            "notified": False,
+        },
+        on_conflict="job_id",
+        returning="minimal"
+    )
 
     msg = "Notifications push activées" if channel == "push" else "Notification email activée"
     return {"success": True, "message": msg}
@@ -5,14 +5,18 @@ Payments API routes using Supabase SDK directly.
 from fastapi import APIRouter, Depends, HTTPException, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from pydantic import TypeAdapter
 from typing import List
-from datetime import datetime, timezone
+import json
 import logging
 import uuid
 
 from app.supabase_client import get_supabase_client
 from app.auth import get_current_user_claims
 from app.services.flutterwave import FlutterwaveService
+from app.utils.credits import complete_purchase_supabase
+from app.utils.webhook_queue import enqueue_webhook
+from app.utils.catalog_cache import catalog_cache, catalog_response
 from app.config import settings, SUPPORTED_COUNTRIES
 from app.schemas import (
     InitiatePaymentRequest,
@@ -31,57 +35,22 @@ router = APIRouter()
 flutterwave_service = FlutterwaveService()
 supabase = get_supabase_client()
 
+COUNTRIES_CACHE_CONTROL = "public, max-age=3600"
+PACKAGES_CACHE_CONTROL = "public, max-age=60"
+_packages_adapter = TypeAdapter(List[CreditPackageResponse])
+
 
 def _complete_transaction_and_credit(tx_ref: str, payment_id: str) -> bool:
     """
     Atomically mark a transaction as completed and add credits.
-    Uses status=pending filter to prevent double-credit race condition.
-    Uses Supabase RPC for atomic credit increment (no read-then-write race).
+    See complete_purchase_supabase (shared with the payment reconciler).
 
     Returns True if credits were added, False if already processed.
     """
-    # Atomic update: only update if status is still "pending"
-    updated = supabase.update(
-        "transactions",
-        {"status": "completed", "payment_id": str(payment_id)},
-        {"id": tx_ref, "status": "pending"}
-    )
-
-    if not updated:
-        logger.info("Transaction %s already completed, skipping credit update", tx_ref)
-        return False
+    return complete_purchase_supabase(supabase, tx_ref, payment_id)
 
-    transaction = updated[0]
-
-    # Atomic credit increment via Supabase RPC (no read-then-write race)
-    try:
-        supabase.rpc("add_credits_atomic", {
-            "p_user_id": transaction["user_id"],
-            "p_credits": transaction["amount"],
-            "p_money": float(transaction["price"] or 0)
-        })
-    except Exception as e:
-        logger.error("RPC add_credits_atomic failed for %s, falling back: %s", tx_ref, e)
-        # Fallback to direct update if RPC not deployed yet
-        profiles = supabase.select("profiles", filters={"id": transaction["user_id"]}, limit=1)
-        if profiles:
-            profile = profiles[0]
-            supabase.update(
-                "profiles",
-                {
-                    "credits": profile["credits"] + transaction["amount"],
-                    "total_spent_money": float(profile["total_spent_money"]) + float(transaction["price"] or 0)
-                },
-                {"id": transaction["user_id"]}
-            )
 
-    logger.info("Credits added for transaction %s", tx_ref)
-    return True
-
-
-@router.get("/countries", response_model=CountriesListResponse)
-async def list_countries():
-    """List supported countries with their payment options."""
+def _serialize_countries() -> bytes:
     countries = [
         CountryInfo(
             code=code,
@@ -93,22 +62,37 @@ async def list_countries():
         )
         for code, config in SUPPORTED_COUNTRIES.items()
     ]
-    return CountriesListResponse(countries=countries)
+    return CountriesListResponse(countries=countries).model_dump_json().encode()
+
+
+def _serialize_packages() -> bytes:
+    packages = supabase.select(
+        table="credit_packages",
+        filters={"is_active": True},
+        order="price"
+    )
+    return _packages_adapter.dump_json(_packages_adapter.validate_python(packages))
+
+
+@router.get("/countries", response_model=CountriesListResponse)
+async def list_countries(request: Request):
+    """List supported countries with their payment options."""
+    entry = catalog_cache.get("countries", _serialize_countries)
+    return catalog_response(request, entry, COUNTRIES_CACHE_CONTROL)
 
 
 @router.get("/packages", response_model=List[CreditPackageResponse])
-async def list_packages():
-    """List available active credit packages from Supabase."""
+async def list_packages(request: Request):
+    """
+    List available active credit packages from Supabase.
+    Re-read at most every PACKAGES_CACHE_TTL seconds; the ETag changes only when the packages do.
+    """
     try:
-        packages = supabase.select(
-            table="credit_packages",
-            filters={"is_active": True},
-            order="price"
-        )
-        return packages
+        entry = catalog_cache.get("packages", _serialize_packages, ttl=settings.PACKAGES_CACHE_TTL)
     except Exception as e:
         logger.error("Error fetching packages: %s", e)
         return []
+    return catalog_response(request, entry, PACKAGES_CACHE_CONTROL)
 
 
 @router.post("/initiate", response_model=InitiatePaymentResponse)
@@ -171,7 +155,7 @@ async def initiate_payment(
     }
 
     try:
-        supabase.insert("transactions", transaction_data)
+        supabase.insert("transactions", transaction_data, returning="minimal")
     except Exception as e:
         logger.error("Failed to create transaction: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create transaction")
@@ -206,7 +190,8 @@ async def initiate_payment(
                     supabase.update(
                         "transactions",
                         {"metadata": updated_metadata},
-                        {"id": tx_ref}
+                        {"id": tx_ref},
+                        returning="minimal"
                     )
                 except Exception as e:
                     logger.warning("Failed to update flw_ref: %s", e)
@@ -246,7 +231,7 @@ async def initiate_payment(
         logger.error("Failed to initiate payment for tx %s: %s", tx_ref, e)
         # Rollback transaction
         try:
-            supabase.delete("transactions", filters={"id": tx_ref})
+            supabase.delete("transactions", filters={"id": tx_ref}, returning="minimal")
         except Exception:
             pass
         raise HTTPException(status_code=500, detail="Payment initiation failed")
@@ -261,101 +246,54 @@ async def get_charge_status(
     Check the status of a Mobile Money charge.
     Used for polling during Mobile Money payment flow.
     Requires authentication to prevent unauthorized status checks.
+
+    Reads local state only: the payment reconciler (app.workers.payment_worker)
+    checks pending transactions with Flutterwave, completes and expires them.
     """
     user_id = user.get("id") or user.get("sub")
 
-    try:
-        # First check our local transaction
-        transactions = supabase.select("transactions", filters={"id": tx_ref})
-        if not transactions:
-            raise HTTPException(status_code=404, detail="Transaction not found")
-
-        transaction = transactions[0]
-
-        # Verify ownership
-        if transaction["user_id"] != user_id:
-            raise HTTPException(status_code=403, detail="Access denied")
-
-        # If already completed locally, return success
-        if transaction["status"] == "completed":
-            return ChargeStatusResponse(
-                status="successful",
-                message="Payment completed",
-                tx_ref=tx_ref
-            )
-
-        # If already marked as expired/failed locally
-        if transaction["status"] in ("expired", "failed"):
-            return ChargeStatusResponse(
-                status="failed",
-                message="Transaction expired or failed",
-                tx_ref=tx_ref
-            )
-
-        # Check transaction age — expire after 5 minutes of pending
-        created_at = transaction.get("created_at")
-        if created_at:
-            try:
-                if isinstance(created_at, str):
-                    created_dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                else:
-                    created_dt = created_at
-                age_seconds = (datetime.now(timezone.utc) - created_dt).total_seconds()
-                if age_seconds > 300:  # 5 minutes
-                    # Check one last time with Flutterwave before expiring
-                    metadata = transaction.get("metadata", {})
-                    flw_ref = metadata.get("flw_ref") if isinstance(metadata, dict) else None
-                    final_check = await flutterwave_service.get_charge_status(tx_ref, flw_ref)
-
-                    if final_check["status"] == "successful":
-                        _complete_transaction_and_credit(tx_ref, str(final_check.get("flw_id", "")))
-                        return ChargeStatusResponse(
-                            status="successful",
-                            message="Payment completed",
-                            tx_ref=tx_ref
-                        )
-
-                    # Mark as expired
-                    supabase.update("transactions", {"status": "expired"}, {"id": tx_ref, "status": "pending"})
-                    return ChargeStatusResponse(
-                        status="failed",
-                        message="Transaction expiree. Si vous avez paye, contactez le support.",
-                        tx_ref=tx_ref
-                    )
-            except Exception as e:
-                logger.warning("Age check error for %s: %s", tx_ref, e)
-
-        # Get flw_ref from metadata if available
-        metadata = transaction.get("metadata", {})
-        flw_ref = metadata.get("flw_ref") if isinstance(metadata, dict) else None
+    transactions = supabase.select(
+        "transactions",
+        columns="id,user_id,status",
+        filters={"id": tx_ref},
+        limit=1
+    )
+    if not transactions:
+        raise HTTPException(status_code=404, detail="Transaction not found")
 
-        # Check with Flutterwave
-        result = await flutterwave_service.get_charge_status(tx_ref, flw_ref)
+    transaction = transactions[0]
 
-        # If successful, atomically update transaction and credits
-        if result["status"] == "successful":
-            _complete_transaction_and_credit(tx_ref, str(result.get("flw_id", "")))
+    # Verify ownership
+    if transaction["user_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Access denied")
 
-        # If Flutterwave says failed, mark locally too
-        if result["status"] == "failed":
-            supabase.update("transactions", {"status": "failed"}, {"id": tx_ref, "status": "pending"})
+    if transaction["status"] == "completed":
+        return ChargeStatusResponse(
+            status="successful",
+            message="Payment completed",
+            tx_ref=tx_ref
+        )
 
+    if transaction["status"] == "expired":
         return ChargeStatusResponse(
-            status=result["status"],
-            message=result["message"],
+            status="failed",
+            message="Transaction expiree. Si vous avez paye, contactez le support.",
             tx_ref=tx_ref
         )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Charge status check failed for %s: %s", tx_ref, e)
+    if transaction["status"] == "failed":
         return ChargeStatusResponse(
-            status="pending",
-            message="Unable to check status",
+            status="failed",
+            message="Transaction expired or failed",
             tx_ref=tx_ref
         )
 
+    return ChargeStatusResponse(
+        status="pending",
+        message="Payment is being processed",
+        tx_ref=tx_ref
+    )
+
 
 @router.get("/verify/{tx_ref}", response_model=SuccessResponse)
 @limiter.limit("20/minute")
@@ -411,32 +349,30 @@ async def verify_payment(
 
 
 @router.post("/webhook")
-@limiter.limit("30/minute")
 async def payment_webhook(request: Request):
     """
     Handle Flutterwave webhooks.
+
+    Only verifies the signature and queues the event (app.utils.webhook_queue);
+    the scheduler applies it. Not rate limited: Flutterwave retries in bursts
+    and duplicates are dropped at enqueue time.
     """
     signature = request.headers.get("verif-hash")
 
     if not flutterwave_service.verify_webhook_signature(signature):
         raise HTTPException(status_code=401, detail="Invalid signature")
 
-    data = await request.json()
-    event_type = data.get("event")
-
-    if event_type == "charge.completed" and data["data"]["status"] == "successful":
-        tx_ref = data["data"]["tx_ref"]
-        flw_id = data["data"]["id"]
-
-        try:
-            transactions = supabase.select("transactions", filters={"id": tx_ref})
-            if not transactions:
-                return SuccessResponse(message="Transaction not found but acknowledged")
-
-            _complete_transaction_and_credit(tx_ref, str(flw_id))
+    body = await request.body()
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
 
-        except Exception as e:
-            logger.error("Webhook processing error for %s: %s", tx_ref, e)
-            raise HTTPException(status_code=500, detail="Processing error")
+    try:
+        queued = enqueue_webhook(body, event)
+    except Exception as e:
+        # Non-2xx makes Flutterwave deliver again later
+        logger.error("Failed to queue webhook %s: %s", event.get("event"), e)
+        raise HTTPException(status_code=503, detail="Webhook queue unavailable")
 
-    return SuccessResponse(message="Webhook processed")
+    return SuccessResponse(message="Webhook queued" if queued else "Duplicate webhook ignored")
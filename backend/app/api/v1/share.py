@@ -7,11 +7,15 @@ from fastapi import APIRouter, HTTPException, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from app.supabase_client import get_supabase_client
+from app.utils.catalog_cache import catalog_response
+from app.utils.share_cache import get_share_entry
 
 limiter = Limiter(key_func=get_remote_address)
 router = APIRouter()
 
+# Payloads change when a video is added: short CDN lifetime, served stale while refreshing
+SHARE_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=600"
+
 
 @router.get("/{project_id}")
 @limiter.limit("60/minute")
@@ -20,44 +24,11 @@ async def get_shared_project(request: Request, project_id: str):
     Get a shared project's public data.
     No authentication required - anyone with the link can view.
     Only returns completed projects. Does NOT expose user_id, lyrics, or context.
-    """
-    client = get_supabase_client()
 
-    # Fetch project (no auth check - public endpoint)
-    projects = client.select(
-        "projects",
-        filters={"id": project_id},
-        limit=1
-    )
-
-    if not projects or projects[0].get("status") != "completed":
+    Served from the payload materialized when the track completed
+    (app.utils.share_cache), with an ETag for CDNs and conditional requests.
+    """
+    entry = await get_share_entry(project_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Track not found")
-
-    project = projects[0]
-
-    # Fetch audio files
-    audio_files = client.select(
-        "audio_files",
-        filters={"project_id": project_id},
-        order="version_number.asc"
-    )
-
-    return {
-        "id": project["id"],
-        "title": project["title"],
-        "style_id": project.get("style_id"),
-        "custom_style_text": project.get("custom_style_text"),
-        "created_at": project["created_at"],
-        "audio_files": [
-            {
-                "id": af["id"],
-                "file_url": af.get("file_url"),
-                "stream_url": af.get("stream_url"),
-                "image_url": af.get("image_url"),
-                "video_url": af.get("video_url"),
-                "duration": af.get("duration"),
-                "version_number": af["version_number"],
-            }
-            for af in audio_files
-        ],
-    }
+    return catalog_response(request, entry, SHARE_CACHE_CONTROL)
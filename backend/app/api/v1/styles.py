@@ -2,22 +2,55 @@
 Styles API routes - Musical style registry access.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import TypeAdapter
 from typing import List
 
 from app.styles import (
     get_all_styles,
     get_styles_by_category,
     get_style_by_id,
-    get_categories
+    get_categories,
+    match_styles,
+    on_registry_reload
 )
-from app.schemas import StyleResponse, StylesListResponse, CategoryResponse
+from app.schemas import StyleResponse, StylesListResponse, CategoryResponse, StyleMatch, StyleMatchResponse
+from app.utils.catalog_cache import catalog_cache, catalog_response
 
 router = APIRouter()
 
+# Clients revalidate with the ETag after this, so a registry reload reaches them within 5 minutes
+STYLES_CACHE_CONTROL = "public, max-age=300"
+
+_styles_adapter = TypeAdapter(List[StyleResponse])
+
+
+def _serialize_styles() -> bytes:
+    return StylesListResponse(styles=get_all_styles(), categories=get_categories()).model_dump_json().encode()
+
+
+def _serialize_style(style_id: str):
+    style = get_style_by_id(style_id)
+    if not style:
+        return None
+    return StyleResponse.model_validate(style).model_dump_json().encode()
+
+
+def _serialize_category(category: str) -> bytes:
+    return _styles_adapter.dump_json(_styles_adapter.validate_python(get_styles_by_category(category)))
+
+
+def _refresh_catalog(index) -> None:
+    """Drop cached style responses after a registry reload and rebuild the full list right away."""
+    catalog_cache.invalidate("style")
+    catalog_cache.get("styles", _serialize_styles)
+
+
+on_registry_reload(_refresh_catalog)
+
 
 @router.get("/", response_model=StylesListResponse)
-async def list_styles():
+async def list_styles(request: Request):
     """
     Get all available musical styles grouped by category.
     
@@ -26,18 +59,32 @@ async def list_styles():
         - categories: List of categories
     
     No authentication required - public endpoint.
+    Served pre-serialized with an ETag (304 on If-None-Match).
     """
-    styles = get_all_styles()
-    categories = get_categories()
-    
-    return StylesListResponse(
-        styles=styles,
-        categories=categories
-    )
+    entry = catalog_cache.get("styles", _serialize_styles)
+    return catalog_response(request, entry, STYLES_CACHE_CONTROL)
+
+
+@router.get("/match", response_model=StyleMatchResponse)
+async def match_style(
+    q: str = Query(..., min_length=2, max_length=500),
+    limit: int = Query(3, ge=1, le=10)
+):
+    """
+    Suggest the preset styles closest to a free-form style description
+    (e.g. the text of a "custom" style).
+
+    Returns:
+        Up to `limit` styles with their similarity score, best first
+    """
+    return StyleMatchResponse(matches=[
+        StyleMatch(id=style["id"], label=style["label"], category=style["category"], score=round(score, 4))
+        for style, score in match_styles(q, limit)
+    ])
 
 
 @router.get("/{style_id}", response_model=StyleResponse)
-async def get_style(style_id: str):
+async def get_style(request: Request, style_id: str):
     """
     Get details for a specific style.
     
@@ -47,17 +94,17 @@ async def get_style(style_id: str):
     Returns:
         Style details including instrumentation, BPM range, etc.
     """
-    style = get_style_by_id(style_id)
-    
-    if not style:
-        from fastapi import HTTPException
+    normalized_id = style_id.replace("-", "_")
+    entry = catalog_cache.get(f"style:{normalized_id}", lambda: _serialize_style(normalized_id))
+
+    if not entry:
         raise HTTPException(status_code=404, detail=f"Style '{style_id}' not found")
-    
-    return style
+
+    return catalog_response(request, entry, STYLES_CACHE_CONTROL)
 
 
 @router.get("/category/{category}", response_model=List[StyleResponse])
-async def get_styles_by_cat(category: str):
+async def get_styles_by_cat(request: Request, category: str):
     """
     Get styles filtered by category.
     
@@ -65,7 +112,12 @@ async def get_styles_by_cat(category: str):
         category: UNIVERSAL, URBAN, or AFRICAN
     
     Returns:
-        List of styles in that category
+        List of styles in that category (empty for an unknown category)
     """
-    styles = get_styles_by_category(category.upper())
-    return styles
+    category = category.upper()
+    # Checked before the cache: keys must not come from arbitrary user input
+    if category not in {c["id"] for c in get_categories()}:
+        return []
+
+    entry = catalog_cache.get(f"style_category:{category}", lambda: _serialize_category(category))
+    return catalog_response(request, entry, STYLES_CACHE_CONTROL)
@@ -2,14 +2,102 @@
 Users API routes.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.supabase_client import get_supabase_client
 from app.auth import get_current_user
-from app.schemas import ProfileResponse, WalletResponse
+from app.schemas import ProfileResponse, WalletResponse, WalletHistoryResponse, LedgerBalanceResponse
 
 router = APIRouter()
 
+HISTORY_COLUMNS = ["id", "type", "amount", "price", "status", "metadata", "created_at"]
+TRANSACTION_TYPES = ("purchase", "reserve", "debit", "refund")
+EXPORT_PAGE_SIZE = 1000
+
+
+def _encode_cursor(row: Dict) -> str:
+    """Opaque keyset cursor pointing after `row` (created_at, id)."""
+    raw = f"{row['created_at']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode and validate a cursor (values end up in a PostgREST filter)."""
+    try:
+        created_at, tx_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        uuid.UUID(tx_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, tx_id
+
+
+def _history_page(
+    client,
+    user_id: str,
+    limit: int,
+    after: Optional[Tuple[str, str]] = None,
+    tx_type: Optional[str] = None
+) -> List[Dict]:
+    """One page of the user's ledger, newest first (keyset on created_at, id)."""
+    filters = {"user_id": user_id}
+    if tx_type:
+        filters["type"] = tx_type
+    if after:
+        created_at, tx_id = after
+        filters["or"] = f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{tx_id}"))'
+
+    return client.select(
+        "transactions",
+        columns=",".join(HISTORY_COLUMNS),
+        filters=filters,
+        order="created_at.desc,id.desc",
+        limit=limit
+    )
+
+
+def _iter_history(client, user_id: str, tx_type: Optional[str]) -> Iterator[List[Dict]]:
+    """Walk the whole ledger page by page without holding it in memory."""
+    after = None
+    while True:
+        rows = _history_page(client, user_id, EXPORT_PAGE_SIZE, after, tx_type)
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return
+        after = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def _ndjson_chunks(pages: Iterator[List[Dict]]) -> Iterator[str]:
+    for rows in pages:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+
+
+def _csv_chunks(pages: Iterator[List[Dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HISTORY_COLUMNS)
+    for rows in pages:
+        for row in rows:
+            writer.writerow([
+                json.dumps(row.get(col)) if col == "metadata" else row.get(col)
+                for col in HISTORY_COLUMNS
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
 
 @router.get("/profile", response_model=ProfileResponse)
 async def get_user_profile(
@@ -48,3 +136,78 @@ async def get_user_wallet(
         total_spent=user["total_credits_spent"],
         total_spent_money=str(user["total_spent_money"])
     )
+
+
+@router.get("/wallet/history", response_model=WalletHistoryResponse)
+async def get_wallet_history(
+    user_id: str = Depends(get_current_user),
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    tx_type: Optional[str] = Query(None, alias="type")
+):
+    """
+    List wallet transactions, newest first.
+
+    Cursor-paginated: pass `next_cursor` from the previous page as `cursor`.
+    """
+    limit = max(1, min(limit, 100))
+    if tx_type and tx_type not in TRANSACTION_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid transaction type")
+    after = _decode_cursor(cursor) if cursor else None
+
+    client = get_supabase_client()
+    rows = _history_page(client, user_id, limit + 1, after, tx_type)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1])
+
+    return WalletHistoryResponse(items=rows, next_cursor=next_cursor)
+
+
+@router.get("/wallet/history/export")
+async def export_wallet_history(
+    user_id: str = Depends(get_current_user),
+    export_format: str = Query("ndjson", alias="format"),
+    tx_type: Optional[str] = Query(None, alias="type")
+):
+    """
+    Stream the full wallet history as NDJSON or CSV.
+
+    Rows are fetched and written page by page, so memory stays flat
+    regardless of ledger size.
+    """
+    if export_format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format must be 'ndjson' or 'csv'")
+    if tx_type and tx_type not in TRANSACTION_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid transaction type")
+
+    pages = _iter_history(get_supabase_client(), user_id, tx_type)
+    if export_format == "csv":
+        body, media_type = _csv_chunks(pages), "text/csv"
+    else:
+        body, media_type = _ndjson_chunks(pages), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="wallet-history.{export_format}"'}
+    )
+
+
+@router.get("/wallet/ledger-balance", response_model=LedgerBalanceResponse)
+async def get_ledger_balance(
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Balance recomputed from the transactions ledger.
+
+    Uses the latest balance snapshot plus the rows created since, so it stays
+    fast as the ledger grows. Support can compare it with /wallet.
+    """
+    client = get_supabase_client()
+    # The RPC returns zero balances for any id: check the profile exists
+    if not client.select("profiles", columns="id", filters={"id": user_id}, limit=1):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return client.rpc("wallet_ledger_balance", {"p_user_id": user_id})
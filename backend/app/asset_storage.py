@@ -0,0 +1,163 @@
+"""
+Object storage for generated media (app.workers.ingest_worker).
+
+The ingestion pipeline only talks to an AssetStorage: it uploads a local file
+under a key, reads back what was stored, and builds the public URL.
+ASSET_STORAGE_BACKEND selects it:
+
+- "" (default): ingestion disabled, provider URLs are kept
+- "supabase": Supabase Storage, public bucket ASSET_BUCKET
+  (sql/migration_asset_storage.sql)
+- "local": a directory (ASSET_LOCAL_DIR), for development and tests; files
+  are served by whatever serves ASSET_LOCAL_BASE_URL
+
+Uploads stream from disk in ASSET_CHUNK_SIZE chunks, so memory use does not
+depend on file size.
+"""
+
+import hashlib
+import os
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+
+
+class StorageError(Exception):
+    """The upload failed or the stored object doesn't match what was sent."""
+
+
+async def iter_file(path: Path, chunk_size: int) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class AssetStorage(ABC):
+    """Backend interface."""
+
+    name = ""
+
+    @abstractmethod
+    async def put(self, key: str, path: Path, size: int, content_type: str) -> None:
+        """Store the file at `path` (`size` bytes) under `key`, replacing any previous object."""
+
+    @abstractmethod
+    async def stat(self, key: str) -> Tuple[int, Optional[str]]:
+        """Size of the stored object and its MD5 hex digest if the backend reports one."""
+
+    @abstractmethod
+    def public_url(self, key: str) -> str:
+        """Public URL of the object stored under `key`."""
+
+    def owns(self, url: Optional[str]) -> bool:
+        """Whether `url` already points into this storage."""
+        return bool(url) and url.startswith(self.public_url(""))
+
+
+class SupabaseStorage(AssetStorage):
+    name = "supabase"
+
+    def __init__(self, url: str, service_key: str, bucket: str, chunk_size: int = 256 * 1024,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = f"{url.rstrip('/')}/storage/v1/object"
+        self.bucket = bucket
+        self.chunk_size = chunk_size
+        self.headers = {"apikey": service_key, "Authorization": f"Bearer {service_key}"}
+        self.transport = transport
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers=self.headers, timeout=httpx.Timeout(60.0, connect=10.0), transport=self.transport
+        )
+
+    async def put(self, key: str, path: Path, size: int, content_type: str) -> None:
+        async with self._client() as client:
+            response = await client.post(
+                f"{self.base_url}/{self.bucket}/{key}",
+                content=iter_file(path, self.chunk_size),
+                headers={"Content-Type": content_type, "Content-Length": str(size), "x-upsert": "true"}
+            )
+        if response.status_code >= 400:
+            raise StorageError(f"upload of {key} failed: {response.status_code} {response.text[:200]}")
+
+    async def stat(self, key: str) -> Tuple[int, Optional[str]]:
+        async with self._client() as client:
+            response = await client.head(self.public_url(key))
+        if response.status_code >= 400:
+            raise StorageError(f"stored object {key} not readable: {response.status_code}")
+        etag = response.headers.get("etag", "").strip('"').removeprefix("W/").strip('"')
+        # S3-style ETags are the MD5 of single-part uploads ("<md5>-<parts>" otherwise)
+        md5 = etag if len(etag) == 32 and "-" not in etag else None
+        return int(response.headers.get("content-length", -1)), md5
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/public/{self.bucket}/{key}"
+
+
+class LocalStorage(AssetStorage):
+    name = "local"
+
+    def __init__(self, directory: str, base_url: str, chunk_size: int = 256 * 1024):
+        self.directory = Path(directory)
+        self.base_url = base_url.rstrip("/")
+        self.chunk_size = chunk_size
+
+    def _path(self, key: str) -> Path:
+        path = (self.directory / key).resolve()
+        if not path.is_relative_to(self.directory.resolve()):
+            raise StorageError(f"invalid key {key}")
+        return path
+
+    async def put(self, key: str, path: Path, size: int, content_type: str) -> None:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + ".part")
+        with open(path, "rb") as src, open(partial, "wb") as dst:
+            shutil.copyfileobj(src, dst, self.chunk_size)
+        os.replace(partial, target)
+
+    async def stat(self, key: str) -> Tuple[int, Optional[str]]:
+        path = self._path(key)
+        if not path.exists():
+            raise StorageError(f"stored object {key} missing")
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                md5.update(chunk)
+        return path.stat().st_size, md5.hexdigest()
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+BACKENDS = {
+    SupabaseStorage.name: lambda: SupabaseStorage(
+        settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY, settings.ASSET_BUCKET, settings.ASSET_CHUNK_SIZE
+    ),
+    LocalStorage.name: lambda: LocalStorage(
+        settings.ASSET_LOCAL_DIR, settings.ASSET_LOCAL_BASE_URL, settings.ASSET_CHUNK_SIZE
+    ),
+}
+
+_storage: Optional[AssetStorage] = None
+
+
+def get_asset_storage() -> Optional[AssetStorage]:
+    """The storage selected by ASSET_STORAGE_BACKEND, or None if ingestion is disabled."""
+    global _storage
+    if _storage is None and settings.ASSET_STORAGE_BACKEND:
+        try:
+            _storage = BACKENDS[settings.ASSET_STORAGE_BACKEND]()
+        except KeyError:
+            raise ValueError(
+                f"Unknown ASSET_STORAGE_BACKEND '{settings.ASSET_STORAGE_BACKEND}', expected one of {sorted(BACKENDS)}"
+            )
+    return _storage
@@ -2,55 +2,23 @@
 Authentication utilities for JWT token validation with Supabase.
 """
 
-import httpx
 import logging
+import random
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt, jwk
-from jose.utils import base64url_decode
 from typing import Optional
-import json
 
 from app.config import settings
+from app.jwks import get_jwks_manager
+from app.jwt_verifiers import TokenError, get_verifier
+from app.token_cache import token_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
 security = HTTPBearer()
 
-# Cache for JWKS keys
-_jwks_cache: dict = {}
-_jwks_client: httpx.Client = None
-
-def _get_jwks_client() -> httpx.Client:
-    global _jwks_client
-    if _jwks_client is None:
-        _jwks_client = httpx.Client(timeout=10.0)
-    return _jwks_client
-
-async def _get_jwks_keys() -> dict:
-    """Fetch JWKS keys from Supabase."""
-    global _jwks_cache
-    if _jwks_cache:
-        return _jwks_cache
-
-    # Extract project ref from SUPABASE_URL
-    supabase_url = settings.SUPABASE_URL
-    jwks_url = f"{supabase_url}/auth/v1/.well-known/jwks.json"
-
-    try:
-        client = _get_jwks_client()
-        response = client.get(jwks_url)
-        response.raise_for_status()
-        _jwks_cache = response.json()
-        return _jwks_cache
-    except Exception as e:
-        logger.error(f"Failed to fetch JWKS: {e}")
-        return {}
-
-
 async def verify_supabase_token(token: str) -> dict:
     """
     Verify Supabase JWT token with full signature validation.
@@ -64,78 +32,47 @@ async def verify_supabase_token(token: str) -> dict:
 
     Raises:
         HTTPException: If token is invalid or signature verification fails
+
+    Tokens verified before are served from the token cache until they expire.
     """
-    try:
-        # Debug: log token info
-        logger.info(f"[AUTH] Verifying token (first 50 chars): {token[:50]}...")
+    cached = await token_cache.get(token)
+    if cached is not None:
+        return cached
 
+    verifier = get_verifier()
+    try:
         # First, decode header to determine algorithm
-        unverified_header = jwt.get_unverified_header(token)
-        logger.info(f"[AUTH] Token header: {unverified_header}")
+        unverified_header = verifier.get_unverified_header(token)
         algorithm = unverified_header.get("alg", "HS256")
         kid = unverified_header.get("kid")
 
         if algorithm == "ES256" and kid:
             # Use JWKS for ES256 tokens
-            logger.info(f"[AUTH] Using ES256 with kid: {kid}")
-            jwks = await _get_jwks_keys()
-            logger.info(f"[AUTH] JWKS keys fetched: {len(jwks.get('keys', []))} keys")
-
-            if not jwks or "keys" not in jwks:
-                raise JWTError("Failed to fetch JWKS keys")
-
-            # Find the key matching the kid
-            key_data = None
-            for key in jwks["keys"]:
-                logger.info(f"[AUTH] Checking key kid: {key.get('kid')}")
-                if key.get("kid") == kid:
-                    key_data = key
-                    break
-
-            if not key_data:
-                raise JWTError(f"Key with kid '{kid}' not found in JWKS")
-
-            logger.info(f"[AUTH] Found matching key")
-
-            # Construct the public key from JWK
-            public_key = jwk.construct(key_data)
-
-            payload = jwt.decode(
-                token,
-                public_key,
-                algorithms=["ES256"],
-                options={
-                    "verify_signature": True,
-                    "verify_aud": False,
-                    "verify_exp": True,
-                }
-            )
+            public_key = await get_jwks_manager().get_key(kid)
+            if public_key is None:
+                raise TokenError(f"Key with kid '{kid}' not found in JWKS")
+            payload = verifier.decode(token, public_key, ["ES256"])
         else:
             # Fallback to HS256 with legacy secret
-            payload = jwt.decode(
-                token,
-                settings.JWT_SECRET,
-                algorithms=["HS256"],
-                options={
-                    "verify_signature": True,
-                    "verify_aud": False,
-                    "verify_exp": True,
-                }
-            )
+            payload = verifier.decode(token, settings.JWT_SECRET, ["HS256"])
 
         if not payload.get("sub"):
-            raise JWTError("Token missing 'sub' claim")
+            raise TokenError("Token missing 'sub' claim")
+
+        if logger.isEnabledFor(logging.DEBUG) and random.random() < settings.AUTH_LOG_SAMPLE_RATE:
+            logger.debug("[AUTH] Verified %s token (kid=%s, backend=%s)", algorithm, kid, verifier.name)
 
+        await token_cache.put(token, payload)
         return payload
 
-    except JWTError as e:
-        logger.error(f"JWT verification error: {e}")
+    except TokenError as e:
+        logger.warning("JWT verification error: %s", e)
         raise HTTPException(
             status_code=401,
             detail="Invalid or expired authentication token"
         )
     except Exception as e:
-        logger.error(f"Unexpected auth error: {e}")
+        logger.error("Unexpected auth error: %s", e)
         raise HTTPException(
             status_code=401,
             detail="Authentication error"
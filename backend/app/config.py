@@ -26,6 +26,12 @@ class Settings(BaseSettings):
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Credits hot wallet (balances in Redis, ledger written behind to Postgres)
+    CREDITS_HOT_WALLET: bool = False
+    HOT_WALLET_FLUSH_INTERVAL: int = 2  # seconds between ledger flushes
+    HOT_WALLET_RECONCILE_INTERVAL: int = 300  # seconds between Redis/profiles comparisons
+    WALLET_SNAPSHOT_INTERVAL: int = 3600  # seconds between ledger balance snapshots
     
     # SunoAPI
     SUNO_API_KEY: str
@@ -39,9 +45,51 @@ class Settings(BaseSettings):
     FLUTTERWAVE_SECRET_KEY: str
     FLUTTERWAVE_PUBLIC_KEY: str
     FLUTTERWAVE_WEBHOOK_SECRET: str
+    FLUTTERWAVE_BASE_URL: str = "https://api.flutterwave.com/v3"  # point at benchmarks/fake_flutterwave.py offline
+
+    # Payment reconciler (checks pending transactions with Flutterwave)
+    PAYMENT_RECONCILE_INTERVAL: int = 5  # seconds between reconciler passes
+    PAYMENT_RECONCILE_CONCURRENCY: int = 8  # Flutterwave lookups in flight
+    PAYMENT_RECONCILE_BATCH: int = 200  # Flutterwave checks per pass (least recently checked first)
+    MOBILE_MONEY_EXPIRE_AFTER: int = 300  # seconds before a pending Mobile Money charge expires
+    CARD_PAYMENT_EXPIRE_AFTER: int = 3600  # seconds before a pending card checkout expires
+
+    # Webhook queue (Redis stream drained by the scheduler)
+    WEBHOOK_CONSUMER_INTERVAL: int = 1  # seconds between stream reads
+    WEBHOOK_MAX_ATTEMPTS: int = 5  # deliveries before an event goes to the dead-letter stream
+
+    # Stale record sweeper (app.workers.maintenance_worker)
+    SWEEP_INTERVAL: int = 60  # seconds between sweeps
+    STALE_TRANSACTION_AFTER: int = 86400  # seconds before a pending purchase is expired unconditionally
+    STALE_JOB_AFTER: int = 1800  # seconds after processing started before a job is considered orphaned
+    SWEEP_BATCH: int = 500  # jobs failed per sweep
+
+    # Job status records written by workers (app.utils.job_status)
+    JOB_STATUS_TTL: int = 3600  # seconds a record is kept after its last transition
+
+    # Public share payloads (app.utils.share_cache)
+    SHARE_PAYLOAD_TTL: int = 604800  # seconds a published payload is kept in Redis
+    SHARE_NOT_FOUND_TTL: int = 60  # seconds a missing / not completed project is remembered
+    SHARE_LOCAL_TTL: int = 10  # seconds a payload is served from process memory
+    SHARE_CACHE_SIZE: int = 1000  # payloads kept in process memory
+
+    # Style registry hot reload (app.styles.registry)
+    STYLE_REGISTRY_RELOAD_INTERVAL: int = 10  # seconds between registry change checks (0 disables)
+    STYLE_REGISTRY_REDIS: bool = False  # load the registry published in Redis instead of registry.json
+    STYLE_MATCH_PRESET_THRESHOLD: float = 0.4  # custom styles this similar to a preset use its prompt (0 disables)
+
+    # Catalog responses (app.utils.catalog_cache)
+    PACKAGES_CACHE_TTL: int = 60  # seconds before /payments/packages re-reads credit_packages
     
     # Security
     JWT_SECRET: str
+    JWT_BACKEND: str = "jose"  # JWT verification library: "jose" or "pyjwt" (see app.jwt_verifiers)
+    AUTH_LOG_SAMPLE_RATE: float = 0.01  # share of verifications logged at DEBUG level
+    JWKS_TTL: int = 600  # seconds before Supabase signing keys are refreshed (in the background)
+    JWKS_MISS_REFETCH_INTERVAL: int = 30  # min seconds between refetches caused by an unknown kid
+    TOKEN_CACHE_SIZE: int = 10000  # verified access tokens kept in memory until they expire
+    TOKEN_CACHE_REDIS: bool = False  # also share verified tokens across API workers through Redis
+    STREAM_TICKET_TTL: int = 60  # seconds an event stream ticket can open (and reopen) its stream
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
@@ -64,6 +112,29 @@ class Settings(BaseSettings):
 
     # Storage
     UPLOAD_DIR: str = "./uploads"
+
+    # Audio proxy disk cache (app.utils.media_cache)
+    MEDIA_CACHE_DIR: str = "./media_cache"
+    MEDIA_CACHE_MAX_BYTES: int = 2 * 1024 ** 3  # evict least recently served files past this
+    MEDIA_CHUNK_SIZE: int = 256 * 1024  # bytes per origin read / response chunk
+
+    # Generated media ingestion into our storage (app.workers.ingest_worker)
+    ASSET_STORAGE_BACKEND: str = ""  # "supabase" or "local"; empty keeps provider URLs
+    ASSET_BUCKET: str = "generated-media"
+    ASSET_LOCAL_DIR: str = "./uploads/assets"
+    ASSET_LOCAL_BASE_URL: str = "http://localhost:8000/assets"
+    ASSET_CHUNK_SIZE: int = 256 * 1024  # bytes per download / upload chunk
+    ASSET_INGEST_CONCURRENCY: int = 4  # assets transferred at once per job
+    ASSET_INGEST_RETRIES: int = 3  # attempts per asset
+
+    # Waveform peaks (app.workers.analysis_worker, needs ffmpeg on the worker)
+    WAVEFORM_ENABLED: bool = True
+    WAVEFORM_SAMPLE_RATE: int = 8000  # Hz clips are decoded at before peak extraction
+    WAVEFORM_WORKERS: int = 2  # analysis processes per job (0 = all cores)
+
+    # Observability
+    SUPABASE_QUERY_BUDGET: int = 8  # Max Supabase round trips per request before warning
+    SUPABASE_N_PLUS_ONE_THRESHOLD: int = 5  # Same table/operation repeated this often = N+1
     
     @property
     def cors_origins_list(self) -> List[str]:
@@ -0,0 +1,154 @@
+"""
+Supabase JWKS manager - signing keys for ES256 access tokens.
+
+Keys are fetched asynchronously and kept as public key objects prebuilt by
+the JWT backend (app.jwt_verifiers), indexed by `kid`, so verifying a token
+is a dict lookup rather than an HTTP call or a key construction.
+
+- After JWKS_TTL seconds the keys are refreshed in the background while the
+  current ones keep being served (a rotation adds the new key before it is
+  used, so a slightly stale set is still valid).
+- A token signed with an unknown `kid` triggers one immediate refetch, at most
+  once per JWKS_MISS_REFETCH_INTERVAL seconds, so a rotation is picked up
+  without a restart and garbage kids cannot hammer Supabase.
+- A failed fetch keeps the previous keys and is not retried before
+  JWKS_RETRY_AFTER seconds.
+Concurrent fetches are coalesced into one request.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.jwt_verifiers import JWTVerifier, get_verifier
+from app.utils.metrics import increment, observe
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a failed fetch may be retried
+JWKS_RETRY_AFTER = 5.0
+
+
+class JWKSManager:
+    """Caches a JWKS endpoint as {kid: public key}."""
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float = 600.0,
+        miss_refetch_interval: float = 30.0,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        verifier: Optional[JWTVerifier] = None
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.miss_refetch_interval = miss_refetch_interval
+        self.timeout = timeout
+        self.transport = transport
+        self.verifier = verifier or get_verifier()
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at: Optional[float] = None  # monotonic time of the last successful fetch
+        self._attempted_at = float("-inf")  # monotonic time of the last fetch attempt
+        self._failed = False
+        self._inflight: Optional[asyncio.Future] = None
+        self._background: Optional[asyncio.Task] = None
+
+    async def get_key(self, kid: str) -> Optional[Any]:
+        """Public key for `kid`, or None if the JWKS does not contain it."""
+        now = time.monotonic()
+        key = self._keys.get(kid)
+
+        if key is not None:
+            if now - self._fetched_at >= self.ttl and self._can_attempt(now):
+                self._refresh_in_background()
+            return key
+
+        if self._fetched_at is None:
+            reason = "initial"
+        elif now - self._attempted_at >= self.miss_refetch_interval:
+            reason = "kid_miss"
+        else:
+            return None
+        if self._can_attempt(now):
+            await self.refresh(reason)
+        return self._keys.get(kid)
+
+    def _can_attempt(self, now: float) -> bool:
+        return not self._failed or now - self._attempted_at >= JWKS_RETRY_AFTER
+
+    def _refresh_in_background(self) -> None:
+        if self._background is None or self._background.done():
+            self._background = asyncio.create_task(self.refresh("ttl"))
+
+    async def refresh(self, reason: str = "manual") -> None:
+        """Fetch the JWKS now (joining a fetch already in progress). Never raises."""
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight
+        if inflight is not None and inflight.get_loop() is loop:
+            await asyncio.shield(inflight)
+            return
+
+        future = loop.create_future()
+        self._inflight = future
+        try:
+            await self._fetch(reason)
+        finally:
+            future.set_result(None)
+            if self._inflight is future:
+                self._inflight = None
+
+    async def _fetch(self, reason: str) -> None:
+        self._attempted_at = time.monotonic()
+        start = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+                response = await client.get(self.url)
+            response.raise_for_status()
+            keys = self._build_keys(response.json())
+        except Exception as e:
+            self._failed = True
+            increment("jwks_refresh", reason=reason, outcome="error")
+            logger.error("Failed to fetch JWKS (%s): %s", reason, e)
+            return
+        finally:
+            observe("provider_latency", time.perf_counter() - start, provider="supabase", operation="jwks")
+
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        self._failed = False
+        increment("jwks_refresh", reason=reason, outcome="ok")
+        logger.debug("JWKS refreshed (%s): %d keys", reason, len(keys))
+
+    def _build_keys(self, jwks: Dict[str, Any]) -> Dict[str, Any]:
+        keys = {}
+        for key_data in jwks.get("keys", []):
+            kid = key_data.get("kid")
+            if not kid or key_data.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[kid] = self.verifier.load_jwk(key_data)
+            except Exception as e:
+                logger.warning("Skipping JWKS key %s: %s", kid, e)
+        if not keys:
+            raise ValueError("JWKS contains no usable signing keys")
+        return keys
+
+
+_manager: Optional[JWKSManager] = None
+
+
+def get_jwks_manager() -> JWKSManager:
+    """Get or create the process-wide JWKS manager for the Supabase project."""
+    global _manager
+    if _manager is None:
+        _manager = JWKSManager(
+            f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+            ttl=settings.JWKS_TTL,
+            miss_refetch_interval=settings.JWKS_MISS_REFETCH_INTERVAL
+        )
+    return _manager
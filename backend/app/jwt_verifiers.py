@@ -0,0 +1,121 @@
+"""
+Interchangeable JWT verification backends.
+
+auth.py and the JWKS manager only talk to a JWTVerifier: it parses headers,
+builds public keys from JWKs and checks signatures. JWT_BACKEND selects it:
+
+- "jose": python-jose (default)
+- "pyjwt": PyJWT with the cryptography backend
+
+Both raise TokenError for any invalid token, so callers don't depend on a
+library's exception types. See benchmarks/bench_auth.py to compare them.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+
+class TokenError(Exception):
+    """The token is malformed, expired or its signature does not verify."""
+
+
+class JWTVerifier(ABC):
+    """Backend interface."""
+
+    name = ""
+
+    @abstractmethod
+    def get_unverified_header(self, token: str) -> Dict[str, Any]:
+        """The token's header, read without verifying anything."""
+
+    @abstractmethod
+    def load_jwk(self, key_data: Dict[str, Any]) -> Any:
+        """Build a reusable public key object from a JWK."""
+
+    @abstractmethod
+    def decode(self, token: str, key: Any, algorithms: List[str]) -> Dict[str, Any]:
+        """Verify signature and expiry (not audience) and return the claims."""
+
+
+class JoseVerifier(JWTVerifier):
+    name = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwk, jwt
+        self._error = JWTError
+        self._jwk = jwk
+        self._jwt = jwt
+
+    def get_unverified_header(self, token: str) -> Dict[str, Any]:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+    def load_jwk(self, key_data: Dict[str, Any]) -> Any:
+        return self._jwk.construct(key_data, algorithm=key_data.get("alg", "ES256"))
+
+    def decode(self, token: str, key: Any, algorithms: List[str]) -> Dict[str, Any]:
+        try:
+            return self._jwt.decode(
+                token,
+                key,
+                algorithms=algorithms,
+                options={"verify_signature": True, "verify_aud": False, "verify_exp": True}
+            )
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+
+class PyJWTVerifier(JWTVerifier):
+    name = "pyjwt"
+
+    def __init__(self):
+        import jwt  # PyJWT[crypto]
+        self._jwt = jwt
+
+    def get_unverified_header(self, token: str) -> Dict[str, Any]:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._jwt.PyJWTError as e:
+            raise TokenError(str(e)) from e
+
+    def load_jwk(self, key_data: Dict[str, Any]) -> Any:
+        return self._jwt.PyJWK(key_data, algorithm=key_data.get("alg", "ES256")).key
+
+    def decode(self, token: str, key: Any, algorithms: List[str]) -> Dict[str, Any]:
+        try:
+            return self._jwt.decode(
+                token,
+                key,
+                algorithms=algorithms,
+                options={"verify_signature": True, "verify_aud": False, "verify_exp": True}
+            )
+        except self._jwt.PyJWTError as e:
+            raise TokenError(str(e)) from e
+
+
+BACKENDS = {
+    JoseVerifier.name: JoseVerifier,
+    PyJWTVerifier.name: PyJWTVerifier,
+}
+
+_verifier: Optional[JWTVerifier] = None
+
+
+def create_verifier(name: str) -> JWTVerifier:
+    """Instantiate a backend by name (ImportError if its library is missing)."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown JWT_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+
+
+def get_verifier() -> JWTVerifier:
+    """Get or create the verifier selected by JWT_BACKEND."""
+    global _verifier
+    if _verifier is None:
+        _verifier = create_verifier(settings.JWT_BACKEND)
+    return _verifier
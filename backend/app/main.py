@@ -9,6 +9,8 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from app.config import settings
+from app.utils.db_metrics import QueryAccountingMiddleware, get_query_metrics
+from app.utils.metrics import get_metrics
 
 # Rate limiter: uses client IP for identification
 limiter = Limiter(key_func=get_remote_address, default_limits=["60/minute"])
@@ -35,6 +37,13 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type", "Accept"],
 )
 
+# Per-request Supabase round-trip accounting (see /health/db)
+app.add_middleware(
+    QueryAccountingMiddleware,
+    budget=settings.SUPABASE_QUERY_BUDGET,
+    n_plus_one_threshold=settings.SUPABASE_N_PLUS_ONE_THRESHOLD,
+)
+
 
 @app.get("/")
 async def root():
@@ -53,6 +62,25 @@ async def health_check():
     }
 
 
+@app.get("/health/db")
+async def db_health():
+    """Supabase round trips and time-in-DB per endpoint and per table."""
+    return {
+        "status": "healthy",
+        "budget": settings.SUPABASE_QUERY_BUDGET,
+        **get_query_metrics(),
+    }
+
+
+@app.get("/health/metrics")
+async def metrics_health():
+    """Provider latency histograms and cache counters (this process only)."""
+    return {
+        "status": "healthy",
+        **get_metrics(),
+    }
+
+
 @app.get("/health/queue")
 async def queue_health():
     """Queue health check - shows worker and job status."""
@@ -90,7 +118,7 @@ async def queue_health():
 # API ROUTES
 # ============================================================================
 
-from app.api.v1 import auth, users, styles, projects, generate, payments, share, notifications
+from app.api.v1 import auth, users, styles, projects, generate, payments, share, notifications, events, media
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Auth"])
@@ -101,6 +129,20 @@ app.include_router(generate.router, prefix="/api/v1/generate", tags=["Generation
 app.include_router(payments.router, prefix="/api/v1/payments", tags=["Payments"])
 app.include_router(share.router, prefix="/api/v1/share", tags=["Share"])
 app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["Notifications"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["Events"])
+app.include_router(media.router, prefix="/api/v1/media", tags=["Media"])
+
+if settings.ASSET_STORAGE_BACKEND == "local":
+    # Development stand-in for object storage (app.asset_storage.LocalStorage)
+    from pathlib import Path
+    from urllib.parse import urlparse
+    from fastapi.staticfiles import StaticFiles
+    Path(settings.ASSET_LOCAL_DIR).mkdir(parents=True, exist_ok=True)
+    app.mount(
+        urlparse(settings.ASSET_LOCAL_BASE_URL).path.rstrip("/") or "/assets",
+        StaticFiles(directory=settings.ASSET_LOCAL_DIR),
+        name="assets"
+    )
 
 
 if __name__ == "__main__":
@@ -42,6 +42,7 @@ class GenerationJob(Base):
     error_message = Column(Text, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)  # claimed by a worker
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
     def __repr__(self):
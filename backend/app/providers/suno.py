@@ -7,9 +7,9 @@ Based on real API responses as documented in implementation-plan.md.
 
 import re
 import httpx
-from typing import Dict, List
+from typing import Dict, List, Optional
 from app.config import settings
-from app.styles import build_prompt
+from app.styles import build_prompt, match_styles
 
 
 class SunoProvider:
@@ -53,6 +53,16 @@ class SunoProvider:
         # Sync client with generous timeout for slow connections
         self.client = httpx.Client(timeout=httpx.Timeout(60.0, connect=60.0))
     
+    def closest_preset(self, custom_style_text: str) -> Optional[str]:
+        """Preset style id matching a custom description above STYLE_MATCH_PRESET_THRESHOLD, or None."""
+        threshold = settings.STYLE_MATCH_PRESET_THRESHOLD
+        if threshold <= 0:
+            return None
+        matches = match_styles(custom_style_text, limit=1)
+        if matches and matches[0][1] >= threshold:
+            return matches[0][0]["id"]
+        return None
+
     def boost_style(self, content: str) -> str:
         """
         Boost a custom style description via the Suno Style/Generate API.
@@ -125,7 +135,12 @@ class SunoProvider:
                 voice_tag = "Female vocals"
 
         # Build style text
-        if base_style_id == "custom" and custom_style_text:
+        preset = self.closest_preset(custom_style_text) if base_style_id == "custom" and custom_style_text else None
+        if preset:
+            # Close enough to a preset: use its curated prompt, no boost_style round trip
+            print(f"🎨 Custom style matches preset '{preset}', using its prompt")
+            style_text = build_prompt(preset + style_id[len(base_style_id):], lyrics, language)["style_text"]
+        elif base_style_id == "custom" and custom_style_text:
             # Boost the custom style text via Suno Style API
             boosted = self.boost_style(custom_style_text)
             style_text = boosted or custom_style_text  # Fallback
@@ -0,0 +1,37 @@
+"""
+Shared Redis connection.
+
+Uses a singleton connection pool so API routes, workers and background
+tasks reuse connections instead of opening one per call. Async code in
+the API (request hot paths) uses the asyncio client instead, so a Redis
+round trip doesn't block the event loop.
+"""
+
+from typing import Optional
+
+from redis import ConnectionPool, Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.config import settings
+
+# Singleton instance
+_pool: Optional[ConnectionPool] = None
+_redis_instance: Optional[Redis] = None
+_async_redis_instance: Optional[AsyncRedis] = None
+
+
+def get_redis() -> Redis:
+    """Get or create the singleton Redis client instance."""
+    global _pool, _redis_instance
+    if _redis_instance is None:
+        _pool = ConnectionPool.from_url(settings.REDIS_URL, max_connections=20)
+        _redis_instance = Redis(connection_pool=_pool)
+    return _redis_instance
+
+
+def get_async_redis() -> AsyncRedis:
+    """Get or create the singleton asyncio Redis client (API event loop only)."""
+    global _async_redis_instance
+    if _async_redis_instance is None:
+        _async_redis_instance = AsyncRedis.from_url(settings.REDIS_URL, max_connections=20)
+    return _async_redis_instance
@@ -35,6 +35,32 @@ class WalletResponse(BaseModel):
     total_spent_money: Decimal
 
 
+class WalletTransactionResponse(BaseModel):
+    """One ledger entry in the wallet history."""
+    id: Union[str, UUID4]
+    type: str  # purchase, reserve, debit, refund
+    amount: int
+    price: Optional[Decimal] = None
+    status: str
+    metadata: Optional[dict] = None
+    created_at: datetime
+
+
+class WalletHistoryResponse(BaseModel):
+    """Page of wallet history (newest first)."""
+    items: List[WalletTransactionResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+
+class LedgerBalanceResponse(BaseModel):
+    """Balance recomputed from the transactions ledger."""
+    snapshot_as_of: Optional[datetime] = None
+    credits: int
+    credits_reserved: int
+    total_credits_spent: int
+    transaction_count: int
+
+
 # ============================================================================
 # STYLE SCHEMAS
 # ============================================================================
@@ -64,6 +90,19 @@ class StylesListResponse(BaseModel):
     categories: List[CategoryResponse]
 
 
+class StyleMatch(BaseModel):
+    """Preset style close to a style description."""
+    id: str
+    label: str
+    category: str
+    score: float  # cosine similarity, 0..1
+
+
+class StyleMatchResponse(BaseModel):
+    """Closest preset styles for a free-form description."""
+    matches: List[StyleMatch]
+
+
 # ============================================================================
 # PROJECT SCHEMAS
 # ============================================================================
@@ -143,6 +182,8 @@ class JobStatusResponse(BaseModel):
     credits_cost: int
     error_message: Optional[str]
     video_status: Optional[str] = None
+    stage: Optional[str] = None  # finer progress step, see app.utils.job_status
+    audio_file_ids: List[str] = []
     created_at: datetime
     completed_at: Optional[datetime]
 
@@ -1,12 +1,100 @@
+import asyncio
 import httpx
 import hmac
 import logging
+import time
 import uuid
-from typing import Dict, Optional, Any
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 from app.config import settings, SUPPORTED_COUNTRIES
+from app.utils.metrics import increment, observe
 
 logger = logging.getLogger(__name__)
 
+# Lookup results that can still change are reused for this long
+PENDING_RESULT_TTL = 5.0
+# Terminal results are kept until evicted (least recently used first)
+MAX_CACHED_RESULTS = 10000
+TERMINAL_STATUSES = ("successful", "failed", "cancelled")
+
+
+class LookupCache:
+    """
+    Coalesces and caches transaction lookups.
+
+    Concurrent lookups of the same key share one provider request. Terminal
+    results (successful/failed) never change and are cached until evicted;
+    pending results for PENDING_RESULT_TTL seconds. Errors are not cached.
+    """
+
+    def __init__(self, pending_ttl: float = PENDING_RESULT_TTL, max_entries: int = MAX_CACHED_RESULTS):
+        self.pending_ttl = pending_ttl
+        self.max_entries = max_entries
+        # key -> (expires_at or None for terminal, result)
+        self._results: "OrderedDict[Tuple[str, str], Tuple[Optional[float], Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def _cached(self, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        expires_at, result = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._results[key]
+            return False, None
+        self._results.move_to_end(key)
+        return True, result
+
+    def _store(self, key: Tuple[str, str], result: Any, terminal: bool) -> None:
+        expires_at = None if terminal else time.monotonic() + self.pending_ttl
+        self._results[key] = (expires_at, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def get(
+        self,
+        key: Tuple[str, str],
+        fetch: Callable[[], Awaitable[Any]],
+        is_terminal: Callable[[Any], bool]
+    ) -> Any:
+        operation = key[0]
+        hit, result = self._cached(key)
+        if hit:
+            increment("provider_lookup_cache", provider="flutterwave", operation=operation, outcome="hit")
+            return result
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            increment("provider_lookup_cache", provider="flutterwave", operation=operation, outcome="coalesced")
+            return await asyncio.shield(inflight)
+
+        increment("provider_lookup_cache", provider="flutterwave", operation=operation, outcome="miss")
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            self._store(key, result, is_terminal(result))
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+
+# Shared by every FlutterwaveService in the process
+_lookup_cache = LookupCache()
+
+
+def _is_terminal(result: Dict[str, Any]) -> bool:
+    return str((result or {}).get("status", "")).lower() in TERMINAL_STATUSES
+
 class FlutterwaveService:
     """
     Service to handle Flutterwave payment integrations.
@@ -14,9 +102,8 @@ class FlutterwaveService:
     Uses a persistent AsyncClient to reuse connections and avoid TLS handshake overhead.
     """
 
-    BASE_URL = "https://api.flutterwave.com/v3"
-
     def __init__(self):
+        self.base_url = settings.FLUTTERWAVE_BASE_URL.rstrip("/")
         self.secret_key = settings.FLUTTERWAVE_SECRET_KEY
         self.public_key = settings.FLUTTERWAVE_PUBLIC_KEY
         self.webhook_secret = settings.FLUTTERWAVE_WEBHOOK_SECRET
@@ -35,6 +122,18 @@ class FlutterwaveService:
             )
         return self._client
 
+    async def _request(self, operation: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, recording its latency in the provider histograms."""
+        client = await self._get_client()
+        start = time.perf_counter()
+        try:
+            return await client.request(method, url, **kwargs)
+        except Exception:
+            increment("provider_errors", provider="flutterwave", operation=operation)
+            raise
+        finally:
+            observe("provider_latency", time.perf_counter() - start, provider="flutterwave", operation=operation)
+
     async def initiate_payment(
         self, 
         user_email: str, 
@@ -68,11 +167,7 @@ class FlutterwaveService:
             "meta": meta or {}
         }
 
-        client = await self._get_client()
-        response = await client.post(
-            f"{self.BASE_URL}/payments",
-            json=payload,
-        )
+        response = await self._request("initiate_payment", "POST", f"{self.base_url}/payments", json=payload)
         data = response.json()
             
         if data.get("status") != "success":
@@ -86,17 +181,23 @@ class FlutterwaveService:
     async def verify_transaction(self, transaction_id: str = None, tx_ref: str = None) -> Dict[str, Any]:
         """
         Verify a transaction by ID (Flutterwave ID) or TX_REF.
+        Concurrent and repeated calls for the same transaction are served by the lookup cache.
         """
         if not transaction_id and not tx_ref:
              raise ValueError("Must provide either transaction_id or tx_ref")
 
-        client = await self._get_client()
+        key = ("verify_transaction", str(transaction_id or tx_ref))
+        return await _lookup_cache.get(
+            key, lambda: self._verify_transaction(transaction_id, tx_ref), _is_terminal
+        )
+
+    async def _verify_transaction(self, transaction_id: str = None, tx_ref: str = None) -> Dict[str, Any]:
         if transaction_id and str(transaction_id) != str(tx_ref):
-            endpoint = f"{self.BASE_URL}/transactions/{transaction_id}/verify"
+            endpoint = f"{self.base_url}/transactions/{transaction_id}/verify"
         else:
-            endpoint = f"{self.BASE_URL}/transactions?tx_ref={tx_ref or transaction_id}"
+            endpoint = f"{self.base_url}/transactions?tx_ref={tx_ref or transaction_id}"
 
-        response = await client.get(endpoint)
+        response = await self._request("verify_transaction", "GET", endpoint)
         data = response.json()
 
         if data.get("status") != "success":
@@ -124,6 +225,12 @@ class FlutterwaveService:
 
         return hmac.compare_digest(signature, self.webhook_secret)
 
+    async def aclose(self) -> None:
+        """Close the HTTP client (needed when the service lives in a short-lived event loop)."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
     async def charge_mobile_money(
         self,
         phone_number: str,
@@ -186,10 +293,8 @@ class FlutterwaveService:
 
         logger.debug("Mobile Money charge initiated for type: %s", flw_type)
 
-        client = await self._get_client()
-        response = await client.post(
-            f"{self.BASE_URL}/charges?type={flw_type}",
-            json=payload,
+        response = await self._request(
+            "charge_mobile_money", "POST", f"{self.base_url}/charges?type={flw_type}", json=payload
         )
         data = response.json()
 
@@ -249,12 +354,18 @@ class FlutterwaveService:
 
         Returns:
             Dict with status (pending, successful, failed)
+
+        Concurrent and repeated calls for the same tx_ref are served by the lookup cache.
         """
-        client = await self._get_client()
+        return await _lookup_cache.get(
+            ("charge_status", tx_ref), lambda: self._get_charge_status(tx_ref, flw_ref), _is_terminal
+        )
+
+    async def _get_charge_status(self, tx_ref: str, flw_ref: str = None) -> Dict[str, Any]:
         # Method 1: Try verify by reference endpoint first
         try:
-            verify_response = await client.get(
-                f"{self.BASE_URL}/transactions/verify_by_reference?tx_ref={tx_ref}",
+            verify_response = await self._request(
+                "verify_by_reference", "GET", f"{self.base_url}/transactions/verify_by_reference?tx_ref={tx_ref}"
             )
             verify_data = verify_response.json()
             logger.debug("Verify by reference status: %s", verify_data.get("status"))
@@ -268,7 +379,8 @@ class FlutterwaveService:
                         "status": "successful",
                         "message": "Payment successful",
                         "tx_ref": tx_ref,
-                        "flw_id": tx.get("id")
+                        "flw_id": tx.get("id"),
+                        "amount": tx.get("amount")
                     }
                 elif tx_status in ["failed", "cancelled"]:
                     return {
@@ -282,8 +394,8 @@ class FlutterwaveService:
 
         # Method 2: Try transactions list endpoint
         try:
-            response = await client.get(
-                f"{self.BASE_URL}/transactions?tx_ref={tx_ref}",
+            response = await self._request(
+                "list_transactions", "GET", f"{self.base_url}/transactions?tx_ref={tx_ref}"
             )
             data = response.json()
             logger.debug("Transactions list status: %s", data.get("status"))
@@ -299,7 +411,8 @@ class FlutterwaveService:
                             "status": "successful",
                             "message": "Payment successful",
                             "tx_ref": tx_ref,
-                            "flw_id": tx.get("id")
+                            "flw_id": tx.get("id"),
+                            "amount": tx.get("amount")
                         }
                     elif tx_status in ["failed", "cancelled"]:
                         return {
@@ -5,7 +5,11 @@ from app.styles.registry import (
     get_styles_by_category,
     get_style_by_id,
     get_categories,
-    build_prompt
+    build_prompt,
+    match_styles,
+    get_registry_version,
+    on_registry_reload,
+    reload_registry
 )
 
 __all__ = [
@@ -13,5 +17,9 @@ __all__ = [
     "get_styles_by_category",
     "get_style_by_id",
     "get_categories",
-    "build_prompt"
+    "build_prompt",
+    "match_styles",
+    "get_registry_version",
+    "on_registry_reload",
+    "reload_registry"
 ]
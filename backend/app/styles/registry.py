@@ -3,85 +3,467 @@ Style Registry - Music style definitions and access functions.
 
 This is a key differentiator of MusicApp:
 African music styles (Makossa, Bikutsi, Amapiano, etc.) as first-class citizens.
+
+The registry is loaded into a RegistryIndex: styles by id (and hyphenated
+alias), by category, and the Suno style text of every (style, voice
+preference, language) combination, so lookups and build_prompt are dict reads.
+It also holds the TF-IDF matrix used to match free-form style descriptions
+to presets (app.styles.similarity).
+
+The registry is hot-reloadable. A watcher thread checks registry.json (or,
+with STYLE_REGISTRY_REDIS, the version published in Redis by
+scripts/publish_style_registry.py) every STYLE_REGISTRY_RELOAD_INTERVAL
+seconds. New data is validated and indexed in that thread, then swapped in
+with a single assignment, so requests never wait for or see a half-built
+registry. Invalid data is logged and the current registry kept. Each index
+carries a version (hash of the registry JSON) that jobs record in their
+metadata.
+
+scripts/build_registry.py pickles a built index to registry.pickle at build
+time. Loading reuses it when its version matches the registry JSON (skipping
+the JSON parse, validation and index build), so a fresh API process or
+forked RQ job horse has the registry ready in well under a millisecond. The
+artifact also records a hash of the code that computes what it stores
+(compose_style_text and app.styles.similarity): an artifact built by other
+code is stale too. A missing, stale or unreadable artifact falls back to the
+JSON.
+
+Settings, Redis and metrics are imported where they are used, not at module level:
+compiling (scripts/build_registry.py) runs at image build time, without the
+environment Settings requires.
 """
 
+import hashlib
+import inspect
 import json
+import logging
+import pickle
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.styles import similarity
+from app.styles.similarity import StyleMatcher
+
+logger = logging.getLogger(__name__)
 
-# Load registry on module import
 _REGISTRY_PATH = Path(__file__).parent / "registry.json"
-_REGISTRY_DATA = None
+_ARTIFACT_PATH = Path(__file__).parent / "registry.pickle"
+# Bump when RegistryIndex's attributes change, so old artifacts are ignored
+ARTIFACT_FORMAT = 1
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+_WATCHER: Optional[threading.Thread] = None
+_CODE_VERSION: Optional[str] = None
+_RELOAD_LISTENERS: List[Callable[["RegistryIndex"], None]] = []
+
+# Redis keys of a published registry (raw JSON and its version)
+REDIS_DATA_KEY = "styles:registry:data"
+REDIS_VERSION_KEY = "styles:registry:version"
+
+REQUIRED_STYLE_FIELDS = ("id", "label", "category", "prompt_template_en")
+
+# Voice preference suffix ("rap:male") -> (voice tag, tags to add to the negatives)
+VOICE_PREFERENCES: Mapping[str, Tuple[str, Tuple[str, ...]]] = MappingProxyType({
+    "male": ("Male vocals", ("Female vocals", "Woman")),
+    "female": ("Female vocals", ("Male vocals", "Man")),
+})
+
+# Tags dropped from a style's instrumentation / negative tags when they conflict with the voice
+_CONFLICTING_INSTRUMENTS = {
+    "male": ("female vocals", "woman"),
+    "female": ("male vocals", "man", "rap vocals"),
+}
+_CONFLICTING_NEGATIVES = {
+    "male": ("male vocals", "man"),
+    "female": ("female vocals", "woman", "singing"),
+}
+
+
+def compose_style_text(style: Dict, voice: Optional[str], language: str) -> str:
+    """
+    Build the Suno style text for a style.
+
+    Format: "[voice tag], description, instruments, energy, bpm, no <negative>, ..."
+    `voice` is "male", "female" or None.
+    """
+    voice_tag, negative_voice_tags = VOICE_PREFERENCES.get(voice, (None, ()))
+
+    # Prefer boosted prompt (enriched via Suno Style API), fallback to original
+    style_description = (
+        style.get(f"boosted_prompt_{language}")
+        or style.get(f"prompt_template_{language}")
+        or style["prompt_template_en"]
+    )
+
+    prompt_parts = []
+    # Suno listens to tags anywhere, but the voice next to the genre helps
+    if voice_tag:
+        prompt_parts.append(voice_tag)
+    prompt_parts.append(style_description)
+
+    # Explicit instrumentation, without tags that contradict the requested voice
+    instruments = style.get("instrumentation") or []
+    if voice_tag:
+        instruments = [i for i in instruments if i.lower() not in _CONFLICTING_INSTRUMENTS[voice]]
+    if instruments:
+        prompt_parts.append(", ".join(instruments))
+
+    # Energy and BPM hints, as strict tags
+    bpm_range = style.get("bpm_range")
+    if bpm_range:
+        prompt_parts.append(f"{style.get('energy', 'medium')} energy")
+        prompt_parts.append(f"{bpm_range[0]}-{bpm_range[1]} bpm")
+
+    # Negative tags ("no ..." is good for Suno style strictness); wanting a
+    # voice removes it from the style's negatives
+    negative_items = list(style.get("negative_tags", []))
+    if voice_tag:
+        negative_items = [t for t in negative_items if t.lower() not in _CONFLICTING_NEGATIVES[voice]]
+    negative_items.extend(negative_voice_tags)
+    if negative_items:
+        prompt_parts.append(", ".join(f"no {tag}" for tag in negative_items))
+
+    return ", ".join(prompt_parts)
+
+
+def registry_version(raw: bytes) -> str:
+    """Version of a registry: hash of its JSON bytes."""
+    return hashlib.sha256(raw).hexdigest()[:12]
+
+
+def code_version() -> str:
+    """Hash of the sources that shape a built index (style texts and the matcher)."""
+    global _CODE_VERSION
+    if _CODE_VERSION is None:
+        digest = hashlib.sha256(inspect.getsource(compose_style_text).encode())
+        digest.update(Path(similarity.__file__).read_bytes())
+        _CODE_VERSION = digest.hexdigest()[:12]
+    return _CODE_VERSION
+
+
+def validate_registry(data: Dict) -> None:
+    """Raise ValueError if `data` is not a usable registry."""
+    if not isinstance(data, dict):
+        raise ValueError("registry must be a JSON object")
+    styles, categories = data.get("styles"), data.get("categories")
+    if not isinstance(styles, list) or not styles:
+        raise ValueError("registry has no styles")
+    if not isinstance(categories, list) or not categories:
+        raise ValueError("registry has no categories")
+
+    category_ids = {c.get("id") for c in categories}
+    seen = set()
+    for position, style in enumerate(styles):
+        missing = [f for f in REQUIRED_STYLE_FIELDS if not style.get(f)]
+        if missing:
+            raise ValueError(f"style #{position} is missing {', '.join(missing)}")
+        if style["id"] in seen:
+            raise ValueError(f"duplicate style id '{style['id']}'")
+        seen.add(style["id"])
+        if style["category"] not in category_ids:
+            raise ValueError(f"style '{style['id']}' has unknown category '{style['category']}'")
+        bpm_range = style.get("bpm_range")
+        if bpm_range is not None and (
+            not isinstance(bpm_range, list) or len(bpm_range) != 2
+            or not all(isinstance(b, (int, float)) for b in bpm_range)
+        ):
+            raise ValueError(f"style '{style['id']}' has an invalid bpm_range")
+        for field in ("instrumentation", "negative_tags"):
+            if not isinstance(style.get(field, []), list):
+                raise ValueError(f"style '{style['id']}' has an invalid {field}")
+
+
+class RegistryIndex:
+    """Immutable lookup tables built from the registry JSON."""
+
+    def __init__(self, data: Dict, version: str = ""):
+        self.data = data
+        self.version = version
+        self.styles: List[Dict] = data["styles"]
+        self.categories: List[Dict] = data["categories"]
+
+        by_id = {}
+        by_category: Dict[str, List[Dict]] = {}
+        for style in self.styles:
+            by_id[style["id"]] = style
+            by_category.setdefault(style["category"], []).append(style)
+        aliases = dict(by_id)
+        for style_id, style in by_id.items():
+            aliases.setdefault(style_id.replace("_", "-"), style)
+        self.by_id: Mapping[str, Dict] = MappingProxyType(by_id)
+        self.aliases: Mapping[str, Dict] = MappingProxyType(aliases)
+        self.by_category: Mapping[str, Tuple[Dict, ...]] = MappingProxyType(
+            {category: tuple(styles) for category, styles in by_category.items()}
+        )
+
+        self.languages = tuple(sorted({"fr", "en"} | {
+            key.rsplit("_", 1)[1] for style in self.styles for key in style
+            if key.startswith(("prompt_template_", "boosted_prompt_"))
+        }))
+        # (style id, voice, language) -> style text
+        self.style_texts: Mapping[Tuple[str, Optional[str], str], str] = MappingProxyType({
+            (style["id"], voice, language): compose_style_text(style, voice, language)
+            for style in self.styles
+            for voice in (None, *VOICE_PREFERENCES)
+            for language in self.languages
+        })
+        # id -> Suno style params
+        self.style_params: Mapping[str, Tuple[Tuple[str, object], ...]] = MappingProxyType({
+            style["id"]: (
+                ("bpm_range", style.get("bpm_range")),
+                ("energy", style.get("energy")),
+                ("style_weight", style.get("style_weight", 0.7)),
+            )
+            for style in self.styles
+        })
+
+        self.matcher = StyleMatcher(self.styles)
+
+    # Read-only mappings don't pickle: the artifact stores them as dicts
+    _READ_ONLY = ("by_id", "aliases", "by_category", "style_texts", "style_params")
+
+    def __getstate__(self) -> Dict:
+        return {
+            key: dict(value) if isinstance(value, MappingProxyType) else value
+            for key, value in self.__dict__.items()
+        }
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update({
+            key: MappingProxyType(value) if key in self._READ_ONLY else value
+            for key, value in state.items()
+        })
+
+    def find(self, style_id: str) -> Optional[Dict]:
+        style = self.aliases.get(style_id)
+        if style is None:
+            style = self.by_id.get(style_id.replace("-", "_"))
+        return style
+
+    def style_text(self, style: Dict, voice: Optional[str], language: str) -> str:
+        text = self.style_texts.get((style["id"], voice, language))
+        if text is None:
+            # Language not in the registry: composed with the English fallback
+            text = compose_style_text(style, voice, language)
+        return text
+
+
+def _read_source() -> Tuple[bytes, str]:
+    """Raw registry JSON and where it came from (Redis if published there, else the file)."""
+    from app.config import settings
+    from app.redis_client import get_redis
+
+    if settings.STYLE_REGISTRY_REDIS:
+        try:
+            raw = get_redis().get(REDIS_DATA_KEY)
+            if raw:
+                return raw, "redis"
+        except Exception as e:
+            logger.warning("Could not read the style registry from Redis, using the file: %s", e)
+    return _REGISTRY_PATH.read_bytes(), "file"
+
 
+def compile_registry(raw: bytes, path: Path = _ARTIFACT_PATH) -> RegistryIndex:
+    """Validate and index registry JSON, and save the index as a pickle artifact."""
+    index = _build_index(raw, use_artifact=False)
+    with open(path, "wb") as f:
+        pickle.dump(
+            {"format": ARTIFACT_FORMAT, "code": code_version(), "version": index.version, "index": index},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL
+        )
+    return index
 
-def _load_registry() -> Dict:
-    """Load registry from JSON file."""
-    global _REGISTRY_DATA
-    if _REGISTRY_DATA is None:
-        with open(_REGISTRY_PATH, "r", encoding="utf-8") as f:
-            _REGISTRY_DATA = json.load(f)
-    return _REGISTRY_DATA
+
+def _load_artifact(version: str) -> Optional[RegistryIndex]:
+    """The compiled index for this registry version, or None if missing or stale."""
+    try:
+        with open(_ARTIFACT_PATH, "rb") as f:
+            artifact = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable style registry artifact: %s", e)
+        return None
+    if (artifact.get("format") != ARTIFACT_FORMAT or artifact.get("code") != code_version()
+            or artifact.get("version") != version):
+        logger.info("Style registry artifact is stale, loading registry JSON")
+        return None
+    return artifact["index"]
+
+
+def _build_index(raw: bytes, use_artifact: bool = True) -> RegistryIndex:
+    version = registry_version(raw)
+    if use_artifact:
+        index = _load_artifact(version)
+        if index is not None:
+            return index
+    data = json.loads(raw)
+    validate_registry(data)
+    return RegistryIndex(data, version)
+
+
+def _load_index() -> RegistryIndex:
+    """The current registry index (loaded on first use, which also starts the watcher)."""
+    index = _INDEX
+    if index is not None:
+        return index
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            raw, source = _read_source()
+            _install(_build_index(raw), source, notify=False)
+        _start_watcher()
+    return _INDEX
+
+
+def _install(index: RegistryIndex, source: str, notify: bool = True) -> None:
+    global _INDEX
+    previous = _INDEX
+    _INDEX = index
+    if previous is None or not notify:
+        logger.info("Style registry %s loaded from %s (%d styles)", index.version, source, len(index.styles))
+        return
+    logger.info("Style registry reloaded from %s: %s -> %s", source, previous.version, index.version)
+    for listener in list(_RELOAD_LISTENERS):
+        try:
+            listener(index)
+        except Exception as e:
+            logger.warning("Style registry reload listener failed: %s", e)
+
+
+def on_registry_reload(listener: Callable[[RegistryIndex], None]) -> None:
+    """Call `listener(new_index)` after each reload (from the watcher thread)."""
+    _RELOAD_LISTENERS.append(listener)
+
+
+def reload_registry() -> bool:
+    """
+    Load the registry from its source and swap it in if its version changed.
+    Returns True if a new registry was installed. Invalid data is logged and ignored.
+    """
+    from app.config import settings
+    from app.redis_client import get_redis
+    from app.utils.metrics import increment
+
+    current = _INDEX
+    try:
+        if settings.STYLE_REGISTRY_REDIS and current is not None:
+            # Cheap version check before transferring the whole registry
+            published = get_redis().get(REDIS_VERSION_KEY)
+            if published and published.decode() == current.version:
+                return False
+        raw, source = _read_source()
+        if current is not None and registry_version(raw) == current.version:
+            return False
+        index = _build_index(raw)
+    except Exception as e:
+        increment("style_registry_reload", outcome="invalid")
+        logger.error("Style registry not reloaded: %s", e)
+        return False
+
+    with _INDEX_LOCK:
+        _install(index, source)
+    increment("style_registry_reload", outcome="ok")
+    return True
+
+
+def _watch(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        reload_registry()
+
+
+def _start_watcher() -> None:
+    from app.config import settings
+
+    global _WATCHER
+    interval = settings.STYLE_REGISTRY_RELOAD_INTERVAL
+    if interval <= 0 or (_WATCHER is not None and _WATCHER.is_alive()):
+        return
+    _WATCHER = threading.Thread(target=_watch, args=(interval,), name="style-registry-watcher", daemon=True)
+    _WATCHER.start()
+
+
+def publish_registry(raw: bytes) -> str:
+    """Validate registry JSON and publish it to Redis for STYLE_REGISTRY_REDIS processes. Returns its version."""
+    from app.redis_client import get_redis
+
+    validate_registry(json.loads(raw))
+    version = registry_version(raw)
+    pipe = get_redis().pipeline()
+    pipe.set(REDIS_DATA_KEY, raw)
+    pipe.set(REDIS_VERSION_KEY, version)
+    pipe.execute()
+    return version
+
+
+def get_registry_version() -> str:
+    """Version of the registry currently served."""
+    return _load_index().version
 
 
 def get_all_styles() -> List[Dict]:
     """Get all available styles."""
-    registry = _load_registry()
-    return registry["styles"]
+    return _load_index().styles
 
 
 def get_styles_by_category(category: str) -> List[Dict]:
     """
     Get styles filtered by category.
-    
+
     Args:
         category: UNIVERSAL, URBAN, or AFRICAN
-    
+
     Returns:
         List of style dicts
     """
-    all_styles = get_all_styles()
-    return [s for s in all_styles if s["category"] == category]
+    return list(_load_index().by_category.get(category, ()))
 
 
 def get_style_by_id(style_id: str) -> Optional[Dict]:
     """
     Get a specific style by ID.
-    
+
     Args:
         style_id: Style identifier (e.g., "makossa", "amapiano", "coupe-decale")
-    
+
     Returns:
         Style dict or None if not found
-    
+
     Note:
         Automatically normalizes hyphens to underscores (e.g., "coupe-decale" -> "coupe_decale")
     """
-    # Normalize: convert hyphens to underscores for consistent matching
-    normalized_id = style_id.replace("-", "_")
-    
-    all_styles = get_all_styles()
-    for style in all_styles:
-        if style["id"] == normalized_id:
-            return style
-    return None
+    return _load_index().find(style_id)
 
 
 def get_categories() -> List[Dict]:
     """Get all categories."""
-    registry = _load_registry()
-    return registry["categories"]
+    return _load_index().categories
+
+
+def match_styles(text: str, limit: int = 3) -> List[Tuple[Dict, float]]:
+    """
+    Preset styles closest to a free-form style description.
+
+    Returns:
+        (style dict, cosine similarity in [0, 1]) pairs, best first
+    """
+    index = _load_index()
+    return [(index.by_id[style_id], score) for style_id, score in index.matcher.match(text, limit)]
 
 
 def build_prompt(style_id: str, lyrics: str, language: str = "fr") -> Dict:
     """
     Build enriched style prompt for SunoAPI.
-    
-    Args:
+
     Args:
         style_id: Style to use (supports suffix ":male" or ":female")
         lyrics: User lyrics
         language: "fr" or "en"
-    
+
     Returns:
         {
             "style_text": str,
@@ -89,112 +471,27 @@ def build_prompt(style_id: str, lyrics: str, language: str = "fr") -> Dict:
             "style_params": dict
         }
     """
+    index = _load_index()
+
     # Parse Voice Preference from ID (e.g., "rap:male")
-    voice_tag = None
-    negative_voice_tags = []
+    voice = None
     base_style_id = style_id
-    
     if ":" in style_id:
         parts = style_id.split(":")
         base_style_id = parts[0]
-        voice_pref = parts[1].lower()
-        
-        if voice_pref == "male":
-            voice_tag = "Male vocals"
-            negative_voice_tags = ["Female vocals", "Woman"]
-        elif voice_pref == "female":
-            voice_tag = "Female vocals"
-            negative_voice_tags = ["Male vocals", "Man"]
-            
-    style = get_style_by_id(base_style_id)
+        voice = parts[1].lower()
+        if voice not in VOICE_PREFERENCES:
+            voice = None
+
+    style = index.find(base_style_id)
     if not style:
         # Fallback if ID invalid, try original just in case
-        style = get_style_by_id(style_id)
+        style = index.find(style_id)
         if not style:
-             raise ValueError(f"Style '{style_id}' not found")
-    
-    # Prefer boosted prompt (enriched via Suno Style API), fallback to original
-    boosted_key = f"boosted_prompt_{language}"
-    template_key = f"prompt_template_{language}"
-    style_description = (
-        style.get(boosted_key)
-        or style.get(template_key)
-        or style["prompt_template_en"]
-    )
-    
-    # NEW: Build more explicit style text for Suno
-    # Format: "Genre/Style, Key instruments, Energy level"
-    prompt_parts = []
-    
-    # 0. Voice Preference (Start with voice for emphasis?) 
-    # Actually Suno v3.5 listens to tags anywhere, but specific tags near genre help.
-    if voice_tag:
-        prompt_parts.append(voice_tag)
-        
-    # 1. Main style description (genre)
-    prompt_parts.append(style_description)
-    
-    # 2. Explicit instrumentation (append as tags)
-    if style.get("instrumentation"):
-        instruments_list = style["instrumentation"]
-        
-        # Filter conflicting voice tags from base style
-        if voice_tag:
-            if "Female vocals" in voice_tag:
-                # Remove Male tags from base instruments
-                instruments_list = [i for i in instruments_list if i.lower() not in ["male vocals", "man", "rap vocals"]]
-                # "Rap vocals" often implies male in Suno unless specified "Female Rap"
-                # But we can keep generic "Rap" if needed, just avoid "Male"
-            elif "Male vocals" in voice_tag:
-                 # Remove Female tags from base instruments
-                instruments_list = [i for i in instruments_list if i.lower() not in ["female vocals", "woman"]]
-                
-        if len(instruments_list) > 0:
-            # Just join them, no "featuring" prefix which wastes tokens/clarity
-            instruments_text = ", ".join(instruments_list)
-            prompt_parts.append(instruments_text)
-    
-    # 3. Energy and BPM hints
-    energy = style.get("energy", "medium")
-    bpm_range = style.get("bpm_range")
-    if bpm_range:
-        # Format as strict tags for Suno
-        prompt_parts.append(f"{energy} energy")
-        prompt_parts.append(f"{bpm_range[0]}-{bpm_range[1]} bpm")
-    
-    # 4. Negative tags (what to avoid)
-    negative_items = style.get("negative_tags", []).copy()
-    
-    # Filter conflicting negative tags from base style
-    if voice_tag:
-        if "Female vocals" in voice_tag:
-            # If we WANT female, remove "female vocals" from NEGATIVE list
-            negative_items = [t for t in negative_items if t.lower() not in ["female vocals", "woman", "singing"]] 
-            # Also remove 'singing' from negative if we want singing (but user might want rap)
-            # For Rap style, "singing" is negative. If Female Rap, we still want Rap.
-            # But let's be careful.
-        elif "Male vocals" in voice_tag:
-             negative_items = [t for t in negative_items if t.lower() not in ["male vocals", "man"]]
-
-    # Merge with voice negatives
-    if negative_voice_tags:
-        negative_items.extend(negative_voice_tags)
-        
-    if negative_items:
-        # Prefix with "no" is good for Suno style strictness
-        no_tags = ", ".join([f"no {tag}" for tag in negative_items])
-        prompt_parts.append(no_tags)
-    
-    # Join with commas to create a tag list
-    final_style_text = ", ".join(prompt_parts)
-    
+            raise ValueError(f"Style '{style_id}' not found")
+
     return {
-        "style_text": final_style_text,
+        "style_text": index.style_text(style, voice, language),
         "lyrics": lyrics,
-        "style_params": {
-            "bpm_range": style.get("bpm_range"),
-            "energy": style.get("energy"),
-            "style_weight": style.get("style_weight", 0.7)
-        }
+        "style_params": dict(index.style_params[style["id"]])
     }
-
@@ -0,0 +1,91 @@
+"""
+Style similarity - closest preset styles for a free-form style description.
+
+Each style is a TF-IDF document made of its prompt templates, boosted prompts,
+label, instrumentation, energy and voice profile (negative tags are left out:
+they name what the style is not). The L2-normalised matrix (styles x terms)
+is built once per registry load (RegistryIndex), so a query is a tokenisation
+plus one NumPy dot product over the matched term columns.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Frequent words that say nothing about a style (fr + en)
+STOPWORDS = frozenset("""
+a an and are as at avec by dans de des du en est et for from in into is it its la le les
+of on ou par pour sa ses son sur the to un une with while over under plus tres very
+""".split())
+
+
+def _normalize(token: str) -> str:
+    # Crude plural folding ("afrobeats" ~ "afrobeat", "guitares" ~ "guitare")
+    return token[:-1] if len(token) > 3 and token.endswith("s") else token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-free word tokens (stopwords and 1-letter tokens removed)."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [_normalize(t) for t in _TOKEN_RE.findall(text) if len(t) > 1 and t not in STOPWORDS]
+
+
+def style_document(style: Dict) -> str:
+    """Text describing a style for matching."""
+    parts = [style.get("label", ""), style.get("energy", "")]
+    parts += [value for key, value in style.items() if key.startswith(("prompt_template_", "boosted_prompt_"))]
+    parts += style.get("instrumentation") or []
+    parts += (style.get("voice_profile") or {}).values()
+    return " ".join(p for p in parts if isinstance(p, str))
+
+
+class StyleMatcher:
+    """TF-IDF matrix of the registry styles."""
+
+    def __init__(self, styles: Sequence[Dict]):
+        self.style_ids = [style["id"] for style in styles]
+        documents = [Counter(tokenize(style_document(style))) for style in styles]
+
+        vocabulary: Dict[str, int] = {}
+        for counts in documents:
+            for term in counts:
+                vocabulary.setdefault(term, len(vocabulary))
+        self.vocabulary = vocabulary
+
+        matrix = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+        for row, counts in enumerate(documents):
+            for term, count in counts.items():
+                matrix[row, vocabulary[term]] = 1.0 + np.log(count)  # sublinear tf
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        # Smoothed idf, as in scikit-learn
+        self.idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1.0, norms)
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of `text` to every style (zeros if no known term)."""
+        counts = Counter(t for t in tokenize(text) if t in self.vocabulary)
+        if not counts:
+            return np.zeros(len(self.style_ids), dtype=np.float32)
+        columns = np.fromiter((self.vocabulary[t] for t in counts), dtype=np.intp, count=len(counts))
+        weights = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts))))
+        weights *= self.idf[columns]
+        weights /= np.linalg.norm(weights)
+        return self.matrix[:, columns] @ weights
+
+    def match(self, text: str, limit: int = 3) -> List[Tuple[str, float]]:
+        """Best matching style ids with their score, best first (only scores > 0)."""
+        scores = self.scores(text)
+        limit = min(limit, len(scores))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self.style_ids[i], float(scores[i])) for i in top if scores[i] > 0]
@@ -3,21 +3,28 @@ Supabase REST API Client Wrapper.
 
 Provides a simple interface to interact with Supabase tables via REST API.
 Uses a singleton pattern to reuse HTTP sessions across requests.
+Every round trip is recorded by app.utils.db_metrics for per-endpoint accounting.
 """
 
+import time
 import requests
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 from urllib.parse import quote
 import os
 from dotenv import load_dotenv
 
+from app.utils.db_metrics import record_query
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
+# PostgREST "Prefer: return=..." modes accepted by write methods
+RETURNING_MODES = ("minimal", "representation", "headers-only")
+
 
 class SupabaseClient:
     """Wrapper around Supabase REST API."""
@@ -45,11 +52,74 @@ class SupabaseClient:
         self.session.mount("https://", adapter)
         self.session.mount("http://", adapter)
 
+    def _request(
+        self,
+        method: str,
+        url: str,
+        table: str,
+        operation: str,
+        prefer: Optional[str] = None,
+        **kwargs
+    ) -> requests.Response:
+        """Send a request to PostgREST and record it for query accounting."""
+        headers = self.headers
+        if prefer is not None:
+            headers = {**self.headers, 'Prefer': prefer}
+
+        start = time.perf_counter()
+        response = self.session.request(method, url, headers=headers, timeout=10, **kwargs)
+        latency = time.perf_counter() - start
+
+        body = response.request.body if response.request is not None else None
+        record_query(table, operation, latency, len(body) if body else 0, len(response.content))
+
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _prefer_return(returning: str) -> str:
+        """
+        Build the Prefer header for a write.
+
+        returning:
+            "representation": respond with the written rows (default)
+            "minimal": empty body, status only
+            "headers-only": empty body, Location/Content-Range headers only
+        """
+        if returning not in RETURNING_MODES:
+            raise ValueError(f"returning must be one of {RETURNING_MODES}, got '{returning}'")
+        return f"return={returning}"
+
     @staticmethod
     def _encode_filter_value(value: Any) -> str:
         """URL-encode a filter value to prevent injection."""
         return quote(str(value), safe='')
 
+    @classmethod
+    def _build_filters(cls, filters: Dict[str, Any]) -> List[str]:
+        """
+        Build PostgREST filter params.
+
+        Plain values are equality filters. A (operator, operand) tuple selects another
+        PostgREST operator, e.g. {"created_at": ("lt", cutoff)} or {"id": ("in", ids)}.
+        The "or"/"and" keys take a raw PostgREST logic expression, e.g.
+        {"or": '(created_at.lt."2024-01-01",id.lt."...")'}.
+        """
+        params = []
+        for key, value in filters.items():
+            if key in ("or", "and"):
+                params.append(f"{key}={cls._encode_filter_value(value)}")
+            elif isinstance(value, tuple):
+                op, operand = value
+                if op == "in":
+                    encoded = ",".join(cls._encode_filter_value(f'"{v}"') for v in operand)
+                    params.append(f"{key}=in.({encoded})")
+                else:
+                    params.append(f"{key}={op}.{cls._encode_filter_value(operand)}")
+            else:
+                params.append(f"{key}=eq.{cls._encode_filter_value(value)}")
+        return params
+
     def select(
         self,
         table: str,
@@ -63,8 +133,7 @@ class SupabaseClient:
         url = f"{self.base_url}/{table}?select={columns}"
 
         if filters:
-            for key, value in filters.items():
-                url += f"&{key}=eq.{self._encode_filter_value(value)}"
+            url += "&" + "&".join(self._build_filters(filters))
 
         if order:
             url += f"&order={order}"
@@ -74,61 +143,100 @@ class SupabaseClient:
         if offset:
             url += f"&offset={offset}"
 
-        response = self.session.get(url, headers=self.headers, timeout=10)
-        response.raise_for_status()
+        response = self._request("GET", url, table, "select")
         return response.json()
 
-    def insert(self, table: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute INSERT query."""
+    def insert(
+        self,
+        table: str,
+        data: Dict[str, Any],
+        returning: str = "representation"
+    ) -> Optional[Dict[str, Any]]:
+        """Execute INSERT query. Returns None unless returning="representation"."""
         url = f"{self.base_url}/{table}"
-        response = self.session.post(url, json=data, headers=self.headers, timeout=10)
-        response.raise_for_status()
+        response = self._request("POST", url, table, "insert", prefer=self._prefer_return(returning), json=data)
+        if returning != "representation":
+            return None
         result = response.json()
         return result[0] if isinstance(result, list) else result
 
-    def insert_many(self, table: str, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def insert_many(
+        self,
+        table: str,
+        data: List[Dict[str, Any]],
+        returning: str = "representation"
+    ) -> List[Dict[str, Any]]:
         """Execute bulk INSERT query."""
         url = f"{self.base_url}/{table}"
-        response = self.session.post(url, json=data, headers=self.headers, timeout=10)
-        response.raise_for_status()
+        response = self._request("POST", url, table, "insert", prefer=self._prefer_return(returning), json=data)
+        if returning != "representation":
+            return []
+        return response.json()
+
+    def upsert(
+        self,
+        table: str,
+        rows: Union[Dict[str, Any], List[Dict[str, Any]]],
+        on_conflict: Optional[str] = None,
+        returning: str = "representation",
+        ignore_duplicates: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute INSERT ... ON CONFLICT in a single round trip.
+
+        Args:
+            on_conflict: Comma-separated columns of a unique constraint (defaults to the primary key)
+            ignore_duplicates: Keep existing rows instead of merging the new values into them
+        """
+        url = f"{self.base_url}/{table}"
+        if on_conflict:
+            url += f"?on_conflict={on_conflict}"
+
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        prefer = f"resolution={resolution},{self._prefer_return(returning)}"
+
+        response = self._request("POST", url, table, "upsert", prefer=prefer, json=rows)
+        if returning != "representation":
+            return []
         return response.json()
 
     def update(
         self,
         table: str,
         data: Dict[str, Any],
-        filters: Dict[str, Any]
+        filters: Dict[str, Any],
+        returning: str = "representation"
     ) -> List[Dict[str, Any]]:
         """Execute UPDATE query."""
         url = f"{self.base_url}/{table}"
 
-        filter_params = []
-        for key, value in filters.items():
-            filter_params.append(f"{key}=eq.{self._encode_filter_value(value)}")
-        url += "?" + "&".join(filter_params)
+        url += "?" + "&".join(self._build_filters(filters))
 
-        response = self.session.patch(url, json=data, headers=self.headers, timeout=10)
-        response.raise_for_status()
+        response = self._request("PATCH", url, table, "update", prefer=self._prefer_return(returning), json=data)
+        if returning != "representation":
+            return []
         return response.json()
 
-    def delete(self, table: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def delete(
+        self,
+        table: str,
+        filters: Dict[str, Any],
+        returning: str = "representation"
+    ) -> List[Dict[str, Any]]:
         """Execute DELETE query."""
         url = f"{self.base_url}/{table}"
 
-        filter_params = []
-        for key, value in filters.items():
-            filter_params.append(f"{key}=eq.{self._encode_filter_value(value)}")
-        url += "?" + "&".join(filter_params)
+        url += "?" + "&".join(self._build_filters(filters))
 
-        response = self.session.delete(url, headers=self.headers, timeout=10)
-        response.raise_for_status()
+        response = self._request("DELETE", url, table, "delete", prefer=self._prefer_return(returning))
+        if returning != "representation":
+            return []
         return response.json()
 
     def rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None) -> Any:
         """Call a Supabase stored procedure/function."""
         url = f"{self.base_url}/rpc/{function_name}"
-        response = self.session.post(url, json=params or {}, headers=self.headers, timeout=10)
-        response.raise_for_status()
+        response = self._request("POST", url, function_name, "rpc", json=params or {})
         return response.json()
 
 
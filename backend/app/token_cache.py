@@ -0,0 +1,103 @@
+"""
+Verified access token cache.
+
+The frontend sends the same Supabase access token with every poll, so the
+claims of a token whose signature was verified are kept until its `exp` and
+later requests skip the ES256/HS256 check. Entries are keyed by a SHA-256 of
+the token (raw tokens are never stored) in a bounded LRU.
+
+With TOKEN_CACHE_REDIS enabled, verified claims are also shared through Redis
+(the asyncio client, so lookups don't block the event loop) and a token
+verified by one API worker is a cache hit on the others. Redis errors only
+cost the hit.
+
+Hits and misses are counted in app.utils.metrics (`auth_token_cache`).
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.redis_client import get_async_redis
+from app.utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "auth:token:"
+# Tokens this close to expiry are not cached (clock skew between verifiers)
+EXPIRY_MARGIN = 5
+
+
+class VerifiedTokenCache:
+    """LRU of token hash -> (exp, claims), with an optional Redis tier."""
+
+    def __init__(self, max_entries: int = 10000, use_redis: bool = False):
+        self.max_entries = max_entries
+        self.use_redis = use_redis
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    async def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a previously verified, unexpired token (a copy), or None."""
+        digest = self._digest(token)
+        now = time.time()
+        entry = self._entries.get(digest)
+        if entry is not None:
+            if entry[0] - EXPIRY_MARGIN > now:
+                self._entries.move_to_end(digest)
+                increment("auth_token_cache", outcome="hit")
+                return dict(entry[1])
+            del self._entries[digest]
+
+        if self.use_redis:
+            claims = await self._redis_get(digest)
+            if claims is not None and claims.get("exp", 0) - EXPIRY_MARGIN > now:
+                self._store(digest, claims)
+                increment("auth_token_cache", outcome="redis_hit")
+                return dict(claims)
+
+        increment("auth_token_cache", outcome="miss")
+        return None
+
+    async def put(self, token: str, claims: Dict[str, Any]) -> None:
+        """Remember the claims of a token whose signature was just verified."""
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or not claims.get("sub"):
+            return
+        ttl = int(exp - time.time() - EXPIRY_MARGIN)
+        if ttl <= 0:
+            return
+        digest = self._digest(token)
+        self._store(digest, dict(claims))
+        if self.use_redis:
+            try:
+                await get_async_redis().set(REDIS_KEY_PREFIX + digest.hex(), json.dumps(claims), ex=ttl)
+            except Exception as e:
+                logger.warning("Token cache write to Redis failed: %s", e)
+
+    def _store(self, digest: bytes, claims: Dict[str, Any]) -> None:
+        self._entries[digest] = (claims["exp"], claims)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _redis_get(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await get_async_redis().get(REDIS_KEY_PREFIX + digest.hex())
+        except Exception as e:
+            logger.warning("Token cache read from Redis failed: %s", e)
+            return None
+        return json.loads(raw) if raw else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_REDIS)
@@ -0,0 +1,107 @@
+"""
+Pre-serialized catalog responses (styles, credit packages, countries).
+
+Catalog endpoints return the same JSON to everyone, so each response is
+serialized once into bytes with a strong ETag (hash of the body). Requests
+carrying a matching If-None-Match get a 304 straight from the cached entry.
+
+Entries without a TTL live until invalidated (static data such as the style
+registry). Entries with a TTL are rebuilt on the first request after expiry,
+and the previous bytes keep being served if the rebuild fails.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogEntry:
+    """A serialized response body and its ETag."""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class CatalogCache:
+    """Serialized catalog responses keyed by name."""
+
+    def __init__(self):
+        # key -> (entry, expires_at or None)
+        self._entries: Dict[str, Tuple[CatalogEntry, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: str,
+        build: Callable[[], Optional[bytes]],
+        ttl: Optional[float] = None
+    ) -> Optional[CatalogEntry]:
+        """
+        Return the cached entry for `key`, building it if missing or expired.
+
+        `build` returns the serialized body, or None when there is nothing to
+        serve (not cached, so callers can answer 404).
+        """
+        cached = self._entries.get(key)
+        now = time.monotonic()
+        if cached is not None and (cached[1] is None or cached[1] > now):
+            return cached[0]
+
+        with self._lock:
+            # Another thread may have rebuilt it while we waited
+            cached = self._entries.get(key)
+            if cached is not None and (cached[1] is None or cached[1] > now):
+                return cached[0]
+            expires_at = now + ttl if ttl is not None else None
+            try:
+                body = build()
+            except Exception as e:
+                if cached is None:
+                    raise
+                logger.warning("Rebuilding catalog entry %s failed, serving previous: %s", key, e)
+                self._entries[key] = (cached[0], expires_at)
+                return cached[0]
+            if body is None:
+                return None
+            entry = CatalogEntry(body)
+            self._entries[key] = (entry, expires_at)
+            return entry
+
+    def invalidate(self, prefix: str = "") -> None:
+        """Drop entries whose key starts with `prefix` (all by default)."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+
+catalog_cache = CatalogCache()
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+def catalog_response(
+    request: Request,
+    entry: CatalogEntry,
+    cache_control: str,
+    media_type: str = "application/json"
+) -> Response:
+    """200 with the cached body, or 304 if the client already has this version."""
+    headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=media_type, headers=headers)
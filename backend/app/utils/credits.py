@@ -2,10 +2,21 @@
 Credits management utilities - Migrated to Supabase REST API.
 
 Handles reserve/debit/refund logic for credits.
+Each operation is a single atomic RPC (see sql/migration_atomic_credits.sql):
+the balance check, profile update and ledger insert happen in one statement,
+so concurrent generations for the same user cannot race.
+
+With CREDITS_HOT_WALLET enabled, reserve/debit/refund are served from Redis
+instead (see app.utils.hot_wallet) and reach Postgres via the ledger flusher.
 """
 
+import logging
 from decimal import Decimal
-import uuid
+
+from app.utils import hot_wallet
+from app.utils.events import publish_event
+
+logger = logging.getLogger(__name__)
 
 
 # Supabase version of credit functions
@@ -13,55 +24,32 @@ import uuid
 def reserve_credits_supabase(client, user_id: str, amount: int) -> dict:
     """
     Reserve credits before generation (Supabase version).
-    
+
     Moves credits from available to reserved.
-    
+
     Args:
         client: SupabaseClient instance
         user_id: User UUID
         amount: Credits to reserve
-    
+
     Returns:
         Transaction record (dict)
-    
+
     Raises:
         ValueError: If insufficient credits
     """
-    # Get profile
-    profiles = client.select("profiles", filters={"id": user_id}, limit=1)
-    
-    if not profiles:
-        raise ValueError("Profile not found")
-    
-    profile = profiles[0]
-    available = profile["credits"] - profile["credits_reserved"]
-    
-    if available < amount:
-        raise ValueError(
-            f"Insufficient credits. Available: {available}, Required: {amount}"
-        )
-    
-    # Update profile
-    client.update(
-        "profiles",
-        {"credits_reserved": profile["credits_reserved"] + amount},
-        {"id": user_id}
-    )
-    
-    # Get updated profile
-    updated_profiles = client.select("profiles", filters={"id": user_id}, limit=1)
-    updated_profile = updated_profiles[0]
-    
-    # Create transaction record
-    transaction = client.insert("transactions", {
-        "id": str(uuid.uuid4()),
-        "user_id": user_id,
-        "type": "reserve",
-        "amount": amount,
-        "status": "completed",
-        "metadata": {"action": "reserve_for_generation"}
+    if hot_wallet.is_enabled():
+        return hot_wallet.reserve(client, user_id, amount, {"action": "reserve_for_generation"})
+
+    transaction = client.rpc("reserve_credits_atomic", {
+        "p_user_id": user_id,
+        "p_amount": amount,
+        "p_metadata": {"action": "reserve_for_generation"}
     })
-    
+
+    if not transaction:
+        raise ValueError(f"Insufficient credits. Required: {amount}")
+
     return transaction
 
 
@@ -84,98 +72,54 @@ def debit_credits_supabase(client, user_id: str, amount: int, job_id: str = None
     Raises:
         ValueError: If insufficient credits
     """
-    # Get profile
-    profiles = client.select("profiles", filters={"id": user_id}, limit=1)
-
-    if not profiles:
-        raise ValueError("Profile not found")
-
-    profile = profiles[0]
-
-    if from_reserved:
-        # Debit from reserved credits (after reservation)
-        if profile["credits_reserved"] < amount:
-            raise ValueError(
-                f"Insufficient reserved credits. Reserved: {profile['credits_reserved']}, Required: {amount}"
-            )
-
-        new_credits = profile["credits"] - amount
-        new_reserved = profile["credits_reserved"] - amount
-    else:
-        # Direct debit from available credits (no prior reservation)
-        available = profile["credits"] - profile["credits_reserved"]
-        if available < amount:
-            raise ValueError(
-                f"Insufficient credits. Available: {available}, Required: {amount}"
-            )
-
-        new_credits = profile["credits"] - amount
-        new_reserved = profile["credits_reserved"]  # unchanged
-
-    new_total_spent = profile["total_credits_spent"] + amount
-
-    client.update(
-        "profiles",
-        {
-            "credits": new_credits,
-            "credits_reserved": new_reserved,
-            "total_credits_spent": new_total_spent
-        },
-        {"id": user_id}
-    )
-
-    # Create transaction record
-    transaction = client.insert("transactions", {
-        "id": str(uuid.uuid4()),
-        "user_id": user_id,
-        "type": "debit",
-        "amount": amount,
-        "status": "completed",
-        "metadata": metadata or {}
+    if hot_wallet.is_enabled():
+        return hot_wallet.debit(client, user_id, amount, metadata, from_reserved=from_reserved)
+
+    transaction = client.rpc("debit_credits_atomic", {
+        "p_user_id": user_id,
+        "p_amount": amount,
+        "p_from_reserved": from_reserved,
+        "p_metadata": metadata or {}
     })
 
+    if not transaction:
+        if from_reserved:
+            raise ValueError(f"Insufficient reserved credits. Required: {amount}")
+        raise ValueError(f"Insufficient credits. Required: {amount}")
+
     return transaction
 
 
-def refund_credits_supabase(client, user_id: str, amount: int, job_id: str = None, reason: str = None) -> dict:
+def refund_credits_supabase(
+    client,
+    user_id: str,
+    amount: int,
+    job_id: str = None,
+    reason: str = None,
+    from_reserved: bool = True
+) -> dict:
     """
     Refund credits if generation fails (Supabase version).
-    
-    Returns reserved credits back to available.
+
+    Returns reserved credits back to available. With from_reserved=False the
+    credits are added back to the balance instead (refund of a direct debit,
+    e.g. a failed video clip).
     """
-    # Get profile
-    profiles = client.select("profiles", filters={"id": user_id}, limit=1)
-    
-    if not profiles:
-        raise ValueError("Profile not found")
-    
-    profile = profiles[0]
-    
-    if profile["credits_reserved"] < amount:
-        raise ValueError(
-            f"Insufficient reserved credits. Reserved: {profile['credits_reserved']}, Required: {amount}"
+    if hot_wallet.is_enabled():
+        return hot_wallet.refund(
+            client, user_id, amount, {"reason": reason or "generation_failed"}, from_reserved=from_reserved
         )
-    
-    # Update profile: reduce reserved only
-    new_reserved = profile["credits_reserved"] - amount
-    
-    client.update(
-        "profiles",
-        {"credits_reserved": new_reserved},
-        {"id": user_id}
-    )
-    
-    # Create transaction record
-    transaction = client.insert("transactions", {
-        "id": str(uuid.uuid4()),
-        "user_id": user_id,
-        "type": "refund",
-        # "job_id": job_id, 
-        "amount": amount,
-        "status": "completed",
-        "metadata": {"reason": reason or "generation_failed"}
+
+    transaction = client.rpc("refund_credits_atomic", {
+        "p_user_id": user_id,
+        "p_amount": amount,
+        "p_from_reserved": from_reserved,
+        "p_metadata": {"reason": reason or "generation_failed"}
     })
-    
+
+    if not transaction:
+        raise ValueError(f"Insufficient reserved credits. Required: {amount}")
+
     return transaction
 
 
@@ -188,37 +132,75 @@ def purchase_credits_supabase(
     payment_id: str
 ) -> dict:
     """Record credit purchase (Supabase version)."""
-    # Get profile
-    profiles = client.select("profiles", filters={"id": user_id}, limit=1)
-    
-    if not profiles:
+    hot_wallet.credit_purchase(user_id, amount)
+
+    transaction = client.rpc("purchase_credits_atomic", {
+        "p_user_id": user_id,
+        "p_amount": amount,
+        "p_price": float(price),
+        "p_payment_provider": payment_provider,
+        "p_payment_id": payment_id
+    })
+
+    if not transaction:
         raise ValueError("Profile not found")
-    
-    profile = profiles[0]
-    
-    # Update profile: add credits
-    new_credits = profile["credits"] + amount
-    
-    client.update(
-        "profiles",
-        {"credits": new_credits},
-        {"id": user_id}
+
+    return transaction
+
+
+def complete_purchase_supabase(client, tx_ref: str, payment_id: str) -> bool:
+    """
+    Mark a pending purchase transaction as completed and add its credits.
+
+    The status filter makes this safe to call from the webhook, the verify
+    endpoint and the payment reconciler concurrently: only one caller flips the
+    row and credits the user. Expired transactions are completed too, since the
+    provider confirming success means the customer was charged.
+
+    Returns True if credits were added, False if already processed.
+    """
+    updated = client.update(
+        "transactions",
+        {"status": "completed", "payment_id": str(payment_id)},
+        {"id": tx_ref, "status": ("in", ["pending", "expired"])}
     )
-    
-    # Create transaction record
-    transaction = client.insert("transactions", {
-        "id": str(uuid.uuid4()),
-        "user_id": user_id,
-        "type": "purchase",
-        "amount": amount,
-        "price": float(price),
-        "payment_provider": payment_provider,
-        "payment_id": payment_id,
-        "status": "completed",
-        "metadata": {
-            "payment_provider": payment_provider,
-            "payment_id": payment_id
-        }
+
+    if not updated:
+        logger.info("Transaction %s already completed, skipping credit update", tx_ref)
+        return False
+
+    transaction = updated[0]
+
+    # Mirror into the Redis hot wallet first (no-op when disabled or not loaded)
+    hot_wallet.credit_purchase(transaction["user_id"], transaction["amount"])
+
+    # Atomic credit increment via Supabase RPC (no read-then-write race)
+    try:
+        client.rpc("add_credits_atomic", {
+            "p_user_id": transaction["user_id"],
+            "p_credits": transaction["amount"],
+            "p_money": float(transaction["price"] or 0)
+        })
+    except Exception as e:
+        logger.error("RPC add_credits_atomic failed for %s, falling back: %s", tx_ref, e)
+        # Fallback to direct update if RPC not deployed yet
+        profiles = client.select("profiles", filters={"id": transaction["user_id"]}, limit=1)
+        if profiles:
+            profile = profiles[0]
+            client.update(
+                "profiles",
+                {
+                    "credits": profile["credits"] + transaction["amount"],
+                    "total_spent_money": float(profile["total_spent_money"]) + float(transaction["price"] or 0)
+                },
+                {"id": transaction["user_id"]},
+                returning="minimal"
+            )
+
+    logger.info("Credits added for transaction %s", tx_ref)
+    publish_event(transaction["user_id"], "payment", {
+        "tx_ref": tx_ref,
+        "status": "successful",
+        "credits": transaction["amount"]
     })
-    
-    return transaction
+    return True
@@ -0,0 +1,219 @@
+"""
+Supabase query accounting.
+
+Every REST round trip made through SupabaseClient is recorded (table,
+operation, latency, bytes) and attributed to the current FastAPI request or
+RQ job through a context variable. Per-endpoint aggregates are kept in-process
+and exposed via /health/db.
+"""
+
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Same (table, operation) pair repeated this many times in one scope = likely N+1
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+
+class QueryScope:
+    """Round trips made while serving one request or running one job."""
+
+    __slots__ = ("name", "budget", "n_plus_one_threshold", "queries")
+
+    def __init__(
+        self,
+        name: str,
+        budget: Optional[int] = None,
+        n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD
+    ):
+        self.name = name
+        self.budget = budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+        # (table, operation, latency_seconds, bytes_sent, bytes_received)
+        self.queries: List[Tuple[str, str, float, int, int]] = []
+
+    @property
+    def round_trips(self) -> int:
+        return len(self.queries)
+
+    @property
+    def db_time(self) -> float:
+        return sum(q[2] for q in self.queries)
+
+    def repeated_queries(self) -> List[Tuple[Tuple[str, str], int]]:
+        """(table, operation) pairs issued at least n_plus_one_threshold times."""
+        counts = Counter((q[0], q[1]) for q in self.queries)
+        return [(key, n) for key, n in counts.items() if n >= self.n_plus_one_threshold]
+
+
+_current_scope: ContextVar[Optional[QueryScope]] = ContextVar("supabase_query_scope", default=None)
+
+_stats_lock = threading.Lock()
+_endpoint_stats: Dict[str, Dict[str, float]] = {}
+_table_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _new_endpoint_stats() -> Dict[str, float]:
+    return {
+        "calls": 0,
+        "round_trips": 0,
+        "round_trips_max": 0,
+        "db_time": 0.0,
+        "bytes_sent": 0,
+        "bytes_received": 0,
+        "over_budget": 0,
+        "n_plus_one": 0,
+    }
+
+
+def record_query(table: str, operation: str, latency: float, bytes_sent: int, bytes_received: int) -> None:
+    """Record one Supabase round trip against the current scope."""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.queries.append((table, operation, latency, bytes_sent, bytes_received))
+
+    key = f"{operation} {table}"
+    with _stats_lock:
+        stats = _table_stats.get(key)
+        if stats is None:
+            stats = _table_stats[key] = {"count": 0, "db_time": 0.0, "bytes_received": 0}
+        stats["count"] += 1
+        stats["db_time"] += latency
+        stats["bytes_received"] += bytes_received
+
+
+def current_scope() -> Optional[QueryScope]:
+    """Get the scope of the request/job currently running, if any."""
+    return _current_scope.get()
+
+
+def finish_scope(scope: QueryScope) -> None:
+    """Fold a finished scope into the per-endpoint aggregates and emit warnings."""
+    round_trips = scope.round_trips
+    db_time = scope.db_time
+    over_budget = scope.budget is not None and round_trips > scope.budget
+    repeated = scope.repeated_queries()
+
+    with _stats_lock:
+        stats = _endpoint_stats.get(scope.name)
+        if stats is None:
+            stats = _endpoint_stats[scope.name] = _new_endpoint_stats()
+        stats["calls"] += 1
+        stats["round_trips"] += round_trips
+        stats["round_trips_max"] = max(stats["round_trips_max"], round_trips)
+        stats["db_time"] += db_time
+        stats["bytes_sent"] += sum(q[3] for q in scope.queries)
+        stats["bytes_received"] += sum(q[4] for q in scope.queries)
+        if over_budget:
+            stats["over_budget"] += 1
+        if repeated:
+            stats["n_plus_one"] += 1
+
+    if over_budget:
+        logger.warning(
+            "%s made %d Supabase round trips (budget %d, %.1f ms in DB): %s",
+            scope.name, round_trips, scope.budget, db_time * 1000,
+            ", ".join(f"{op} {table}" for table, op, *_ in scope.queries)
+        )
+    for (table, operation), count in repeated:
+        logger.warning(
+            "Possible N+1 in %s: %s %s issued %d times",
+            scope.name, operation, table, count
+        )
+
+
+@contextmanager
+def query_scope(
+    name: str,
+    budget: Optional[int] = None,
+    n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD
+) -> Iterator[QueryScope]:
+    """
+    Attribute Supabase calls made inside the block to `name`.
+
+    Usage (RQ job):
+        with query_scope("job:generate_music"):
+            ...
+    """
+    scope = QueryScope(name, budget=budget, n_plus_one_threshold=n_plus_one_threshold)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        finish_scope(scope)
+
+
+def get_query_metrics() -> Dict[str, Any]:
+    """Snapshot of per-endpoint and per-table Supabase usage."""
+    with _stats_lock:
+        endpoints = {}
+        for name, stats in _endpoint_stats.items():
+            calls = stats["calls"] or 1
+            endpoints[name] = {
+                "calls": int(stats["calls"]),
+                "round_trips_total": int(stats["round_trips"]),
+                "round_trips_avg": round(stats["round_trips"] / calls, 2),
+                "round_trips_max": int(stats["round_trips_max"]),
+                "db_time_ms_total": round(stats["db_time"] * 1000, 1),
+                "db_time_ms_avg": round(stats["db_time"] * 1000 / calls, 2),
+                "bytes_sent": int(stats["bytes_sent"]),
+                "bytes_received": int(stats["bytes_received"]),
+                "over_budget": int(stats["over_budget"]),
+                "n_plus_one": int(stats["n_plus_one"]),
+            }
+        tables = {
+            key: {
+                "count": int(stats["count"]),
+                "db_time_ms_total": round(stats["db_time"] * 1000, 1),
+                "bytes_received": int(stats["bytes_received"]),
+            }
+            for key, stats in _table_stats.items()
+        }
+    return {"endpoints": endpoints, "tables": tables}
+
+
+def reset_query_metrics() -> None:
+    """Clear all aggregates (used by tests and benchmarks)."""
+    with _stats_lock:
+        _endpoint_stats.clear()
+        _table_stats.clear()
+
+
+class QueryAccountingMiddleware:
+    """
+    ASGI middleware opening a query scope per HTTP request.
+
+    Scopes are named after the matched route template ("GET /api/v1/generate/jobs/{job_id}")
+    so metrics stay bounded regardless of path parameters.
+    """
+
+    def __init__(self, app, budget: Optional[int] = None, n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.budget = budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query_scope_ = QueryScope(
+            scope["method"],
+            budget=self.budget,
+            n_plus_one_threshold=self.n_plus_one_threshold
+        )
+        token = _current_scope.set(query_scope_)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            query_scope_.name = f"{scope['method']} {route_path}"
+            finish_scope(query_scope_)
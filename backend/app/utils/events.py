@@ -0,0 +1,150 @@
+"""
+Real-time status events (Redis pub/sub -> server-sent events).
+
+Workers, the payment webhook and the payment reconciler call `publish_event`
+on every job/payment state change. Each API process keeps ONE Redis pub/sub
+connection (EventBroker) and fans messages out to in-memory queues, one per
+open SSE connection, so an idle client costs a queue and a sleeping coroutine
+rather than a Redis connection or a poll.
+
+Events are JSON objects on channel `events:user:{user_id}`:
+    {"type": "job", "job_id": ..., "project_id": ..., "status": ..., ...}
+    {"type": "payment", "tx_ref": ..., "status": "successful" | "failed", ...}
+
+Delivery is best effort: a client that was not connected misses the event,
+which is why the SSE endpoint sends the current state when it opens (after
+subscribing and waiting for the listener, so nothing falls in between).
+
+Browsers' EventSource cannot send an Authorization header, and access tokens
+must not end up in URLs (access logs, proxies, history). The client trades
+its token for a stream ticket (`issue_stream_ticket`): a random id kept in
+Redis for STREAM_TICKET_TTL seconds, only valid for the stream of that user
+and job / transaction.
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+from typing import Any, Dict, Optional, Set
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "events:user:"
+TICKET_KEY_PREFIX = "events:ticket:"
+
+# Per-connection buffer; past this the oldest events are dropped (status events supersede each other)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def publish_event(user_id: str, event_type: str, data: Dict[str, Any]) -> None:
+    """Publish a status event to a user's channel. Never raises."""
+    if not user_id:
+        return
+    try:
+        message = json.dumps({"type": event_type, **data}, default=str)
+        get_redis().publish(f"{CHANNEL_PREFIX}{user_id}", message)
+    except Exception as e:
+        logger.warning("Failed to publish %s event for user %s: %s", event_type, user_id, e)
+
+
+def issue_stream_ticket(user_id: str, job_id: Optional[str] = None, tx_ref: Optional[str] = None) -> str:
+    """A short-lived ticket opening the event stream of this user (and resource)."""
+    ticket = secrets.token_urlsafe(32)
+    scope = json.dumps({"user_id": user_id, "job_id": job_id, "tx_ref": tx_ref})
+    get_redis().set(TICKET_KEY_PREFIX + ticket, scope, ex=settings.STREAM_TICKET_TTL)
+    return ticket
+
+
+def redeem_stream_ticket(ticket: str, job_id: Optional[str], tx_ref: Optional[str]) -> Optional[str]:
+    """The user id of a valid ticket issued for this job / transaction, else None.
+
+    Tickets stay valid until they expire, so EventSource's automatic
+    reconnections (same URL) keep working for that long.
+    """
+    raw = get_redis().get(TICKET_KEY_PREFIX + ticket)
+    if not raw:
+        return None
+    scope = json.loads(raw)
+    if scope.get("job_id") != job_id or scope.get("tx_ref") != tx_ref:
+        return None
+    return scope["user_id"]
+
+
+class EventBroker:
+    """Fans out user events from a single Redis pub/sub connection to local subscribers."""
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Set while the listener is subscribed to the user channels
+        self._ready = asyncio.Event()
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """Register a subscriber queue for a user's events (starts the listener if needed)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    async def wait_ready(self, timeout: float = 2.0) -> bool:
+        """Wait until events published from now on reach subscribers."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def _dispatch(self, channel: str, data: str) -> None:
+        user_id = channel[len(CHANNEL_PREFIX):]
+        for queue in list(self._subscribers.get(user_id, ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    async def _listen(self) -> None:
+        """Receive every user channel on one connection; reconnect on failure."""
+        while True:
+            client = aioredis.from_url(self.redis_url, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                self._ready.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Event listener disconnected, retrying: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                self._ready.clear()
+                await pubsub.aclose()
+                await client.aclose()
+
+
+_broker: Optional[EventBroker] = None
+
+
+def get_event_broker() -> EventBroker:
+    """Get or create the process-wide event broker."""
+    global _broker
+    if _broker is None:
+        _broker = EventBroker(settings.REDIS_URL)
+    return _broker
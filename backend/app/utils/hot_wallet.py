@@ -0,0 +1,342 @@
+"""
+Redis hot wallet for credit balances (optional, CREDITS_HOT_WALLET=true).
+
+Balances live in a Redis hash per user and are checked/updated atomically by a
+Lua script, so reserving credits never waits on Supabase. Every change also
+pushes a ledger entry onto a Redis list in the same script; the scheduler
+flushes that list to `transactions` in batches (apply_wallet_ledger RPC,
+sql/migration_hot_wallet.sql), which applies the same deltas to `profiles`.
+
+Postgres stays the system of record: the reconciler compares idle wallets
+(no unflushed entries) with `profiles` and overwrites Redis on drift.
+
+Redis must not evict these keys (maxmemory-policy noeviction, or a dedicated
+instance) or unflushed ledger entries would be lost.
+"""
+
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+WALLET_KEY_PREFIX = "wallet:user:"
+LEDGER_KEY = "wallet:ledger"
+LEDGER_PROCESSING_KEY = "wallet:ledger:processing"
+
+# Idle wallets are dropped after a week and reloaded from `profiles` on next use
+WALLET_TTL_SECONDS = 7 * 24 * 3600
+
+# KEYS[1] = wallet hash, KEYS[2] = ledger list
+# ARGV = d_credits, d_reserved, d_spent, check ("available" | "reserved" | "none"),
+#        amount, ledger entry JSON, ttl
+# Returns the new available balance, -1 if the check fails, -2 if the wallet is not loaded.
+_APPLY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -2
+end
+local credits = tonumber(redis.call('HGET', KEYS[1], 'credits'))
+local reserved = tonumber(redis.call('HGET', KEYS[1], 'reserved'))
+local amount = tonumber(ARGV[5])
+if ARGV[4] == 'available' and credits - reserved < amount then
+    return -1
+end
+if ARGV[4] == 'reserved' and reserved < amount then
+    return -1
+end
+credits = redis.call('HINCRBY', KEYS[1], 'credits', ARGV[1])
+reserved = redis.call('HINCRBY', KEYS[1], 'reserved', ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'spent', ARGV[3])
+redis.call('HINCRBY', KEYS[1], 'pending', 1)
+redis.call('RPUSH', KEYS[2], ARGV[6])
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+return credits - reserved
+"""
+
+# KEYS[1] = wallet hash; ARGV = credits, reserved, spent, ttl
+_LOAD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'credits', ARGV[1], 'reserved', ARGV[2], 'spent', ARGV[3], 'pending', 0)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+# KEYS[1] = wallet hash; ARGV = credits to add (purchase already recorded in Postgres)
+_CREDIT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'credits', ARGV[1])
+return 1
+"""
+
+# KEYS[1] = ledger, KEYS[2] = processing list; ARGV[1] = batch size
+# Re-delivers a batch left in processing by a crashed flush before taking new entries.
+_TAKE_SCRIPT = """
+local stuck = redis.call('LRANGE', KEYS[2], 0, -1)
+if #stuck > 0 then
+    return stuck
+end
+local n = tonumber(ARGV[1])
+local items = redis.call('LRANGE', KEYS[1], 0, n - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+"""
+
+# KEYS[1] = processing list, KEYS[2..] = wallet hashes; ARGV[i] = entries flushed for KEYS[i + 1]
+_ACK_SCRIPT = """
+redis.call('DEL', KEYS[1])
+for i = 2, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('HINCRBY', KEYS[i], 'pending', -tonumber(ARGV[i - 1]))
+    end
+end
+return #KEYS - 1
+"""
+
+# KEYS[1] = wallet hash; ARGV = expected credits, reserved, spent, new credits, reserved, spent
+# Overwrites the wallet only if it is idle and unchanged since it was read.
+_REPAIR_SCRIPT = """
+local current = redis.call('HMGET', KEYS[1], 'credits', 'reserved', 'spent', 'pending')
+if current[1] == false or tonumber(current[4]) ~= 0 then
+    return 0
+end
+if current[1] ~= ARGV[1] or current[2] ~= ARGV[2] or current[3] ~= ARGV[3] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'credits', ARGV[4], 'reserved', ARGV[5], 'spent', ARGV[6])
+return 1
+"""
+
+_scripts: Dict[str, Any] = {}
+
+
+def is_enabled() -> bool:
+    """Whether credit operations go through the Redis hot wallet."""
+    return settings.CREDITS_HOT_WALLET
+
+
+def _script(name: str, source: str):
+    """Register a Lua script once per process (EVALSHA with automatic reload)."""
+    script = _scripts.get(name)
+    if script is None:
+        script = _scripts[name] = get_redis().register_script(source)
+    return script
+
+
+def _wallet_key(user_id: str) -> str:
+    return f"{WALLET_KEY_PREFIX}{user_id}"
+
+
+def _load_wallet(client, user_id: str) -> None:
+    """Seed the wallet hash from `profiles` (no-op if another process already did)."""
+    profiles = client.select(
+        "profiles",
+        columns="credits,credits_reserved,total_credits_spent",
+        filters={"id": user_id},
+        limit=1
+    )
+    if not profiles:
+        raise ValueError("Profile not found")
+
+    profile = profiles[0]
+    _script("load", _LOAD_SCRIPT)(
+        keys=[_wallet_key(user_id)],
+        args=[profile["credits"], profile["credits_reserved"], profile["total_credits_spent"], WALLET_TTL_SECONDS]
+    )
+
+
+def _apply(
+    client,
+    user_id: str,
+    tx_type: str,
+    amount: int,
+    d_credits: int,
+    d_reserved: int,
+    d_spent: int,
+    check: str,
+    metadata: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Atomically check and apply a balance change, queueing its ledger entry."""
+    transaction = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "type": tx_type,
+        "amount": amount,
+        "status": "completed",
+        "metadata": metadata,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    entry = json.dumps({
+        **transaction,
+        "d_credits": d_credits,
+        "d_reserved": d_reserved,
+        "d_spent": d_spent,
+    })
+
+    apply_script = _script("apply", _APPLY_SCRIPT)
+    args = [d_credits, d_reserved, d_spent, check, amount, entry, WALLET_TTL_SECONDS]
+    keys = [_wallet_key(user_id), LEDGER_KEY]
+
+    result = apply_script(keys=keys, args=args)
+    if result == -2:
+        _load_wallet(client, user_id)
+        result = apply_script(keys=keys, args=args)
+
+    if result == -1:
+        if check == "reserved":
+            raise ValueError(f"Insufficient reserved credits. Required: {amount}")
+        raise ValueError(f"Insufficient credits. Required: {amount}")
+    if result == -2:
+        raise ValueError("Wallet could not be loaded")
+
+    return transaction
+
+
+def reserve(client, user_id: str, amount: int, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Move credits from available to reserved."""
+    return _apply(client, user_id, "reserve", amount, 0, amount, 0, "available", metadata or {})
+
+
+def debit(
+    client,
+    user_id: str,
+    amount: int,
+    metadata: Optional[Dict[str, Any]] = None,
+    from_reserved: bool = True
+) -> Dict[str, Any]:
+    """Spend credits from a reservation or directly from available credits."""
+    metadata = {**(metadata or {}), "from_reserved": from_reserved}
+    if from_reserved:
+        return _apply(client, user_id, "debit", amount, -amount, -amount, amount, "reserved", metadata)
+    return _apply(client, user_id, "debit", amount, -amount, 0, amount, "available", metadata)
+
+
+def refund(
+    client,
+    user_id: str,
+    amount: int,
+    metadata: Optional[Dict[str, Any]] = None,
+    from_reserved: bool = True
+) -> Dict[str, Any]:
+    """Release a reservation, or re-credit a direct debit."""
+    metadata = {**(metadata or {}), "from_reserved": from_reserved}
+    if from_reserved:
+        return _apply(client, user_id, "refund", amount, 0, -amount, 0, "reserved", metadata)
+    return _apply(client, user_id, "refund", amount, amount, 0, 0, "none", metadata)
+
+
+def credit_purchase(user_id: str, amount: int) -> None:
+    """
+    Mirror a purchase into a loaded wallet.
+
+    Call BEFORE crediting `profiles`: if the reconciler runs in between, it can
+    only under-credit Redis (repaired on its next pass), never double-count.
+    """
+    if not is_enabled():
+        return
+    try:
+        _script("credit", _CREDIT_SCRIPT)(keys=[_wallet_key(user_id)], args=[amount])
+    except Exception as e:
+        logger.warning("Hot wallet credit failed for %s (reconciler will repair): %s", user_id, e)
+
+
+def flush_ledger(client, batch_size: int = 500) -> int:
+    """
+    Write queued ledger entries to Postgres in batches.
+
+    apply_wallet_ledger is idempotent on transaction id, so a batch re-delivered
+    after a crash is never applied twice. Returns the number of entries flushed.
+    """
+    redis_conn = get_redis()
+    take = _script("take", _TAKE_SCRIPT)
+    ack = _script("ack", _ACK_SCRIPT)
+    flushed = 0
+
+    while True:
+        items = take(keys=[LEDGER_KEY, LEDGER_PROCESSING_KEY], args=[batch_size])
+        if not items:
+            return flushed
+
+        entries = [json.loads(item) for item in items]
+        client.rpc("apply_wallet_ledger", {"p_entries": entries})
+
+        per_user: Dict[str, int] = {}
+        for entry in entries:
+            per_user[entry["user_id"]] = per_user.get(entry["user_id"], 0) + 1
+        ack(
+            keys=[LEDGER_PROCESSING_KEY] + [_wallet_key(user_id) for user_id in per_user],
+            args=list(per_user.values())
+        )
+
+        flushed += len(entries)
+        if len(items) < batch_size or redis_conn.llen(LEDGER_KEY) == 0:
+            return flushed
+
+
+def reconcile(client, batch_size: int = 200) -> Dict[str, int]:
+    """
+    Compare idle wallets with `profiles` and repair drift (Postgres wins).
+
+    Wallets with unflushed ledger entries are skipped; they are checked again
+    once the flusher has caught up.
+    """
+    redis_conn = get_redis()
+    repair = _script("repair", _REPAIR_SCRIPT)
+    stats = {"checked": 0, "drifted": 0, "repaired": 0}
+
+    keys: List[bytes] = []
+    for key in redis_conn.scan_iter(match=f"{WALLET_KEY_PREFIX}*", count=batch_size):
+        keys.append(key)
+        if len(keys) >= batch_size:
+            _reconcile_batch(client, redis_conn, repair, keys, stats)
+            keys = []
+    if keys:
+        _reconcile_batch(client, redis_conn, repair, keys, stats)
+
+    if stats["drifted"]:
+        logger.warning("Hot wallet reconciliation: %s", stats)
+    return stats
+
+
+def _reconcile_batch(client, redis_conn, repair, keys: List[bytes], stats: Dict[str, int]) -> None:
+    pipe = redis_conn.pipeline(transaction=False)
+    for key in keys:
+        pipe.hmget(key, "credits", "reserved", "spent", "pending")
+    snapshots = pipe.execute()
+
+    idle = {}
+    for key, values in zip(keys, snapshots):
+        if values[0] is None or int(values[3] or 0) != 0:
+            continue
+        user_id = key.decode()[len(WALLET_KEY_PREFIX):]
+        idle[user_id] = (key, [v.decode() for v in values[:3]])
+
+    if not idle:
+        return
+
+    profiles = client.select(
+        "profiles",
+        columns="id,credits,credits_reserved,total_credits_spent",
+        filters={"id": ("in", list(idle))}
+    )
+    for profile in profiles:
+        key, current = idle[profile["id"]]
+        stats["checked"] += 1
+        expected = [str(profile["credits"]), str(profile["credits_reserved"]), str(profile["total_credits_spent"])]
+        if current == expected:
+            continue
+        stats["drifted"] += 1
+        logger.warning("Wallet drift for %s: redis=%s profiles=%s", profile["id"], current, expected)
+        if repair(keys=[key], args=current + expected):
+            stats["repaired"] += 1
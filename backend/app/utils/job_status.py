@@ -0,0 +1,103 @@
+"""
+Generation job status records in Redis.
+
+The music worker knows every job state change as it happens, so it writes a
+compact record to a Redis hash (`job:status:{job_id}`) on each transition and
+GET /generate/jobs/{job_id} (and the SSE stream's initial event) read it
+instead of querying `generation_jobs`. Supabase stays the source of truth:
+a missing or incomplete record falls back to it.
+
+Fields (strings, "" for None):
+    id, project_id, user_id, credits_cost, created_at   - copied from the job row
+    status, stage, video_status, error_message,
+    completed_at, audio_file_ids (comma separated)      - updated per transition
+
+Each write sets the row fields plus the fields of that transition, so a record
+is complete even if an earlier write was lost. Records expire JOB_STATUS_TTL
+seconds after the last write. Redis errors are logged and only cost the
+fallback read.
+
+Stages (finer than `status`, for progress display):
+    queued -> submitting -> generating -> saving [-> video] -> done | failed
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import settings
+from app.redis_client import get_redis
+from app.utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "job:status:"
+
+ROW_FIELDS = ("id", "project_id", "user_id", "credits_cost", "created_at")
+TRANSITION_FIELDS = ("status", "stage", "video_status", "error_message", "completed_at", "audio_file_ids")
+# A record without these was only partially written: read from Supabase instead
+REQUIRED_FIELDS = ("id", "project_id", "user_id", "status", "credits_cost", "created_at")
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def _encode(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(v) for v in value)
+    return str(value)
+
+
+def write_job_status(job: Dict[str, Any], **transition: Any) -> None:
+    """Record a job transition. `job` is the generation_jobs row; never raises.
+
+    Keyword arguments are TRANSITION_FIELDS; fields not given keep their value.
+    """
+    if not job.get("id"):
+        return
+    mapping = {field: _encode(job.get(field)) for field in ROW_FIELDS if field in job}
+    mapping.update({
+        field: _encode(value) for field, value in transition.items() if field in TRANSITION_FIELDS
+    })
+    key = KEY_PREFIX + str(job["id"])
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, settings.JOB_STATUS_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Failed to write status of job %s: %s", job["id"], e)
+
+
+def read_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """The cached status record of a job (shaped like JobStatusResponse), or None."""
+    try:
+        raw = get_redis().hgetall(KEY_PREFIX + job_id)
+    except Exception as e:
+        logger.warning("Failed to read status of job %s: %s", job_id, e)
+        raw = None
+    if not raw:
+        increment("job_status_cache", outcome="miss")
+        return None
+
+    record = {key.decode(): value.decode() for key, value in raw.items()}
+    if not all(record.get(field) for field in REQUIRED_FIELDS):
+        increment("job_status_cache", outcome="incomplete")
+        return None
+
+    increment("job_status_cache", outcome="hit")
+    job: Dict[str, Any] = {field: record.get(field) or None for field in (*ROW_FIELDS, *TRANSITION_FIELDS)}
+    job["credits_cost"] = int(record["credits_cost"])
+    job["audio_file_ids"] = record["audio_file_ids"].split(",") if record.get("audio_file_ids") else []
+    return job
+
+
+def delete_job_status(job_ids: Iterable[str]) -> None:
+    """Drop records whose job was changed outside the worker (next read goes to Supabase)."""
+    keys: List[str] = [KEY_PREFIX + str(job_id) for job_id in job_ids]
+    if not keys:
+        return
+    try:
+        get_redis().delete(*keys)
+    except Exception as e:
+        logger.warning("Failed to delete job status records: %s", e)
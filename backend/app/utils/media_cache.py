@@ -0,0 +1,306 @@
+"""
+Local disk cache of audio files for the media proxy (/api/v1/media).
+
+Audio lives on the provider's CDN. The first request for a file starts ONE
+origin download per file (an asyncio task, independent of the client) that
+writes it to `{MEDIA_CACHE_DIR}/{audio_file_id}.{pid}-{random}.part` chunk by
+chunk and is renamed once complete. Every request for that file - including ones arriving
+mid-download - reads from disk: readers follow the download and wait for the
+bytes they need, so nothing is buffered in memory and concurrent requests
+share the origin fetch.
+
+Complete files are kept in an LRU bounded by MEDIA_CACHE_MAX_BYTES (least
+recently served files are deleted first). The index is rebuilt from the
+directory at startup, ordered by access time. The budget is per process:
+API processes sharing a directory each evict within it, and a file deleted
+by another process is simply fetched again. Partial files are unique per
+download, so processes downloading the same file don't write to each other's;
+those left behind by a crash are deleted at startup once STALE_PART_AGE old.
+"""
+
+import asyncio
+import logging
+import mimetypes
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+from app.utils.metrics import increment, observe
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT_TYPE = "audio/mpeg"
+# Audio file ids are UUIDs; anything else never reaches the filesystem
+_ID_RE = re.compile(r"^[0-9a-fA-F-]{36}$")
+# A .part file not written to for this long (seconds) is left over from a dead process
+STALE_PART_AGE = 3600
+
+
+class MediaFetchError(Exception):
+    """The origin download failed."""
+
+
+class CachedFile:
+    """A complete file on disk."""
+
+    __slots__ = ("path", "size", "content_type")
+
+    def __init__(self, path: Path, size: int, content_type: str):
+        self.path = path
+        self.size = size
+        self.content_type = content_type
+
+
+class MediaDownload:
+    """An origin download in progress, followed by its readers."""
+
+    def __init__(self, part_path: Path):
+        self.part_path = part_path
+        self.size: Optional[int] = None  # Content-Length, if the origin sent one
+        self.content_type = DEFAULT_CONTENT_TYPE
+        self.written = 0
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.headers_ready = asyncio.Event()
+        self.progress = asyncio.Condition()
+
+    async def wait_done(self) -> None:
+        async with self.progress:
+            await self.progress.wait_for(lambda: self.done)
+        if self.error is not None:
+            raise MediaFetchError(str(self.error))
+
+    async def wait_for(self, offset: int) -> None:
+        """Wait until byte `offset` is on disk or the download ended."""
+        async with self.progress:
+            await self.progress.wait_for(lambda: self.written > offset or self.done)
+        if self.error is not None:
+            raise MediaFetchError(str(self.error))
+
+
+def is_valid_id(audio_file_id: str) -> bool:
+    return bool(_ID_RE.match(audio_file_id))
+
+
+class MediaCache:
+    """Size-bounded LRU of audio files on disk, filled from origin URLs."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        chunk_size: int = 256 * 1024,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.transport = transport
+        self._files: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._downloads: Dict[str, MediaDownload] = {}
+        self._total = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._scan()
+
+    def _scan(self) -> None:
+        """Index complete files left by a previous run; drop abandoned partial ones."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = []
+        stale_before = time.time() - STALE_PART_AGE
+        for path in self.directory.iterdir():
+            if path.suffix == ".part":
+                # Others may be in progress in another process sharing the directory
+                try:
+                    if path.stat().st_mtime < stale_before:
+                        path.unlink(missing_ok=True)
+                except FileNotFoundError:
+                    pass
+                continue
+            if not is_valid_id(path.stem):
+                continue
+            stat = path.stat()
+            content_type = mimetypes.guess_type(path.name)[0] or DEFAULT_CONTENT_TYPE
+            entries.append((stat.st_atime, path.stem, CachedFile(path, stat.st_size, content_type)))
+        for _, audio_file_id, cached in sorted(entries, key=lambda e: e[0]):
+            self._files[audio_file_id] = cached
+            self._total += cached.size
+        self._evict()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                follow_redirects=True,
+                transport=self.transport
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+    def get(self, audio_file_id: str) -> Optional[CachedFile]:
+        """The complete cached file (marked as recently used), or None."""
+        cached = self._files.get(audio_file_id)
+        if cached is None:
+            return None
+        if not cached.path.exists():
+            # Evicted by another process sharing the directory
+            self._forget(audio_file_id)
+            return None
+        self._files.move_to_end(audio_file_id)
+        try:
+            os.utime(cached.path)
+        except OSError:
+            pass
+        return cached
+
+    def in_progress(self, audio_file_id: str) -> Optional[MediaDownload]:
+        """The running download of this file, if any."""
+        return self._downloads.get(audio_file_id)
+
+    def download(self, audio_file_id: str, origin_url: str) -> MediaDownload:
+        """The download of this file, started if no request started it yet."""
+        current = self._downloads.get(audio_file_id)
+        if current is not None:
+            increment("media_cache", outcome="joined")
+            return current
+        increment("media_cache", outcome="miss")
+        download = MediaDownload(self.directory / f"{audio_file_id}.{os.getpid()}-{uuid.uuid4().hex[:8]}.part")
+        self._downloads[audio_file_id] = download
+        asyncio.create_task(self._fetch(audio_file_id, origin_url, download))
+        return download
+
+    async def _fetch(self, audio_file_id: str, origin_url: str, download: MediaDownload) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            async with self._get_client().stream("GET", origin_url) as response:
+                response.raise_for_status()
+                length = response.headers.get("content-length")
+                download.size = int(length) if length and length.isdigit() else None
+                download.content_type = (
+                    response.headers.get("content-type", "").split(";")[0].strip() or DEFAULT_CONTENT_TYPE
+                )
+                download.headers_ready.set()
+                with open(download.part_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        f.write(chunk)
+                        f.flush()
+                        async with download.progress:
+                            download.written += len(chunk)
+                            download.progress.notify_all()
+
+            extension = mimetypes.guess_extension(download.content_type) or ""
+            final_path = self.directory / f"{audio_file_id}{extension}"
+            os.replace(download.part_path, final_path)
+            # Readers that opened the .part file keep their descriptor; new ones use final_path
+            download.part_path = final_path
+            download.size = download.written
+            self._add(audio_file_id, CachedFile(final_path, download.written, download.content_type))
+            observe("provider_latency", loop.time() - start, provider="media_origin", operation="download")
+        except Exception as e:
+            logger.warning("Media download of %s failed: %s", audio_file_id, e)
+            increment("media_cache", outcome="error")
+            download.error = e
+            download.part_path.unlink(missing_ok=True)
+        finally:
+            download.headers_ready.set()
+            async with download.progress:
+                download.done = True
+                download.progress.notify_all()
+            self._downloads.pop(audio_file_id, None)
+
+    def _add(self, audio_file_id: str, cached: CachedFile) -> None:
+        self._forget(audio_file_id)
+        self._files[audio_file_id] = cached
+        self._total += cached.size
+        self._evict()
+
+    def _forget(self, audio_file_id: str) -> None:
+        cached = self._files.pop(audio_file_id, None)
+        if cached is not None:
+            self._total -= cached.size
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and len(self._files) > 1:
+            audio_file_id, cached = self._files.popitem(last=False)
+            self._total -= cached.size
+            # Readers with the file open keep reading it (POSIX unlink semantics)
+            cached.path.unlink(missing_ok=True)
+            increment("media_cache", outcome="evicted")
+
+    async def read_file(self, cached: CachedFile, start: int, end: int) -> AsyncIterator[bytes]:
+        """Bytes start..end (inclusive) of a complete file, in chunks."""
+        with open(cached.path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    async def read_download(self, download: MediaDownload, start: int, end: Optional[int]) -> AsyncIterator[bytes]:
+        """Bytes start..end (inclusive, None = to the end) of a file being downloaded."""
+        await download.wait_for(start)
+        with open(download.part_path, "rb") as f:
+            f.seek(start)
+            position = start
+            while end is None or position <= end:
+                if position >= download.written:
+                    if download.done:
+                        if download.error is not None:
+                            raise MediaFetchError(str(download.error))
+                        break
+                    await download.wait_for(position)
+                    continue
+                limit = download.written - position
+                if end is not None:
+                    limit = min(limit, end - position + 1)
+                chunk = f.read(min(self.chunk_size, limit))
+                if not chunk:
+                    break
+                position += len(chunk)
+                yield chunk
+
+
+_cache: Optional[MediaCache] = None
+
+
+def get_media_cache() -> MediaCache:
+    """Get or create the process-wide media cache."""
+    global _cache
+    if _cache is None:
+        _cache = MediaCache(settings.MEDIA_CACHE_DIR, settings.MEDIA_CACHE_MAX_BYTES, settings.MEDIA_CHUNK_SIZE)
+    return _cache
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single `bytes=` range, None to serve the whole file.
+
+    Raises ValueError for an unsatisfiable range.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None  # no range, another unit, or several ranges: full response
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    if not (first.isdigit() or first == "") or not (last.isdigit() or last == "") or first == last == "":
+        return None  # malformed: ignored, as RFC 9110 allows
+    if first == "":
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError(f"unsatisfiable range {header!r}")
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(f"unsatisfiable range {header!r}")
+    return start, min(end, size - 1)
@@ -0,0 +1,103 @@
+"""
+In-process counters and latency histograms.
+
+Used for calls to external providers (Flutterwave, ...) and caches. Metrics
+are keyed by name and labels and exposed via /health/metrics. Like the query
+accounting in db_metrics, values are per process and reset on restart.
+"""
+
+import bisect
+import threading
+from typing import Dict, Sequence, Tuple
+
+# Latency bucket upper bounds, in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram (counts per upper bound, plus an overflow bucket)."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self) -> Dict[str, object]:
+        cumulative, buckets = 0, {}
+        for bound, n in zip(self.bounds, self.counts):
+            cumulative += n
+            buckets[f"le_{bound}"] = cumulative
+        buckets["le_inf"] = self.count
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 4),
+            "buckets": buckets,
+        }
+
+
+_lock = threading.Lock()
+_histograms: Dict[str, Histogram] = {}
+_counters: Dict[str, int] = {}
+
+
+def _key(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Record one observation (e.g. a latency in seconds)."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def increment(name: str, amount: int = 1, **labels: str) -> None:
+    """Increment a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def get_metrics() -> Dict[str, Dict[str, object]]:
+    """Snapshot of all counters and histograms."""
+    with _lock:
+        return {
+            "counters": dict(sorted(_counters.items())),
+            "histograms": {key: h.snapshot() for key, h in sorted(_histograms.items())},
+        }
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -0,0 +1,280 @@
+"""
+Bulk credit reconciliation.
+
+Checks that every profile's credits, credits_reserved and total_credits_spent
+agree with the `transactions` ledger, and finds reservations that no live
+generation job accounts for.
+
+Tables are read in large keyset pages (only the columns needed, JSON metadata
+flattened server-side) and each page is reduced to per-user totals with pandas
+group-bys, so memory stays proportional to the number of users rather than the
+number of ledger rows.
+
+Ledger rows created after the run started, and users touched meanwhile, are left
+out of the comparison. Corrections go through compare-and-set RPCs
+(sql/migration_credit_reconciliation.sql) and never overwrite a balance that
+changed after it was read.
+
+Usage: python scripts/reconcile_credits.py --help
+"""
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Ledger columns, with the metadata keys that classify debits/refunds pulled out
+LEDGER_COLUMNS = (
+    "id,user_id,type,amount,"
+    "from_reserved:metadata->>from_reserved,action:metadata->>action,reason:metadata->>reason"
+)
+PROFILE_COLUMNS = "id,credits,credits_reserved,total_credits_spent"
+BALANCE_COLUMNS = ["credits", "credits_reserved", "total_credits_spent"]
+TOTAL_COLUMNS = [
+    "purchased", "reserved", "debited", "debited_from_reserved",
+    "released", "refunded", "transaction_count"
+]
+LIVE_JOB_STATUSES = ("queued", "processing")
+
+
+@dataclass
+class ReconciliationReport:
+    """Result of a reconciliation run. Frames are indexed by user_id."""
+    started_at: str
+    transactions_scanned: int = 0
+    profiles_checked: int = 0
+    skipped_active: int = 0
+    elapsed: float = 0.0
+    mismatches: pd.DataFrame = field(default_factory=pd.DataFrame)
+    stuck_reservations: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+
+def fetch_pages(
+    client,
+    table: str,
+    columns: str,
+    filters: Optional[Dict[str, Any]] = None,
+    page_size: int = 1000
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield a table in pages ordered by id (keyset, so each page is an index range scan).
+
+    Stops on an empty page only: PostgREST caps responses at its max-rows
+    setting (1000 on Supabase), so a short page does not mean the end.
+    """
+    last_id = None
+    while True:
+        page_filters = dict(filters or {})
+        if last_id is not None:
+            page_filters["id"] = ("gt", last_id)
+        rows = client.select(table, columns=columns, filters=page_filters, order="id.asc", limit=page_size)
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+def ledger_totals(page: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-user ledger totals for a frame of completed transactions.
+
+    Debits and refunds carry a from_reserved flag since the atomic credit RPCs;
+    older rows are classified like wallet_ledger_totals() does in SQL: direct
+    debits have an "action" (lyrics, video), direct refunds a "video..." reason.
+    """
+    kind = page["type"].to_numpy()
+    amount = page["amount"].to_numpy(dtype=np.int64)
+
+    flag = page["from_reserved"].to_numpy(dtype=object)
+    has_flag = pd.notna(flag)
+    flag_true = flag == "true"
+    debit_default = pd.isna(page["action"]).to_numpy()
+    refund_default = ~page["reason"].fillna("").str.startswith("video").to_numpy()
+
+    debit = kind == "debit"
+    refund = kind == "refund"
+    debit_reserved = debit & np.where(has_flag, flag_true, debit_default)
+    refund_reserved = refund & np.where(has_flag, flag_true, refund_default)
+
+    frame = pd.DataFrame({
+        "user_id": page["user_id"].to_numpy(),
+        "purchased": np.where(kind == "purchase", amount, 0),
+        "reserved": np.where(kind == "reserve", amount, 0),
+        "debited": np.where(debit, amount, 0),
+        "debited_from_reserved": np.where(debit_reserved, amount, 0),
+        "released": np.where(refund_reserved, amount, 0),
+        "refunded": np.where(refund & ~refund_reserved, amount, 0),
+        "transaction_count": 1,
+    })
+    return frame.groupby("user_id", sort=False).sum()
+
+
+def _combine(partials: List[pd.DataFrame]) -> pd.DataFrame:
+    if not partials:
+        return pd.DataFrame(columns=TOTAL_COLUMNS, dtype=np.int64)
+    return pd.concat(partials).groupby(level=0).sum()
+
+
+def aggregate_ledger(pages: Iterator[List[Dict[str, Any]]], combine_every: int = 50) -> Tuple[pd.DataFrame, int]:
+    """Reduce ledger pages to per-user totals. Returns (totals, rows scanned)."""
+    partials: List[pd.DataFrame] = []
+    scanned = 0
+    for rows in pages:
+        scanned += len(rows)
+        partials.append(ledger_totals(pd.DataFrame.from_records(rows)))
+        if len(partials) >= combine_every:
+            partials = [_combine(partials)]
+    return _combine(partials), scanned
+
+
+def expected_balances(totals: pd.DataFrame) -> pd.DataFrame:
+    """Profile balances implied by the ledger totals."""
+    return pd.DataFrame({
+        "credits": totals["purchased"] + totals["refunded"] - totals["debited"],
+        "credits_reserved": totals["reserved"] - totals["debited_from_reserved"] - totals["released"],
+        "total_credits_spent": totals["debited"],
+    }, index=totals.index)
+
+
+def find_mismatches(profiles: pd.DataFrame, expected: pd.DataFrame) -> pd.DataFrame:
+    """
+    Profiles whose balances differ from the ledger.
+
+    Columns: observed_<col>, expected_<col> and diff_<col> for each balance column.
+    """
+    expected = expected.reindex(profiles.index, fill_value=0)
+    observed = profiles[BALANCE_COLUMNS]
+    differs = (observed.to_numpy() != expected[BALANCE_COLUMNS].to_numpy()).any(axis=1)
+
+    report = pd.concat(
+        [observed.add_prefix("observed_"), expected[BALANCE_COLUMNS].add_prefix("expected_")],
+        axis=1
+    )[differs]
+    for col in BALANCE_COLUMNS:
+        report[f"diff_{col}"] = report[f"observed_{col}"] - report[f"expected_{col}"]
+    return report
+
+
+def find_stuck_reservations(
+    expected: pd.DataFrame,
+    live_jobs: pd.DataFrame,
+    observed: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Users whose ledger-reserved credits exceed what their live jobs hold.
+
+    Columns: credits_reserved, live_reserved, stuck, observed_credits_reserved.
+    `stuck` is computed from the ledger balance so a release stays consistent
+    with it once mismatches are corrected; observed_credits_reserved is the
+    profile's stored value, which the release compares-and-sets against.
+    """
+    if live_jobs.empty:
+        live = pd.Series(0, index=expected.index, dtype=np.int64)
+    else:
+        live = live_jobs.groupby("user_id")["credits_cost"].sum().reindex(expected.index, fill_value=0)
+
+    report = pd.DataFrame({
+        "credits_reserved": expected["credits_reserved"],
+        "live_reserved": live,
+    })
+    report["stuck"] = report["credits_reserved"] - report["live_reserved"]
+    report["observed_credits_reserved"] = observed["credits_reserved"].reindex(expected.index, fill_value=0)
+    return report[report["stuck"] > 0]
+
+
+def _records(pages: Iterator[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    return [row for rows in pages for row in rows]
+
+
+def run_reconciliation(client, page_size: int = 1000) -> ReconciliationReport:
+    """Scan ledger, profiles and live jobs and build a reconciliation report."""
+    start = time.perf_counter()
+    started_at = datetime.now(timezone.utc).isoformat()
+    report = ReconciliationReport(started_at=started_at)
+
+    totals, report.transactions_scanned = aggregate_ledger(fetch_pages(
+        client, "transactions", LEDGER_COLUMNS,
+        filters={"status": "completed", "created_at": ("lt", started_at)},
+        page_size=page_size
+    ))
+
+    profiles = pd.DataFrame.from_records(
+        _records(fetch_pages(client, "profiles", PROFILE_COLUMNS, page_size=page_size)),
+        columns=["id"] + BALANCE_COLUMNS
+    ).set_index("id")
+    live_jobs = pd.DataFrame.from_records(
+        _records(fetch_pages(
+            client, "generation_jobs", "id,user_id,credits_cost",
+            filters={"status": ("in", LIVE_JOB_STATUSES)}, page_size=page_size
+        )),
+        columns=["id", "user_id", "credits_cost"]
+    )
+
+    # Anyone with ledger activity since the scan started may have a profile that
+    # already reflects it; compare them on the next run instead.
+    active = {
+        row["user_id"] for row in _records(fetch_pages(
+            client, "transactions", "id,user_id",
+            filters={"created_at": ("gte", started_at)}, page_size=page_size
+        ))
+    }
+    is_active = profiles.index.isin(list(active))
+    report.skipped_active = int(is_active.sum())
+    profiles = profiles[~is_active]
+    report.profiles_checked = len(profiles)
+
+    expected = expected_balances(totals).reindex(profiles.index, fill_value=0)
+    report.mismatches = find_mismatches(profiles, expected)
+    report.stuck_reservations = find_stuck_reservations(expected, live_jobs, profiles)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _batches(items: List[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def apply_corrections(client, mismatches: pd.DataFrame, batch_size: int = 500) -> List[str]:
+    """Set mismatched profiles to their ledger balances. Returns the ids of the profiles updated.
+
+    Profiles changed since the scan are skipped (compare-and-set).
+    """
+    corrections = [
+        {
+            "user_id": user_id,
+            **{col: int(row[f"expected_{col}"]) for col in BALANCE_COLUMNS},
+            **{f"observed_{col}": int(row[f"observed_{col}"]) for col in BALANCE_COLUMNS},
+        }
+        for user_id, row in mismatches.iterrows()
+    ]
+    return [
+        str(user_id)
+        for batch in _batches(corrections, batch_size)
+        for user_id in client.rpc("apply_credit_corrections", {"p_corrections": batch}) or []
+    ]
+
+
+def release_stuck_reservations(client, stuck: pd.DataFrame, batch_size: int = 500) -> List[str]:
+    """Release stuck reservations with a refund ledger row each. Returns the ids of the users released.
+
+    A profile whose credits_reserved is no longer observed_credits_reserved
+    (changed since the scan, or corrected by apply_corrections without
+    updating the frame) or is below the stuck amount is skipped.
+    """
+    releases = [
+        {
+            "user_id": user_id,
+            "amount": int(row["stuck"]),
+            "observed_credits_reserved": int(row["observed_credits_reserved"]),
+        }
+        for user_id, row in stuck.iterrows()
+    ]
+    return [
+        str(user_id)
+        for batch in _batches(releases, batch_size)
+        for user_id in client.rpc("release_stuck_reservations", {"p_releases": batch}) or []
+    ]
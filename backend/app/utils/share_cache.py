@@ -0,0 +1,177 @@
+"""
+Materialized public share payloads.
+
+A shared track can get thousands of views a minute, all asking for the same
+JSON. The payload is built from Postgres when it changes - the music worker
+calls `publish_share_payload` when a job completes and when a video clip is
+saved - and stored as serialized bytes in Redis (`share:payload:{project_id}`).
+GET /share/{project_id} then serves, in order:
+
+1. a small in-process LRU (SHARE_LOCAL_TTL seconds), with an ETag for 304s
+   and CDN caching (see app.utils.catalog_cache),
+2. the Redis copy,
+3. on a miss (expired, or published before this cache existed), a rebuild
+   from Postgres. Concurrent misses are coalesced with a Redis lock: one
+   request builds, the others wait for its result.
+
+Projects that are missing or not completed are cached as empty bodies for
+SHARE_NOT_FOUND_TTL seconds, so random or stale links don't reach Postgres
+either; publishing overwrites the marker.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.redis_client import get_redis
+from app.supabase_client import get_supabase_client
+from app.utils.catalog_cache import CatalogEntry
+from app.utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_KEY_PREFIX = "share:payload:"
+LOCK_KEY_PREFIX = "share:lock:"
+NOT_SHAREABLE = b""
+
+# How long a request waits for another one's rebuild before building itself
+BUILD_WAIT = 2.0
+BUILD_POLL_INTERVAL = 0.05
+LOCK_TTL = 10
+
+
+def build_share_payload(client, project_id: str) -> bytes:
+    """Serialized public data of a completed project, or NOT_SHAREABLE.
+
+    Does NOT expose user_id, lyrics or context.
+    """
+    projects = client.select(
+        "projects",
+        filters={"id": project_id},
+        limit=1
+    )
+    if not projects or projects[0].get("status") != "completed":
+        return NOT_SHAREABLE
+
+    project = projects[0]
+    audio_files = client.select(
+        "audio_files",
+        filters={"project_id": project_id},
+        order="version_number.asc"
+    )
+    payload: Dict[str, Any] = {
+        "id": project["id"],
+        "title": project["title"],
+        "style_id": project.get("style_id"),
+        "custom_style_text": project.get("custom_style_text"),
+        "created_at": project["created_at"],
+        "audio_files": [
+            {
+                "id": af["id"],
+                "file_url": af.get("file_url"),
+                "stream_url": af.get("stream_url"),
+                "image_url": af.get("image_url"),
+                "video_url": af.get("video_url"),
+                "duration": af.get("duration"),
+                "version_number": af["version_number"],
+            }
+            for af in audio_files
+        ],
+    }
+    return json.dumps(payload, default=str).encode()
+
+
+def _store(project_id: str, body: bytes, only_if_missing: bool = False) -> None:
+    ttl = settings.SHARE_PAYLOAD_TTL if body else settings.SHARE_NOT_FOUND_TTL
+    get_redis().set(PAYLOAD_KEY_PREFIX + project_id, body, ex=ttl, nx=only_if_missing)
+
+
+def publish_share_payload(client, project_id: str) -> None:
+    """Rebuild and store a project's share payload. Never raises."""
+    try:
+        _store(project_id, build_share_payload(client, project_id))
+    except Exception as e:
+        logger.warning("Failed to publish share payload of project %s: %s", project_id, e)
+
+
+def invalidate_share_payload(project_id: str) -> None:
+    """Drop a project's payload (it is rebuilt on the next view). Never raises."""
+    _local.pop(project_id, None)
+    try:
+        get_redis().delete(PAYLOAD_KEY_PREFIX + project_id)
+    except Exception as e:
+        logger.warning("Failed to invalidate share payload of project %s: %s", project_id, e)
+
+
+# project id -> (entry or None if not shareable, expires_at)
+_local: "OrderedDict[str, Tuple[Optional[CatalogEntry], float]]" = OrderedDict()
+
+
+def _remember(project_id: str, body: bytes) -> Optional[CatalogEntry]:
+    entry = CatalogEntry(body) if body else None
+    _local[project_id] = (entry, time.monotonic() + settings.SHARE_LOCAL_TTL)
+    _local.move_to_end(project_id)
+    while len(_local) > settings.SHARE_CACHE_SIZE:
+        _local.popitem(last=False)
+    return entry
+
+
+def _read_redis(project_id: str) -> Optional[bytes]:
+    try:
+        return get_redis().get(PAYLOAD_KEY_PREFIX + project_id)
+    except Exception as e:
+        logger.warning("Failed to read share payload of project %s: %s", project_id, e)
+        return None
+
+
+def _rebuild(project_id: str) -> bytes:
+    body = build_share_payload(get_supabase_client(), project_id)
+    try:
+        # A payload published while we were reading Postgres is newer: keep it
+        _store(project_id, body, only_if_missing=True)
+    except Exception as e:
+        logger.warning("Failed to store share payload of project %s: %s", project_id, e)
+    return body
+
+
+async def get_share_entry(project_id: str) -> Optional[CatalogEntry]:
+    """The share payload of a project (None if it is not shareable)."""
+    cached = _local.get(project_id)
+    if cached is not None and cached[1] > time.monotonic():
+        _local.move_to_end(project_id)
+        increment("share_payload", outcome="local_hit")
+        return cached[0]
+
+    body = _read_redis(project_id)
+    if body is not None:
+        increment("share_payload", outcome="redis_hit")
+        return _remember(project_id, body)
+
+    try:
+        leader = get_redis().set(LOCK_KEY_PREFIX + project_id, b"1", nx=True, ex=LOCK_TTL)
+    except Exception:
+        leader = True  # Redis is down: nothing to coalesce on
+
+    if not leader:
+        deadline = time.monotonic() + BUILD_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(BUILD_POLL_INTERVAL)
+            body = _read_redis(project_id)
+            if body is not None:
+                increment("share_payload", outcome="coalesced")
+                return _remember(project_id, body)
+
+    increment("share_payload", outcome="miss")
+    try:
+        body = _rebuild(project_id)
+    finally:
+        if leader:
+            try:
+                get_redis().delete(LOCK_KEY_PREFIX + project_id)
+            except Exception:
+                pass
+    return _remember(project_id, body)
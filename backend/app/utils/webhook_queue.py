@@ -0,0 +1,187 @@
+"""
+Queue-backed Flutterwave webhook ingestion.
+
+POST /payments/webhook only verifies `verif-hash` and appends the raw event to
+a Redis stream, so it acknowledges in milliseconds whatever the load. A
+deduplication key per Flutterwave transaction/event/status (kept a week) makes
+retried deliveries a no-op.
+
+The scheduler drains the stream through a consumer group in batches
+(process_webhook_events). A message is acked only once handled; failures stay
+pending and are reclaimed on a later pass, and after WEBHOOK_MAX_ATTEMPTS
+deliveries they are moved to a dead-letter stream for manual inspection. Its
+deduplication key is dropped then, so a later Flutterwave retry of the event
+is queued again instead of ignored for a week.
+"""
+
+import json
+import os
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.redis_client import get_redis
+from app.utils.credits import complete_purchase_supabase
+from app.utils.events import publish_event
+
+STREAM_KEY = "webhooks:flutterwave"
+DEAD_LETTER_KEY = "webhooks:flutterwave:dead"
+DEDUP_KEY_PREFIX = "webhooks:flutterwave:seen:"
+GROUP = "payments"
+
+DEDUP_TTL_SECONDS = 7 * 24 * 3600
+STREAM_MAX_LEN = 100000
+# Messages a consumer took but did not ack within this time are retried
+RETRY_IDLE_MS = 30000
+
+# KEYS[1] = dedup key, KEYS[2] = stream
+# ARGV = dedup ttl, stream max length, raw body
+# Returns the stream entry id, or false if the event was already queued.
+_ENQUEUE_SCRIPT = """
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return false
+end
+return redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'body', ARGV[3])
+"""
+
+_enqueue = None
+_group_ready = False
+CONSUMER_NAME = f"{socket.gethostname()}-{os.getpid()}"
+
+
+def dedup_key(event: Dict[str, Any]) -> str:
+    """Identify a delivery: same Flutterwave transaction, event type and status."""
+    data = event.get("data") or {}
+    ref = data.get("id") or data.get("tx_ref") or event.get("id")
+    return f"{DEDUP_KEY_PREFIX}{event.get('event')}:{ref}:{data.get('status')}"
+
+
+def enqueue_webhook(body: bytes, event: Dict[str, Any]) -> bool:
+    """Queue a verified webhook. Returns False if this delivery was already queued."""
+    global _enqueue
+    redis = get_redis()
+    if _enqueue is None:
+        _enqueue = redis.register_script(_ENQUEUE_SCRIPT)
+    entry_id = _enqueue(
+        keys=[dedup_key(event), STREAM_KEY],
+        args=[DEDUP_TTL_SECONDS, STREAM_MAX_LEN, body]
+    )
+    return entry_id is not None
+
+
+def _ensure_group(redis) -> None:
+    global _group_ready
+    if _group_ready:
+        return
+    try:
+        redis.xgroup_create(STREAM_KEY, GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    _group_ready = True
+
+
+def _read_batch(redis, batch_size: int) -> List[Tuple[str, Dict[bytes, bytes]]]:
+    """Stale pending messages first (retries), then new ones."""
+    _, messages, _ = redis.xautoclaim(
+        STREAM_KEY, GROUP, CONSUMER_NAME, min_idle_time=RETRY_IDLE_MS, start_id="0-0", count=batch_size
+    )
+    if len(messages) < batch_size:
+        for _, new in redis.xreadgroup(GROUP, CONSUMER_NAME, {STREAM_KEY: ">"}, count=batch_size - len(messages)):
+            messages.extend(new)
+    return [(entry_id.decode() if isinstance(entry_id, bytes) else entry_id, fields) for entry_id, fields in messages]
+
+
+def handle_events(client, events: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[Exception]]:
+    """
+    Apply a batch of webhook events. Returns {entry id: error or None}.
+
+    Referenced transactions are loaded in one query; each completion is its own
+    idempotent update (see complete_purchase_supabase).
+    """
+    outcome: Dict[str, Optional[Exception]] = {entry_id: None for entry_id in events}
+    charges = {
+        entry_id: event["data"] for entry_id, event in events.items()
+        if event.get("event") == "charge.completed" and (event.get("data") or {}).get("tx_ref")
+    }
+    if not charges:
+        return outcome
+
+    tx_refs = list({data["tx_ref"] for data in charges.values()})
+    try:
+        rows = client.select(
+            "transactions",
+            columns="id,user_id,status",
+            filters={"id": ("in", tx_refs)}
+        )
+    except Exception as e:
+        return {entry_id: e for entry_id in events}
+    transactions = {row["id"]: row for row in rows}
+
+    for entry_id, data in charges.items():
+        transaction = transactions.get(data["tx_ref"])
+        if not transaction:
+            print(f"⚠️ Webhook for unknown transaction {data['tx_ref']}, acknowledged")
+            continue
+        try:
+            if data.get("status") == "successful":
+                complete_purchase_supabase(client, transaction["id"], str(data.get("id", "")))
+            elif data.get("status") == "failed" and transaction["status"] == "pending":
+                client.update(
+                    "transactions",
+                    {"status": "failed"},
+                    {"id": transaction["id"], "status": "pending"},
+                    returning="minimal"
+                )
+                publish_event(transaction["user_id"], "payment", {
+                    "tx_ref": transaction["id"], "status": "failed", "message": "Payment failed"
+                })
+        except Exception as e:
+            outcome[entry_id] = e
+    return outcome
+
+
+def process_webhook_events(client, batch_size: int = 100) -> Dict[str, int]:
+    """Drain one batch from the webhook stream."""
+    redis = get_redis()
+    _ensure_group(redis)
+    stats = {"processed": 0, "failed": 0, "dead": 0}
+
+    messages = _read_batch(redis, batch_size)
+    if not messages:
+        return stats
+
+    events, acked = {}, []
+    for entry_id, fields in messages:
+        try:
+            events[entry_id] = json.loads(fields[b"body"])
+        except (KeyError, ValueError):
+            print(f"⚠️ Unreadable webhook entry {entry_id}, dropped")
+            acked.append(entry_id)
+
+    failed = {entry_id: error for entry_id, error in handle_events(client, events).items() if error}
+    acked.extend(entry_id for entry_id in events if entry_id not in failed)
+    stats["processed"] = len(events) - len(failed)
+
+    if failed:
+        # Delivery counts decide between another retry and the dead-letter stream
+        deliveries = {}
+        for entry_id in failed:
+            pending = redis.xpending_range(STREAM_KEY, GROUP, min=entry_id, max=entry_id, count=1)
+            deliveries[entry_id] = pending[0]["times_delivered"] if pending else 0
+        for entry_id, error in failed.items():
+            print(f"⚠️ Webhook entry {entry_id} failed: {error}")
+            if deliveries.get(entry_id, 0) >= settings.WEBHOOK_MAX_ATTEMPTS:
+                redis.xadd(DEAD_LETTER_KEY, {"body": json.dumps(events[entry_id]), "error": str(error)})
+                redis.delete(dedup_key(events[entry_id]))
+                acked.append(entry_id)
+                stats["dead"] += 1
+            else:
+                stats["failed"] += 1
+
+    if acked:
+        pipe = redis.pipeline()
+        pipe.xack(STREAM_KEY, GROUP, *acked)
+        pipe.xdel(STREAM_KEY, *acked)
+        pipe.execute()
+    return stats
@@ -0,0 +1,84 @@
+"""
+Audio analysis worker - RQ job run after a generation completes, on the
+low-priority media_postprocess queue.
+
+Decodes each new clip and stores its waveform peaks (app.utils.waveform) in
+`audio_files.waveform_peaks`. Decoding and peak extraction are CPU bound, so
+the clips of a job are analysed in a small process pool (WAVEFORM_WORKERS
+processes) that leaves cores to the generation jobs of other workers.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+# Ensure app is in path
+backend_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from rq import Queue
+
+from app.config import settings
+from app.redis_client import get_redis
+from app.supabase_client import get_supabase_client
+from app.utils import metrics
+from app.utils.db_metrics import query_scope
+from app.utils.waveform import analyze_source
+
+
+def enqueue_analysis(audio_file_ids: List[str]) -> None:
+    """Queue waveform analysis of these audio files."""
+    if not settings.WAVEFORM_ENABLED or not audio_file_ids:
+        return
+    try:
+        # Low priority: workers take post-processing only when no generation waits
+        Queue("media_postprocess", connection=get_redis()).enqueue(
+            "app.workers.analysis_worker.analyze_audio_files", list(audio_file_ids), job_timeout="10m"
+        )
+    except Exception as e:
+        print(f"⚠️ Could not queue audio analysis: {e}")
+
+
+def analyze_audio_files(audio_file_ids: List[str]):
+    """Entry point for RQ worker: compute and store waveform peaks."""
+    start = time.perf_counter()
+    with query_scope("job:analyze_audio_files", n_plus_one_threshold=settings.SUPABASE_N_PLUS_ONE_THRESHOLD):
+        client = get_supabase_client()
+        rows = client.select(
+            "audio_files",
+            columns="id,file_url",
+            filters={"id": ("in", list(audio_file_ids)), "waveform_peaks": ("is", "null")}
+        )
+        rows = [row for row in rows if row.get("file_url")]
+        if not rows:
+            return
+
+        computed = 0
+        workers = min(len(rows), settings.WAVEFORM_WORKERS or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                row["id"]: pool.submit(analyze_source, row["file_url"], settings.WAVEFORM_SAMPLE_RATE)
+                for row in rows
+            }
+            for audio_file_id, future in futures.items():
+                try:
+                    blob = future.result()
+                except Exception as e:
+                    print(f"⚠️ Waveform analysis of {audio_file_id} failed: {e}")
+                    metrics.increment("waveforms", outcome="failed")
+                    continue
+                # bytea as PostgREST hex literal
+                client.update(
+                    "audio_files",
+                    {"waveform_peaks": "\\x" + blob.hex()},
+                    {"id": audio_file_id},
+                    returning="minimal"
+                )
+                metrics.increment("waveforms", outcome="ok")
+                computed += 1
+
+    print(f"〰️ Waveforms computed for {computed}/{len(rows)} clips in {time.perf_counter() - start:.1f}s")
+    metrics.observe("task_duration", time.perf_counter() - start, task="analyze_audio_files")
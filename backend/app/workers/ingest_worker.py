@@ -0,0 +1,205 @@
+"""
+Generated media ingestion - RQ job run after a generation or video completes,
+on the low-priority media_postprocess queue.
+
+Copies the mp3, cover image and video clip of each audio file from the
+provider's CDN into our storage (app.asset_storage), then points
+`audio_files` at the copies. Assets of a job are transferred in parallel
+(at most ASSET_INGEST_CONCURRENCY at once), each streamed to a temporary file
+in ASSET_CHUNK_SIZE chunks and uploaded from it, so memory stays flat
+whatever the file size. A transfer is accepted when:
+
+- the downloaded size matches the origin's Content-Length (if sent),
+- the stored object has the same size, and the same MD5 when the storage
+  reports one.
+
+Failed transfers are retried ASSET_INGEST_RETRIES times with backoff; an asset
+that still fails keeps its provider URL (the job can be re-enqueued: assets
+already in our storage are skipped).
+"""
+
+import asyncio
+import hashlib
+import mimetypes
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Ensure app is in path
+backend_dir = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+from rq import Queue
+
+from app.asset_storage import AssetStorage, StorageError, get_asset_storage
+from app.config import settings
+from app.redis_client import get_redis
+from app.supabase_client import get_supabase_client
+from app.utils import metrics
+from app.utils.db_metrics import query_scope
+from app.utils.share_cache import publish_share_payload
+
+# audio_files column -> asset name in storage keys
+ASSET_FIELDS = {"file_url": "audio", "image_url": "cover", "video_url": "video"}
+DEFAULT_EXTENSIONS = {"audio": ".mp3", "cover": ".jpeg", "video": ".mp4"}
+
+
+def enqueue_ingestion(audio_file_ids: List[str]) -> None:
+    """Queue ingestion of these audio files' assets, if a storage is configured."""
+    if not settings.ASSET_STORAGE_BACKEND or not audio_file_ids:
+        return
+    try:
+        # Low priority: workers take post-processing only when no generation waits
+        Queue("media_postprocess", connection=get_redis()).enqueue(
+            "app.workers.ingest_worker.ingest_assets", list(audio_file_ids), job_timeout="15m"
+        )
+    except Exception as e:
+        print(f"⚠️ Could not queue media ingestion: {e}")
+
+
+class AssetTransfer:
+    """One provider URL to copy."""
+
+    def __init__(self, row: Dict, field: str):
+        self.audio_file_id = row["id"]
+        self.project_id = row["project_id"]
+        self.field = field
+        self.kind = ASSET_FIELDS[field]
+        self.url = row[field]
+        self.key: Optional[str] = None
+        self.size = 0
+        self.sha256: Optional[str] = None
+
+    def storage_key(self, content_type: str) -> str:
+        extension = mimetypes.guess_extension(content_type or "") or DEFAULT_EXTENSIONS[self.kind]
+        return f"{self.project_id}/{self.audio_file_id}/{self.kind}{extension}"
+
+
+async def _download(http: httpx.AsyncClient, transfer: AssetTransfer, path: Path):
+    """Stream the asset to `path`; returns (content type, MD5 hex)."""
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    size = 0
+    async with http.stream("GET", transfer.url) as response:
+        response.raise_for_status()
+        expected = response.headers.get("content-length")
+        content_type = response.headers.get("content-type", "").split(";")[0].strip()
+        with open(path, "wb") as f:
+            async for chunk in response.aiter_bytes(settings.ASSET_CHUNK_SIZE):
+                f.write(chunk)
+                sha256.update(chunk)
+                md5.update(chunk)
+                size += len(chunk)
+    if expected and expected.isdigit() and int(expected) != size:
+        raise StorageError(f"truncated download: {size} of {expected} bytes")
+    transfer.size = size
+    transfer.sha256 = sha256.hexdigest()
+    return content_type, md5.hexdigest()
+
+
+async def _transfer(
+    http: httpx.AsyncClient,
+    storage: AssetStorage,
+    transfer: AssetTransfer,
+    semaphore: asyncio.Semaphore
+) -> bool:
+    for attempt in range(1, settings.ASSET_INGEST_RETRIES + 1):
+        async with semaphore:
+            fd, tmp_name = tempfile.mkstemp(prefix="ingest-")
+            os.close(fd)
+            try:
+                content_type, md5 = await _download(http, transfer, Path(tmp_name))
+                content_type = content_type or mimetypes.guess_type(transfer.url)[0] or "application/octet-stream"
+                key = transfer.storage_key(content_type)
+                await storage.put(key, Path(tmp_name), transfer.size, content_type)
+                stored_size, stored_md5 = await storage.stat(key)
+                if stored_size != transfer.size or (stored_md5 and stored_md5 != md5):
+                    raise StorageError(
+                        f"stored {stored_size} bytes (md5 {stored_md5}), sent {transfer.size} (md5 {md5})"
+                    )
+                transfer.key = key
+                metrics.increment("assets_ingested", kind=transfer.kind, outcome="ok")
+                return True
+            except Exception as e:
+                print(f"⚠️ Ingesting {transfer.kind} of {transfer.audio_file_id} failed "
+                      f"(attempt {attempt}/{settings.ASSET_INGEST_RETRIES}): {e}")
+            finally:
+                os.unlink(tmp_name)
+        # Back off without holding a slot, so other transfers proceed meanwhile
+        if attempt < settings.ASSET_INGEST_RETRIES:
+            await asyncio.sleep(2 ** attempt)
+    metrics.increment("assets_ingested", kind=transfer.kind, outcome="failed")
+    return False
+
+
+def ingest_assets(audio_file_ids: List[str]):
+    """Entry point for RQ worker (Synchronous)."""
+    start = time.perf_counter()
+    try:
+        with query_scope("job:ingest_assets", n_plus_one_threshold=settings.SUPABASE_N_PLUS_ONE_THRESHOLD):
+            asyncio.run(_ingest_assets_impl(audio_file_ids))
+    except Exception as e:
+        print(f"CRITICAL INGEST WORKER ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+    metrics.observe("task_duration", time.perf_counter() - start, task="ingest_assets")
+
+
+async def _ingest_assets_impl(
+    audio_file_ids: List[str],
+    storage: Optional[AssetStorage] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+):
+    storage = storage or get_asset_storage()
+    if storage is None:
+        return
+    client = get_supabase_client()
+    rows = client.select(
+        "audio_files",
+        columns="id,project_id,file_url,image_url,video_url",
+        filters={"id": ("in", list(audio_file_ids))}
+    )
+    transfers = [
+        AssetTransfer(row, field)
+        for row in rows
+        for field in ASSET_FIELDS
+        if row.get(field) and not storage.owns(row[field])
+    ]
+    if not transfers:
+        return
+
+    print(f"📦 Ingesting {len(transfers)} assets of {len(rows)} audio files")
+    semaphore = asyncio.Semaphore(settings.ASSET_INGEST_CONCURRENCY)
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(60.0, connect=10.0), follow_redirects=True, transport=transport
+    ) as http:
+        results = await asyncio.gather(*(_transfer(http, storage, t, semaphore) for t in transfers))
+
+    # One update per audio file, with the URLs of the assets that made it
+    updates: Dict[str, Dict] = {}
+    complete: Dict[str, bool] = {}
+    for transfer, ok in zip(transfers, results):
+        complete[transfer.audio_file_id] = complete.get(transfer.audio_file_id, True) and ok
+        if not ok:
+            continue
+        data = updates.setdefault(transfer.audio_file_id, {})
+        url = storage.public_url(transfer.key)
+        data[transfer.field] = url
+        if transfer.kind == "audio":
+            # Provider stream URLs expire; the stored file streams just as well
+            data.update({"file_path": transfer.key, "stream_url": url, "storage_checksum": transfer.sha256})
+
+    now = datetime.utcnow().isoformat()
+    for audio_file_id, data in updates.items():
+        if complete[audio_file_id]:
+            data["ingested_at"] = now
+        client.update("audio_files", data, {"id": audio_file_id}, returning="minimal")
+
+    for project_id in {t.project_id for t in transfers if t.audio_file_id in updates}:
+        publish_share_payload(client, project_id)
+
+    print(f"📦 Ingested {sum(results)}/{len(transfers)} assets")
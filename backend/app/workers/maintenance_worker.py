@@ -0,0 +1,109 @@
+"""
+Maintenance background task - sweeps records a request or worker left behind.
+
+Scheduled by app.workers.scheduler, off every request path:
+
+- purchases still pending after STALE_TRANSACTION_AFTER (the reconciler only
+  expires a payment once Flutterwave answered; this catches the rest). An
+  expired purchase can still be completed by a late confirmation.
+- generation jobs still processing STALE_JOB_AFTER after their worker
+  claimed them, i.e. whose worker died before its except path: the job and
+  project are failed and the reserved credits released, in batches
+  (sql/migration_stale_sweeper.sql). Queued jobs are left alone, however
+  long the queue: the worker only runs a job it could claim.
+- projects left 'generating' with no live job.
+
+Each sweep is a filtered bulk update, so a row settled meanwhile is skipped.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+from app.config import settings
+from app.supabase_client import get_supabase_client
+from app.utils import hot_wallet
+from app.utils import metrics
+from app.utils.credits import refund_credits_supabase
+from app.utils.db_metrics import query_scope
+from app.utils.events import publish_event
+from app.utils.job_status import delete_job_status
+
+JOB_SWEPT_MESSAGE = "Generation interrupted, credits refunded"
+
+
+def _cutoff(seconds: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+
+
+def expire_stale_transactions(client) -> int:
+    """Expire purchases pending for longer than STALE_TRANSACTION_AFTER."""
+    expired = client.update(
+        "transactions",
+        {"status": "expired"},
+        {
+            "status": "pending",
+            "type": "purchase",
+            "created_at": ("lt", _cutoff(settings.STALE_TRANSACTION_AFTER))
+        }
+    )
+    for transaction in expired:
+        publish_event(transaction["user_id"], "payment", {
+            "tx_ref": transaction["id"],
+            "status": "failed",
+            "message": "Transaction expiree. Si vous avez paye, contactez le support."
+        })
+    return len(expired)
+
+
+def sweep_stale_generations(client) -> Dict[str, int]:
+    """Fail orphaned jobs/projects and release their reservations, one batch per call."""
+    release_in_db = not hot_wallet.is_enabled()
+    result = client.rpc("sweep_stale_generations", {
+        "p_cutoff": _cutoff(settings.STALE_JOB_AFTER),
+        "p_limit": settings.SWEEP_BATCH,
+        "p_release_credits": release_in_db
+    }) or {}
+    jobs = result.get("jobs") or []
+    # Their status records still say queued/processing: next reads go to Supabase
+    delete_job_status(job["id"] for job in jobs)
+
+    released = 0
+    for job in jobs:
+        if release_in_db:
+            released += job["credits_cost"] if job["released"] else 0
+        else:
+            # Reservations live in Redis; the ledger flusher writes the refunds
+            try:
+                refund_credits_supabase(
+                    client, job["user_id"], job["credits_cost"], job_id=job["id"], reason="stale_job_swept"
+                )
+                released += job["credits_cost"]
+            except Exception as e:
+                print(f"⚠️ Could not release reservation of job {job['id']}: {e}")
+        publish_event(job["user_id"], "job", {
+            "job_id": job["id"],
+            "project_id": job["project_id"],
+            "status": "failed",
+            "video_status": None,
+            "error_message": JOB_SWEPT_MESSAGE
+        })
+
+    return {"jobs": len(jobs), "projects": result.get("projects", 0), "credits_released": released}
+
+
+def sweep_stale_records() -> Dict[str, int]:
+    """Run every sweep once and record what was cleaned up."""
+    start = time.perf_counter()
+    with query_scope("task:sweep_stale_records"):
+        client = get_supabase_client()
+        stats = {"transactions": expire_stale_transactions(client)}
+        stats.update(sweep_stale_generations(client))
+
+    metrics.observe("task_duration", time.perf_counter() - start, task="sweep_stale_records")
+    for kind, count in stats.items():
+        if count:
+            metrics.increment("swept", count, kind=kind)
+    if any(stats.values()):
+        print(f"🧹 Sweep: {stats}")
+    return stats
@@ -18,15 +18,40 @@ import uuid
 
 from app.supabase_client import get_supabase_client
 from app.providers import get_suno_provider
+from app.styles import get_registry_version
 from app.utils.credits import debit_credits_supabase, refund_credits_supabase
 from app.config import settings
 from app.utils.email_sender import send_notification_email
 from app.utils.web_push import send_push_notification
+from app.utils.db_metrics import query_scope
+from app.utils.events import publish_event
+from app.utils.job_status import write_job_status
+from app.utils.share_cache import publish_share_payload
+from app.workers.analysis_worker import enqueue_analysis
+from app.workers.ingest_worker import enqueue_ingestion
 
 
 import asyncio
 
 
+def _publish_job_status(job: dict, status: str, video_status: str = None, error_message: str = None,
+                        stage: str = None, **record):
+    """Record a job state change in its Redis status record and push it to the user's SSE stream.
+
+    `record` holds the other job_status fields of the transition (completed_at, audio_file_ids).
+    """
+    write_job_status(
+        job, status=status, stage=stage or status, video_status=video_status, error_message=error_message, **record
+    )
+    publish_event(job["user_id"], "job", {
+        "job_id": job["id"],
+        "project_id": job["project_id"],
+        "status": status,
+        "video_status": video_status,
+        "error_message": error_message
+    })
+
+
 def _send_notification(client, job_id: str, project_id: str, project: dict):
     """Send notification (email or push) if user opted in."""
     try:
@@ -65,7 +90,7 @@ def _send_notification(client, job_id: str, project_id: str, project: dict):
             )
 
         if sent:
-            client.update("notification_preferences", {"notified": True}, {"id": pref["id"]})
+            client.update("notification_preferences", {"notified": True}, {"id": pref["id"]}, returning="minimal")
 
     except Exception as e:
         print(f"⚠️ Notification error (non-blocking): {e}")
@@ -86,7 +111,8 @@ def generate_music(job_id: str, project_id: str):
     Calls the async implementation via asyncio.run().
     """
     try:
-        asyncio.run(_generate_music_impl(job_id, project_id))
+        with query_scope("job:generate_music", n_plus_one_threshold=settings.SUPABASE_N_PLUS_ONE_THRESHOLD):
+            asyncio.run(_generate_music_impl(job_id, project_id))
     except Exception as e:
         print(f"CRITICAL WORKER ERROR: {e}")
         import traceback
@@ -110,12 +136,25 @@ async def _generate_music_impl(job_id: str, project_id: str):
         job = jobs[0]
         project = projects[0]
         
-        # Mark job as processing
-        client.update(
+        # Claim the job (queued -> processing), recording the style registry version its
+        # prompt is built from. Later metadata writes extend this base so the version is kept.
+        # Only a queued job is claimed: one the stale sweeper failed, or that another
+        # worker already runs, must not be generated (its reservation may be gone).
+        base_metadata = {**(job.get("metadata") or {}), "style_registry_version": get_registry_version()}
+        claimed = client.update(
             "generation_jobs",
-            {"status": "processing", "provider_job_id": None},
-            {"id": job_id}
+            {
+                "status": "processing",
+                "provider_job_id": None,
+                "metadata": base_metadata,
+                "started_at": datetime.utcnow().isoformat()
+            },
+            {"id": job_id, "status": "queued"}
         )
+        if not claimed:
+            print(f"⏭️ Job {job_id} is {job.get('status')}, not queued: skipping")
+            return
+        _publish_job_status(job, "processing", stage="submitting")
         
         # Get Suno provider
         suno = get_suno_provider()
@@ -137,9 +176,11 @@ async def _generate_music_impl(job_id: str, project_id: str):
         client.update(
             "generation_jobs",
             {"provider_job_id": provider_job_id},
-            {"id": job_id}
+            {"id": job_id},
+            returning="minimal"
         )
         
+        _publish_job_status(job, "processing", stage="generating")
         print(f"🎶 Provider job created: {provider_job_id}")
         
         # Poll for completion with exponential backoff
@@ -163,6 +204,7 @@ async def _generate_music_impl(job_id: str, project_id: str):
                 suno_data = metadata.get("suno_data", [])
 
                 audio_file_ids = []
+                audio_rows = []
                 for idx, file_url in enumerate(audio_clips):
                     stream_url = stream_urls[idx] if idx < len(stream_urls) else None
                     image_url = image_urls[idx] if idx < len(image_urls) else None
@@ -173,7 +215,7 @@ async def _generate_music_impl(job_id: str, project_id: str):
                     af_id = str(uuid.uuid4())
                     audio_file_ids.append(af_id)
 
-                    client.insert("audio_files", {
+                    audio_rows.append({
                         "id": af_id,
                         "project_id": project_id,
                         "job_id": job_id,
@@ -186,6 +228,12 @@ async def _generate_music_impl(job_id: str, project_id: str):
                         "version_number": idx + 1
                     })
 
+                # Single round trip for all clips
+                if audio_rows:
+                    client.insert_many("audio_files", audio_rows, returning="minimal")
+
+                _publish_job_status(job, "processing", stage="saving", audio_file_ids=audio_file_ids)
+
                 # Debit credits
                 debit_credits_supabase(
                     client,
@@ -203,10 +251,15 @@ async def _generate_music_impl(job_id: str, project_id: str):
                     client.update(
                         "generation_jobs",
                         {"metadata": {
+                            **base_metadata,
                             "provider_job_id": provider_job_id,
                             "video_status": "processing"
                         }},
-                        {"id": job_id}
+                        {"id": job_id},
+                        returning="minimal"
+                    )
+                    _publish_job_status(
+                        job, "processing", video_status="processing", stage="video", audio_file_ids=audio_file_ids
                     )
                     try:
                         first_audio_id = suno_audio_ids[0]
@@ -231,7 +284,8 @@ async def _generate_music_impl(job_id: str, project_id: str):
                                 client.update(
                                     "audio_files",
                                     {"video_url": v_status["video_url"]},
-                                    {"id": audio_file_ids[0]}
+                                    {"id": audio_file_ids[0]},
+                                    returning="minimal"
                                 )
                                 video_status = "completed"
                                 print(f"🎬 Video ready: {v_status['video_url']}")
@@ -251,31 +305,43 @@ async def _generate_music_impl(job_id: str, project_id: str):
                         print(f"🎬 Video error (non-blocking): {ve}")
 
                 # Mark job complete
-                job_metadata = {"provider_job_id": provider_job_id}
+                job_metadata = {**base_metadata, "provider_job_id": provider_job_id}
                 if video_status:
                     job_metadata["video_status"] = video_status
+                completed_at = datetime.utcnow().isoformat()
                 client.update(
                     "generation_jobs",
                     {
                         "status": "completed",
-                        "completed_at": datetime.utcnow().isoformat(),
+                        "completed_at": completed_at,
                         "metadata": job_metadata
                     },
-                    {"id": job_id}
+                    {"id": job_id},
+                    returning="minimal"
+                )
+                _publish_job_status(
+                    job, "completed", video_status=video_status, stage="done",
+                    completed_at=completed_at, audio_file_ids=audio_file_ids
                 )
 
                 # Update project status
                 client.update(
                     "projects",
                     {"status": "completed"},
-                    {"id": project_id}
+                    {"id": project_id},
+                    returning="minimal"
                 )
+                publish_share_payload(client, project_id)
 
                 print(f"✅ Generation completed successfully!")
 
                 # Send email notification if user opted in
                 _send_notification(client, job_id, project_id, project)
 
+                # Copy the clips, covers and video into our storage
+                enqueue_ingestion(audio_file_ids)
+                enqueue_analysis(audio_file_ids)
+
                 return
             
             elif status == "failed":
@@ -292,21 +358,25 @@ async def _generate_music_impl(job_id: str, project_id: str):
                 )
                 
                 # Mark job failed
+                completed_at = datetime.utcnow().isoformat()
                 client.update(
                     "generation_jobs",
                     {
                         "status": "failed",
                         "error_message": error_message,
-                        "completed_at": datetime.utcnow().isoformat()
+                        "completed_at": completed_at
                     },
-                    {"id": job_id}
+                    {"id": job_id},
+                    returning="minimal"
                 )
+                _publish_job_status(job, "failed", error_message=error_message, completed_at=completed_at)
                 
                 # Update project status
                 client.update(
                     "projects",
                     {"status": "failed"},
-                    {"id": project_id}
+                    {"id": project_id},
+                    returning="minimal"
                 )
                 
                 print(f"❌ Generation failed: {error_message}")
@@ -326,20 +396,26 @@ async def _generate_music_impl(job_id: str, project_id: str):
             reason="generation_timeout"
         )
         
+        completed_at = datetime.utcnow().isoformat()
         client.update(
             "generation_jobs",
             {
                 "status": "failed",
                 "error_message": "Generation timeout after 5 minutes",
-                "completed_at": datetime.utcnow().isoformat()
+                "completed_at": completed_at
             },
-            {"id": job_id}
+            {"id": job_id},
+            returning="minimal"
+        )
+        _publish_job_status(
+            job, "failed", error_message="Generation timeout after 5 minutes", completed_at=completed_at
         )
         
         client.update(
             "projects",
             {"status": "failed"},
-            {"id": project_id}
+            {"id": project_id},
+            returning="minimal"
         )
         
         print(f"⏱️ Generation timed out")
@@ -360,15 +436,18 @@ async def _generate_music_impl(job_id: str, project_id: str):
                 reason=f"worker_error: {str(e)}"
             )
             
+            completed_at = datetime.utcnow().isoformat()
             client.update(
                 "generation_jobs",
                 {
                     "status": "failed",
                     "error_message": str(e),
-                    "completed_at": datetime.utcnow().isoformat()
+                    "completed_at": completed_at
                 },
-                {"id": job_id}
+                {"id": job_id},
+                returning="minimal"
             )
+            _publish_job_status(job, "failed", error_message=str(e), completed_at=completed_at)
         except:
             pass  # Best effort
 
@@ -379,7 +458,8 @@ def generate_video(audio_file_id: str, provider_job_id: str, provider_audio_id:
     Called manually from the API when user clicks "Generate clip".
     """
     try:
-        asyncio.run(_generate_video_impl(audio_file_id, provider_job_id, provider_audio_id, project_title, user_id, video_credits))
+        with query_scope("job:generate_video", n_plus_one_threshold=settings.SUPABASE_N_PLUS_ONE_THRESHOLD):
+            asyncio.run(_generate_video_impl(audio_file_id, provider_job_id, provider_audio_id, project_title, user_id, video_credits))
     except Exception as e:
         print(f"CRITICAL VIDEO WORKER ERROR: {e}")
         import traceback
@@ -391,20 +471,8 @@ def _refund_video_credits(client, user_id: str, video_credits: int, reason: str)
     if not user_id or video_credits <= 0:
         return
     try:
-        profiles = client.select("profiles", filters={"id": user_id}, limit=1)
-        if profiles:
-            profile = profiles[0]
-            client.update("profiles", {"credits": profile["credits"] + video_credits}, {"id": user_id})
-            import uuid as _uuid
-            client.insert("transactions", {
-                "id": str(_uuid.uuid4()),
-                "user_id": user_id,
-                "type": "refund",
-                "amount": video_credits,
-                "status": "completed",
-                "metadata": {"reason": reason}
-            })
-            print(f"💰 Refunded {video_credits} video credits to user {user_id}")
+        refund_credits_supabase(client, user_id, video_credits, reason=reason, from_reserved=False)
+        print(f"💰 Refunded {video_credits} video credits to user {user_id}")
     except Exception as e:
         print(f"⚠️ Video credit refund failed: {e}")
 
@@ -431,24 +499,31 @@ async def _generate_video_impl(audio_file_id: str, provider_job_id: str, provide
             print(f"🎬 [{attempt+1}/25] Video status: {v_status['status']}")
 
             if v_status["status"] == "completed" and v_status.get("video_url"):
-                client.update(
+                updated = client.update(
                     "audio_files",
                     {"video_url": v_status["video_url"]},
                     {"id": audio_file_id}
                 )
                 print(f"🎬 Video saved: {v_status['video_url']}")
+                if updated:
+                    publish_share_payload(client, updated[0]["project_id"])
+                enqueue_ingestion([audio_file_id])
+                publish_event(user_id, "video", {"audio_file_id": audio_file_id, "status": "completed"})
                 return
             elif v_status["status"] == "failed":
                 print(f"🎬 Video generation failed")
                 _refund_video_credits(client, user_id, video_credits, "video_generation_failed")
+                publish_event(user_id, "video", {"audio_file_id": audio_file_id, "status": "failed"})
                 return
 
             poll_interval = min(poll_interval * 1.3, 20)
 
         print(f"🎬 Video generation timed out")
         _refund_video_credits(client, user_id, video_credits, "video_generation_timeout")
+        publish_event(user_id, "video", {"audio_file_id": audio_file_id, "status": "failed"})
     except Exception as e:
         print(f"🎬 Video error: {e}")
         _refund_video_credits(client, user_id, video_credits, f"video_error: {e}")
+        publish_event(user_id, "video", {"audio_file_id": audio_file_id, "status": "failed"})
         import traceback
         traceback.print_exc()
@@ -0,0 +1,185 @@
+"""
+Payment background tasks - webhook queue consumer and pending payment reconciler.
+
+GET /payments/charge-status only reads the `transactions` table; this task
+(scheduled by app.workers.scheduler) asks Flutterwave about pending purchases,
+completes successful ones, marks failed ones and expires stale ones.
+
+Each transaction is re-checked on an interval that grows with its age, so
+Flutterwave calls scale with the number of pending payments instead of with
+client polls. Every pass reads all pending purchases (abandoned card checkouts
+stay pending for an hour and must not hide new Mobile Money charges) and
+checks at most PAYMENT_RECONCILE_BATCH of the due ones, least recently
+checked first. Lookups run concurrently, bounded by
+PAYMENT_RECONCILE_CONCURRENCY.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.flutterwave import FlutterwaveService
+from app.supabase_client import get_supabase_client
+from app.utils.credits import complete_purchase_supabase
+from app.utils.db_metrics import query_scope
+from app.utils.events import publish_event
+from app.utils.reconciliation import fetch_pages
+from app.utils.webhook_queue import process_webhook_events
+
+# (max transaction age, seconds between Flutterwave checks) - young payments are
+# usually being confirmed on the phone right now, old ones rarely change.
+CHECK_INTERVALS = ((120, 5), (600, 15), (3600, 60))
+SLOWEST_CHECK_INTERVAL = 300
+
+PENDING_COLUMNS = "id,user_id,amount,price,status,metadata,created_at"
+
+# tx_ref -> monotonic time of the last Flutterwave lookup (one scheduler process)
+_last_checked: Dict[str, float] = {}
+
+
+def check_interval(age: float) -> float:
+    """Seconds to wait between two checks of a transaction `age` seconds old."""
+    for max_age, interval in CHECK_INTERVALS:
+        if age < max_age:
+            return interval
+    return SLOWEST_CHECK_INTERVAL
+
+
+def expire_after(transaction: Dict[str, Any]) -> int:
+    """Seconds a transaction may stay pending before it is expired."""
+    metadata = transaction.get("metadata") or {}
+    if metadata.get("payment_method") == "mobile_money":
+        return settings.MOBILE_MONEY_EXPIRE_AFTER
+    return settings.CARD_PAYMENT_EXPIRE_AFTER
+
+
+def _age_seconds(transaction: Dict[str, Any], now: datetime) -> float:
+    created_at = datetime.fromisoformat(transaction["created_at"].replace("Z", "+00:00"))
+    return (now - created_at).total_seconds()
+
+
+async def _check_all(
+    transactions: List[Dict[str, Any]],
+    concurrency: int
+) -> List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Look up every transaction with Flutterwave, at most `concurrency` at a time."""
+    service = FlutterwaveService()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(transaction):
+        metadata = transaction.get("metadata") or {}
+        async with semaphore:
+            try:
+                return transaction, await service.get_charge_status(transaction["id"], metadata.get("flw_ref"))
+            except Exception as e:
+                print(f"⚠️ Flutterwave lookup failed for {transaction['id']}: {e}")
+                return transaction, None
+
+    try:
+        return await asyncio.gather(*(check(tx) for tx in transactions))
+    finally:
+        await service.aclose()
+
+
+def reconcile_pending_payments() -> Dict[str, int]:
+    """Check due pending purchases with Flutterwave and settle them."""
+    stats = {"pending": 0, "checked": 0, "completed": 0, "failed": 0, "expired": 0}
+
+    with query_scope("task:reconcile_pending_payments"):
+        client = get_supabase_client()
+        pending = [
+            tx
+            for page in fetch_pages(
+                client, "transactions", PENDING_COLUMNS, {"status": "pending", "type": "purchase"}
+            )
+            for tx in page
+        ]
+        stats["pending"] = len(pending)
+
+        # Forget transactions that are no longer pending
+        pending_ids = {tx["id"] for tx in pending}
+        for tx_ref in list(_last_checked):
+            if tx_ref not in pending_ids:
+                del _last_checked[tx_ref]
+
+        now = datetime.now(timezone.utc)
+        tick = time.monotonic()
+        ages = {tx["id"]: _age_seconds(tx, now) for tx in pending}
+        due = [
+            tx for tx in pending
+            if ages[tx["id"]] >= expire_after(tx)
+            or tick - _last_checked.get(tx["id"], float("-inf")) >= check_interval(ages[tx["id"]])
+        ]
+        # Never checked (then youngest) first, so a backlog can't starve new payments
+        due.sort(key=lambda tx: (_last_checked.get(tx["id"], float("-inf")), ages[tx["id"]]))
+        due = due[:settings.PAYMENT_RECONCILE_BATCH]
+        if not due:
+            return stats
+
+        results = asyncio.run(_check_all(due, settings.PAYMENT_RECONCILE_CONCURRENCY))
+        stats["checked"] = len(results)
+
+        owners = {tx["id"]: tx["user_id"] for tx in due}
+        failed_ids, expired_ids = [], []
+        for transaction, result in results:
+            tx_ref = transaction["id"]
+            _last_checked[tx_ref] = tick
+            if result is None:
+                continue  # provider unreachable: retry next pass, never expire blind
+
+            if result["status"] == "successful":
+                paid = result.get("amount")
+                if paid is not None and float(paid) < float(transaction["price"] or 0):
+                    print(f"⚠️ Transaction {tx_ref} paid {paid}, expected {transaction['price']}")
+                elif complete_purchase_supabase(client, tx_ref, str(result.get("flw_id", ""))):
+                    stats["completed"] += 1
+                    continue
+            elif result["status"] == "failed":
+                failed_ids.append(tx_ref)
+                continue
+
+            if ages[tx_ref] >= expire_after(transaction):
+                expired_ids.append(tx_ref)
+
+        # One round trip per outcome; the status filter skips rows settled meanwhile
+        if failed_ids:
+            client.update(
+                "transactions",
+                {"status": "failed"},
+                {"id": ("in", failed_ids), "status": "pending"},
+                returning="minimal"
+            )
+            stats["failed"] = len(failed_ids)
+            for tx_ref in failed_ids:
+                publish_event(owners[tx_ref], "payment", {
+                    "tx_ref": tx_ref, "status": "failed", "message": "Payment failed"
+                })
+        if expired_ids:
+            client.update(
+                "transactions",
+                {"status": "expired"},
+                {"id": ("in", expired_ids), "status": "pending"},
+                returning="minimal"
+            )
+            stats["expired"] = len(expired_ids)
+            for tx_ref in expired_ids:
+                publish_event(owners[tx_ref], "payment", {
+                    "tx_ref": tx_ref,
+                    "status": "failed",
+                    "message": "Transaction expiree. Si vous avez paye, contactez le support."
+                })
+
+    if stats["completed"] or stats["failed"] or stats["expired"]:
+        print(f"💳 Payment reconciliation: {stats}")
+    return stats
+
+
+def consume_payment_webhooks() -> Dict[str, int]:
+    """Process queued Flutterwave webhooks (see app.utils.webhook_queue)."""
+    with query_scope("task:consume_payment_webhooks"):
+        stats = process_webhook_events(get_supabase_client())
+    if stats["processed"] or stats["failed"] or stats["dead"]:
+        print(f"💳 Webhooks: {stats}")
+    return stats
@@ -0,0 +1,25 @@
+"""
+RQ worker class of the music_generation and media_postprocess queues.
+
+Deployments start it with `rq worker music_generation media_postprocess
+--worker-class app.workers.rq_worker.MusicWorker` (or start_worker.py). RQ
+serves queues in the order given, so post-processing jobs (waveform analysis,
+media ingestion) only run when no generation is waiting.
+
+The style registry is loaded in the worker process before it forks any job
+horse: horses inherit the index instead of loading it, and only this process
+runs the registry watcher (app.styles.registry). A reload swaps the index
+here, so the next horse forks with the new one.
+"""
+
+from rq import Worker
+
+from app.styles import get_registry_version
+
+
+class MusicWorker(Worker):
+    """RQ worker that preloads the style registry."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        print(f"Style registry: {get_registry_version()}")
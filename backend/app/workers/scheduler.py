@@ -0,0 +1,65 @@
+"""
+Periodic background tasks - standalone scheduler loop.
+
+Runs next to the RQ workers (see start_scheduler.py). Tasks run sequentially
+in a single process; a failing task is logged and retried at its next
+interval without affecting the others. Run exactly one scheduler.
+"""
+
+import time
+import traceback
+from typing import Callable, List, Optional
+
+from app.config import settings
+from app.workers.maintenance_worker import sweep_stale_records
+from app.workers.payment_worker import consume_payment_webhooks, reconcile_pending_payments
+from app.workers.wallet_worker import flush_wallet_ledger, reconcile_wallets, snapshot_wallet_balances
+
+
+class PeriodicTask:
+    """A function to call every `interval` seconds."""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = 0.0
+
+    def run(self, now: float) -> None:
+        self.next_run = now + self.interval
+        try:
+            self.func()
+        except Exception as e:
+            print(f"⚠️ Periodic task {self.name} failed: {e}")
+            traceback.print_exc()
+
+
+def get_periodic_tasks() -> List[PeriodicTask]:
+    """Tasks enabled by the current settings."""
+    tasks: List[PeriodicTask] = [
+        PeriodicTask("consume_payment_webhooks", settings.WEBHOOK_CONSUMER_INTERVAL, consume_payment_webhooks),
+        PeriodicTask("reconcile_pending_payments", settings.PAYMENT_RECONCILE_INTERVAL, reconcile_pending_payments),
+        PeriodicTask("sweep_stale_records", settings.SWEEP_INTERVAL, sweep_stale_records),
+        PeriodicTask("snapshot_wallet_balances", settings.WALLET_SNAPSHOT_INTERVAL, snapshot_wallet_balances),
+    ]
+
+    if settings.CREDITS_HOT_WALLET:
+        tasks.append(PeriodicTask("flush_wallet_ledger", settings.HOT_WALLET_FLUSH_INTERVAL, flush_wallet_ledger))
+        tasks.append(PeriodicTask("reconcile_wallets", settings.HOT_WALLET_RECONCILE_INTERVAL, reconcile_wallets))
+
+    return tasks
+
+
+def run_scheduler(tasks: Optional[List[PeriodicTask]] = None) -> None:
+    """Run tasks forever, each at its own interval."""
+    tasks = get_periodic_tasks() if tasks is None else tasks
+    for task in tasks:
+        print(f"  - {task.name}: every {task.interval}s")
+
+    while True:
+        now = time.monotonic()
+        for task in tasks:
+            if now >= task.next_run:
+                task.run(now)
+        next_due = min(task.next_run for task in tasks)
+        time.sleep(max(0.05, next_due - time.monotonic()))
@@ -0,0 +1,35 @@
+"""
+Wallet background tasks - hot wallet write-behind/reconciliation and
+ledger balance snapshots.
+
+Scheduled by app.workers.scheduler.
+"""
+
+from app.supabase_client import get_supabase_client
+from app.utils import hot_wallet
+from app.utils.db_metrics import query_scope
+
+
+def flush_wallet_ledger():
+    """Write queued hot wallet ledger entries to `transactions` and `profiles`."""
+    with query_scope("task:flush_wallet_ledger"):
+        flushed = hot_wallet.flush_ledger(get_supabase_client())
+    if flushed:
+        print(f"💰 Flushed {flushed} wallet ledger entries")
+    return flushed
+
+
+def reconcile_wallets():
+    """Compare Redis balances with `profiles` and repair drift."""
+    with query_scope("task:reconcile_wallets"):
+        stats = hot_wallet.reconcile(get_supabase_client())
+    print(f"💰 Wallet reconciliation: {stats}")
+    return stats
+
+
+def snapshot_wallet_balances():
+    """Advance per-user ledger balance snapshots (sql/migration_wallet_history.sql)."""
+    with query_scope("task:snapshot_wallet_balances"):
+        updated = get_supabase_client().rpc("snapshot_wallet_balances", {})
+    print(f"💰 Wallet snapshots updated for {updated} users")
+    return updated
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the Flutterwave payment flows.
+
+Starts benchmarks/fake_flutterwave.py in-process, points FlutterwaveService at
+it and runs `--payments` purchases, `--concurrency` at a time. Each purchase
+initiates a Mobile Money charge (or a hosted payment link for
+`--card-share` of them) and polls get_charge_status until it settles, as the
+payment reconciler does. Prints end-to-end times and the provider latency,
+error and lookup cache metrics recorded by the service.
+
+With --e2e, purchases go through the FastAPI app instead (httpx ASGI
+transport, FLUTTERWAVE_BASE_URL pointed at the fake): POST /payments/initiate,
+then the fake's charge.completed webhook is delivered to POST /payments/webhook,
+queued on the Redis stream and applied by the webhook consumer (run here
+every --consume-interval seconds, as the scheduler does), while the client
+polls GET /payments/charge-status. This needs REDIS_URL and a Supabase
+project: use a dev one, it records the transactions and credits --user-id
+(an existing profile). Requests are signed with JWT_SECRET (HS256).
+
+Usage:
+    python benchmarks/bench_payments.py --payments 500 --concurrency 50
+    python benchmarks/bench_payments.py --settle-after 2 --latency-scale 0
+    python benchmarks/bench_payments.py --e2e --user-id <uuid> --payments 50 --latency-scale 0
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import uvicorn
+from jose import jwt
+
+from app.config import settings
+from app.utils.metrics import get_metrics
+from benchmarks.fake_flutterwave import FakeFlutterwave, create_app
+
+
+def start_fake_server(fake: FakeFlutterwave, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(create_app(fake), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def purchase(service, index: int, card_share: float, poll_interval: float, timeout: float) -> dict:
+    tx_ref = f"bench-{uuid.uuid4()}"
+    start = time.perf_counter()
+    if index % 100 < card_share * 100:
+        await service.initiate_payment("bench@example.com", 1000, "XAF", tx_ref=tx_ref)
+    else:
+        await service.charge_mobile_money(
+            "670000000", 1000, "XAF", "CM", "MTN", "bench@example.com", tx_ref, "Bench User"
+        )
+    initiated = time.perf_counter() - start
+
+    status = "pending"
+    while status == "pending" and time.perf_counter() - start < timeout:
+        await asyncio.sleep(poll_interval)
+        status = (await service.get_charge_status(tx_ref))["status"]
+    return {"status": status, "initiate": initiated, "total": time.perf_counter() - start}
+
+
+async def run(args) -> list:
+    from app.services.flutterwave import FlutterwaveService
+
+    service = FlutterwaveService()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(index):
+        async with semaphore:
+            return await purchase(service, index, args.card_share, args.poll_interval, args.timeout)
+
+    try:
+        return await asyncio.gather(*(bounded(i) for i in range(args.payments)))
+    finally:
+        await service.aclose()
+
+
+async def purchase_via_api(api: httpx.AsyncClient, package_id: str, index: int, card_share: float,
+                           poll_interval: float, timeout: float) -> dict:
+    start = time.perf_counter()
+    if index % 100 < card_share * 100:
+        body = {"package_id": package_id, "payment_method": "card", "customer_name": "Bench User"}
+    else:
+        body = {
+            "package_id": package_id, "payment_method": "mobile_money", "country_code": "CM",
+            "network": "MTN", "phone_number": "670000000", "customer_name": "Bench User",
+        }
+    response = await api.post("/api/v1/payments/initiate", json=body)
+    if response.status_code != 200:
+        return {"status": f"initiate_{response.status_code}", "initiate": time.perf_counter() - start,
+                "total": time.perf_counter() - start}
+    tx_ref = response.json()["transaction_id"]
+    initiated = time.perf_counter() - start
+
+    status = "pending"
+    while status == "pending" and time.perf_counter() - start < timeout:
+        await asyncio.sleep(poll_interval)
+        status = (await api.get(f"/api/v1/payments/charge-status/{tx_ref}")).json()["status"]
+    return {"status": status, "initiate": initiated, "total": time.perf_counter() - start}
+
+
+async def run_e2e(args, app) -> list:
+    from app.workers.payment_worker import consume_payment_webhooks
+
+    token = jwt.encode(
+        {"sub": args.user_id, "email": "bench@example.com", "role": "authenticated",
+         "exp": int(time.time()) + 3600},
+        settings.JWT_SECRET,
+        algorithm="HS256"
+    )
+    api = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://api.bench",
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=30.0
+    )
+    package_id = args.package_id or (await api.get("/api/v1/payments/packages")).json()[0]["id"]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    done = asyncio.Event()
+
+    async def consume():
+        while not done.is_set():
+            await asyncio.to_thread(consume_payment_webhooks)
+            try:
+                await asyncio.wait_for(done.wait(), args.consume_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def bounded(index):
+        async with semaphore:
+            return await purchase_via_api(api, package_id, index, args.card_share, args.poll_interval, args.timeout)
+
+    consumer = asyncio.create_task(consume())
+    try:
+        return await asyncio.gather(*(bounded(i) for i in range(args.payments)))
+    finally:
+        done.set()
+        await consumer
+        await api.aclose()
+
+
+def _percentiles(values: list) -> str:
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return f"p50={pick(0.5):.3f}s p95={pick(0.95):.3f}s max={values[-1]:.3f}s mean={statistics.mean(values):.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--card-share", type=float, default=0.2, help="Share of hosted-link payments")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between status checks")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Give up on a payment after this long")
+    parser.add_argument("--settle-after", type=float, default=3.0)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--e2e", action="store_true", help="Go through the API routes, webhook queue and consumer")
+    parser.add_argument("--user-id", help="--e2e: existing profile to buy credits for")
+    parser.add_argument("--package-id", help="--e2e: credit package (default: the first listed)")
+    parser.add_argument("--consume-interval", type=float, default=1.0, help="--e2e: seconds between webhook batches")
+    args = parser.parse_args()
+    if args.e2e and not args.user_id:
+        parser.error("--e2e requires --user-id")
+
+    # Before the app is imported: its FlutterwaveService reads the URL once
+    settings.FLUTTERWAVE_BASE_URL = f"http://127.0.0.1:{args.port}/v3"
+    app = None
+    if args.e2e:
+        from app.api.v1 import payments as payments_api
+        from app.main import app
+
+        # Every request comes from one client address
+        app.state.limiter.enabled = False
+        payments_api.limiter.enabled = False
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    fake = FakeFlutterwave(
+        settle_after=args.settle_after,
+        failure_rate=args.failure_rate,
+        latency_scale=args.latency_scale,
+        webhook_url="http://api.bench/api/v1/payments/webhook" if app else None,
+        webhook_secret=settings.FLUTTERWAVE_WEBHOOK_SECRET,
+        webhook_transport=httpx.ASGITransport(app=app) if app else None,
+        seed=args.seed,
+    )
+    start_fake_server(fake, args.port)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_e2e(args, app) if app else run(args))
+    elapsed = time.perf_counter() - start
+
+    outcomes = {}
+    for result in results:
+        outcomes[result["status"]] = outcomes.get(result["status"], 0) + 1
+    print(f"📊 {args.payments} payments, concurrency {args.concurrency}: {elapsed:.2f}s "
+          f"({args.payments / elapsed:.1f} payments/s)")
+    print(f"   outcomes: {outcomes}")
+    print(f"   initiate: {_percentiles([r['initiate'] for r in results])}")
+    print(f"   settled:  {_percentiles([r['total'] for r in results])}")
+    if app:
+        print(f"   webhooks: {fake.webhooks_sent} delivered, {fake.webhook_errors} failed")
+    print(json.dumps(get_metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the style registry (app.styles.registry).
+
+Measures startup (JSON parse + index build, loading the compiled artifact
+from scripts/build_registry.py, and the registry load behind a fresh
+interpreter's first lookup) and the per-call cost of get_style_by_id
+(exact id and hyphenated alias), get_styles_by_category, build_prompt
+across every style, voice preference and language, and match_styles
+(TF-IDF similarity) on the styles' own labels and instruments.
+
+Usage:
+    python benchmarks/bench_styles.py
+    python benchmarks/bench_styles.py --calls 200000
+"""
+
+import argparse
+import itertools
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.styles import registry
+
+
+def per_call(func, args_cycle, calls: int) -> float:
+    """Mean microseconds per call of func(*args) over `calls` calls."""
+    args = list(itertools.islice(itertools.cycle(args_cycle), calls))
+    start = time.perf_counter()
+    for a in args:
+        func(*a)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def cold_start_ms(runs: int = 5) -> float:
+    """Best time, in a fresh interpreter, of the first style lookup (registry load).
+
+    Module imports are done beforehand: they cost the same with or without the
+    artifact and would hide the difference.
+    """
+    code = (
+        "import time; from app.styles import get_style_by_id; start = time.perf_counter(); "
+        "get_style_by_id('pop'); print((time.perf_counter() - start) * 1000)"
+    )
+    backend = Path(__file__).parent.parent
+    return min(
+        float(subprocess.run([sys.executable, "-c", code], cwd=backend, check=True,
+                             capture_output=True, text=True).stdout.split()[-1])
+        for _ in range(runs)
+    )
+
+
+def startup(raw: bytes) -> None:
+    start = time.perf_counter()
+    registry._build_index(raw, use_artifact=False)
+    print(f"{'startup: JSON parse + index build':<40} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = Path(tmp) / "registry.pickle"
+        registry.compile_registry(raw, artifact)
+        start = time.perf_counter()
+        with open(artifact, "rb") as f:
+            registry.pickle.load(f)
+        print(f"{'startup: artifact load':<40} {(time.perf_counter() - start) * 1000:8.2f} ms "
+              f"({artifact.stat().st_size // 1024} KiB)")
+
+    state = "current" if registry._load_artifact(registry.registry_version(raw)) else "missing/stale"
+    print(f"{'startup: first lookup, fresh process':<40} {cold_start_ms():8.2f} ms (artifact {state})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    raw = registry._REGISTRY_PATH.read_bytes()
+    startup(raw)
+    data = json.loads(raw)
+    start = time.perf_counter()
+    index = registry.RegistryIndex(data)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"index build: {build_ms:.2f} ms ({len(index.styles)} styles, {len(index.style_texts)} style texts)")
+
+    ids = [s["id"] for s in index.styles]
+    categories = [c["id"] for c in index.categories]
+    prompts = [
+        (f"{style_id}{suffix}", "lyrics", language)
+        for style_id in ids
+        for suffix in ("", ":male", ":female")
+        for language in ("fr", "en")
+    ]
+    cases = {
+        "get_style_by_id (id)": (registry.get_style_by_id, [(i,) for i in ids]),
+        "get_style_by_id (alias)": (registry.get_style_by_id, [(i.replace("_", "-"),) for i in ids]),
+        "get_styles_by_category": (registry.get_styles_by_category, [(c,) for c in categories]),
+        "build_prompt": (registry.build_prompt, prompts),
+        "match_styles": (
+            registry.match_styles,
+            [(f"{s['label']} {' '.join(s['instrumentation'][:2])}", 3) for s in index.styles],
+        ),
+        "compose_style_text (uncached)": (
+            registry.compose_style_text,
+            [(index.by_id[p[0].split(":")[0]], (p[0].split(":") + [None])[1], p[2]) for p in prompts],
+        ),
+    }
+    for name, (func, arg_list) in cases.items():
+        print(f"{name:<32} {per_call(func, arg_list, args.calls):8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
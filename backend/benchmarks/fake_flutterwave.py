@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Local Flutterwave stand-in for offline payment benchmarks.
+
+Implements the v3 endpoints FlutterwaveService calls, with per-endpoint
+latencies and the pending -> successful/failed transition of a real charge:
+
+    POST /v3/payments                              hosted payment link
+    POST /v3/charges?type=...                      direct Mobile Money charge
+    GET  /v3/transactions/{id}/verify
+    GET  /v3/transactions/verify_by_reference?tx_ref=...
+    GET  /v3/transactions?tx_ref=...
+
+A transaction settles `--settle-after` seconds after it is created
+(successful, or failed with probability `--failure-rate`). With
+`--webhook-url` set, a `charge.completed` webhook is then POSTed there with
+a valid `verif-hash` header.
+
+Usage:
+    python benchmarks/fake_flutterwave.py --port 8765 \\
+        --webhook-url http://localhost:8000/api/v1/payments/webhook --webhook-secret <secret>
+
+    # then run the API/scheduler with
+    FLUTTERWAVE_BASE_URL=http://localhost:8765/v3
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Mean and jitter (seconds) of the sandbox response times, per endpoint
+DEFAULT_LATENCIES: Dict[str, Tuple[float, float]] = {
+    "payments": (0.35, 0.15),
+    "charges": (0.8, 0.4),
+    "verify": (0.2, 0.1),
+}
+
+CHARGE_TYPES = ("mobile_money_franco", "mobile_money_ghana", "mpesa", "mobile_money_uganda")
+
+
+@dataclass
+class FakeTransaction:
+    id: int
+    tx_ref: str
+    flw_ref: str
+    amount: float
+    currency: str
+    payment_type: str
+    customer: Dict[str, Any]
+    status: str = "pending"
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "tx_ref": self.tx_ref,
+            "flw_ref": self.flw_ref,
+            "amount": self.amount,
+            "charged_amount": self.amount,
+            "currency": self.currency,
+            "status": self.status,
+            "payment_type": self.payment_type,
+            "processor_response": "Approved" if self.status == "successful" else "Declined",
+            "created_at": self.created_at,
+            "customer": self.customer,
+        }
+
+
+class FakeFlutterwave:
+    """In-memory transaction store plus the settle/webhook simulation."""
+
+    def __init__(
+        self,
+        settle_after: float = 5.0,
+        failure_rate: float = 0.1,
+        latency_scale: float = 1.0,
+        webhook_url: Optional[str] = None,
+        webhook_secret: str = "",
+        webhook_transport: Optional[httpx.AsyncBaseTransport] = None,
+        seed: Optional[int] = None
+    ):
+        self.settle_after = settle_after
+        self.failure_rate = failure_rate
+        self.latency_scale = latency_scale
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        # e.g. httpx.ASGITransport(app) to deliver webhooks to an in-process API
+        self.webhook_transport = webhook_transport
+        self.random = random.Random(seed)
+        self.transactions: Dict[str, FakeTransaction] = {}
+        self.by_id: Dict[int, FakeTransaction] = {}
+        self.webhooks_sent = 0
+        self.webhook_errors = 0
+        self._ids = itertools.count(100000000)
+        self._tasks: Set[asyncio.Task] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def delay(self, endpoint: str) -> None:
+        mean, jitter = DEFAULT_LATENCIES[endpoint]
+        seconds = max(0.0, self.random.uniform(mean - jitter, mean + jitter)) * self.latency_scale
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    def create(self, body: Dict[str, Any], payment_type: str) -> FakeTransaction:
+        transaction = FakeTransaction(
+            id=next(self._ids),
+            tx_ref=body["tx_ref"],
+            flw_ref=f"FLW-MOCK-{uuid.uuid4().hex[:12].upper()}",
+            amount=float(body.get("amount") or 0),
+            currency=body.get("currency", "XAF"),
+            payment_type=payment_type,
+            customer=body.get("customer") or {"email": body.get("email"), "name": body.get("fullname")},
+        )
+        self.transactions[transaction.tx_ref] = transaction
+        self.by_id[transaction.id] = transaction
+        task = asyncio.create_task(self._settle(transaction))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return transaction
+
+    async def _settle(self, transaction: FakeTransaction) -> None:
+        await asyncio.sleep(self.settle_after)
+        failed = self.random.random() < self.failure_rate
+        transaction.status = "failed" if failed else "successful"
+        if self.webhook_url:
+            await self._send_webhook(transaction)
+
+    async def _send_webhook(self, transaction: FakeTransaction) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10.0, transport=self.webhook_transport)
+        try:
+            response = await self._client.post(
+                self.webhook_url,
+                json={"event": "charge.completed", "data": transaction.to_dict()},
+                headers={"verif-hash": self.webhook_secret},
+            )
+            response.raise_for_status()
+            self.webhooks_sent += 1
+        except Exception as e:
+            self.webhook_errors += 1
+            print(f"⚠️ Webhook for {transaction.tx_ref} failed: {e}")
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+
+def _error(message: str, status_code: int = 400) -> JSONResponse:
+    return JSONResponse({"status": "error", "message": message, "data": None}, status_code=status_code)
+
+
+def create_app(fake: Optional[FakeFlutterwave] = None) -> FastAPI:
+    """ASGI app serving the fake Flutterwave v3 API (state in `app.state.fake`)."""
+    fake = fake or FakeFlutterwave()
+    app = FastAPI(title="Fake Flutterwave")
+    app.state.fake = fake
+
+    @app.post("/v3/payments")
+    async def payments(request: Request):
+        await fake.delay("payments")
+        body = await request.json()
+        if not body.get("tx_ref") or not body.get("amount"):
+            return _error("tx_ref and amount are required")
+        if body["tx_ref"] in fake.transactions:
+            return _error("Duplicate transaction reference")
+        fake.create(body, "card")
+        return {
+            "status": "success",
+            "message": "Hosted Link",
+            "data": {"link": f"{request.base_url}checkout/{body['tx_ref']}"},
+        }
+
+    @app.post("/v3/charges")
+    async def charges(request: Request, type: str):
+        await fake.delay("charges")
+        if type not in CHARGE_TYPES:
+            return _error(f"Invalid charge type: {type}")
+        body = await request.json()
+        if not body.get("tx_ref") or not body.get("phone_number"):
+            return _error("tx_ref and phone_number are required")
+        if body["tx_ref"] in fake.transactions:
+            return _error("Duplicate transaction reference")
+        transaction = fake.create(body, "mobilemoney")
+        return {
+            "status": "success",
+            "message": "Charge initiated",
+            "data": transaction.to_dict(),
+            "meta": {"authorization": {"mode": "callback", "note": "Validate on your phone"}},
+        }
+
+    # Declared before /{transaction_id}/verify so the literal path wins
+    @app.get("/v3/transactions/verify_by_reference")
+    async def verify_by_reference(tx_ref: str):
+        await fake.delay("verify")
+        transaction = fake.transactions.get(tx_ref)
+        if transaction is None:
+            return _error("No transaction was found for this id", status_code=404)
+        return {"status": "success", "message": "Transaction fetched successfully", "data": transaction.to_dict()}
+
+    @app.get("/v3/transactions/{transaction_id}/verify")
+    async def verify(transaction_id: int):
+        await fake.delay("verify")
+        transaction = fake.by_id.get(transaction_id)
+        if transaction is None:
+            return _error("No transaction was found for this id", status_code=404)
+        return {"status": "success", "message": "Transaction fetched successfully", "data": transaction.to_dict()}
+
+    @app.get("/v3/transactions")
+    async def list_transactions(tx_ref: Optional[str] = None):
+        await fake.delay("verify")
+        if tx_ref is None:
+            rows = [t.to_dict() for t in fake.transactions.values()]
+        else:
+            rows = [fake.transactions[tx_ref].to_dict()] if tx_ref in fake.transactions else []
+        return {"status": "success", "message": "Transactions fetched", "data": rows}
+
+    @app.get("/checkout/{tx_ref}")
+    async def checkout(tx_ref: str):
+        """Stands in for the hosted page: the link resolves, the charge settles on its own."""
+        transaction = fake.transactions.get(tx_ref)
+        if transaction is None:
+            return _error("Unknown payment link", status_code=404)
+        return {"status": "success", "data": {"tx_ref": tx_ref, "status": transaction.status}}
+
+    @app.get("/_stats")
+    async def stats():
+        statuses: Dict[str, int] = {}
+        for transaction in fake.transactions.values():
+            statuses[transaction.status] = statuses.get(transaction.status, 0) + 1
+        return {
+            "transactions": statuses,
+            "webhooks_sent": fake.webhooks_sent,
+            "webhook_errors": fake.webhook_errors,
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--settle-after", type=float, default=5.0, help="Seconds before a charge settles")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="Share of charges that fail")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier on response times (0 = instant)")
+    parser.add_argument("--webhook-url", help="POST charge.completed webhooks here")
+    parser.add_argument("--webhook-secret", default="", help="Sent as verif-hash (FLUTTERWAVE_WEBHOOK_SECRET)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    fake = FakeFlutterwave(
+        settle_after=args.settle_after,
+        failure_rate=args.failure_rate,
+        latency_scale=args.latency_scale,
+        webhook_url=args.webhook_url,
+        webhook_secret=args.webhook_secret,
+        seed=args.seed,
+    )
+    print(f"🧪 Fake Flutterwave on http://{args.host}:{args.port}/v3")
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
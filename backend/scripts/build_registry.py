@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Compile the style registry into app/styles/registry.pickle.
+
+Run at build time (Dockerfiles, nixpacks) after any change to registry.json,
+compose_style_text or app/styles/similarity.py. Processes load the compiled
+index instead of parsing and indexing the JSON; if the artifact is missing or
+was built from other JSON or code they fall back to the JSON, so forgetting
+this step only costs startup time.
+
+Usage:
+    python scripts/build_registry.py
+    python scripts/build_registry.py --check   # exit 1 if the artifact is stale
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.styles.registry import (
+    _ARTIFACT_PATH,
+    _REGISTRY_PATH,
+    _load_artifact,
+    compile_registry,
+    registry_version,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Only check that the artifact is up to date")
+    args = parser.parse_args()
+
+    raw = _REGISTRY_PATH.read_bytes()
+    if args.check:
+        version = registry_version(raw)
+        if _load_artifact(version) is None:
+            print(f"❌ {_ARTIFACT_PATH.name} is missing or stale (registry {version})")
+            sys.exit(1)
+        print(f"✅ {_ARTIFACT_PATH.name} is up to date (registry {version})")
+        return
+
+    start = time.perf_counter()
+    try:
+        index = compile_registry(raw)
+    except ValueError as e:
+        print(f"❌ Invalid registry: {e}")
+        sys.exit(1)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"✅ Compiled registry {index.version}: {len(index.styles)} styles, "
+          f"{len(index.style_texts)} style texts -> {_ARTIFACT_PATH} "
+          f"({_ARTIFACT_PATH.stat().st_size // 1024} KiB, {elapsed:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Publish a style registry to Redis.
+
+Processes running with STYLE_REGISTRY_REDIS=true pick it up within
+STYLE_REGISTRY_RELOAD_INTERVAL seconds, without a deploy or restart. The file
+is validated first; an invalid registry is never published.
+
+Usage:
+    python scripts/publish_style_registry.py
+    python scripts/publish_style_registry.py path/to/registry.json
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.styles.registry import _REGISTRY_PATH, publish_registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=str(_REGISTRY_PATH), help="Registry JSON file")
+    args = parser.parse_args()
+
+    try:
+        version = publish_registry(Path(args.path).read_bytes())
+    except ValueError as e:
+        print(f"❌ Invalid registry: {e}")
+        sys.exit(1)
+    print(f"✅ Published style registry {version}")
+
+
+if __name__ == "__main__":
+    main()
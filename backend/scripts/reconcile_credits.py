@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Reconcile profile credit balances against the transactions ledger.
+
+Reports profiles whose credits / credits_reserved / total_credits_spent differ
+from the ledger, and reservations no queued or processing job accounts for.
+Dry run by default.
+
+Usage:
+    python scripts/reconcile_credits.py
+    python scripts/reconcile_credits.py --output mismatches.csv
+    python scripts/reconcile_credits.py --apply --release-stuck
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.supabase_client import get_supabase_client
+from app.utils.reconciliation import (
+    run_reconciliation,
+    apply_corrections,
+    release_stuck_reservations,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=1000, help="Rows fetched per request (Supabase returns at most 1000)")
+    parser.add_argument("--apply", action="store_true", help="Set mismatched profiles to their ledger balances")
+    parser.add_argument("--release-stuck", action="store_true", help="Release stuck reservations (writes refund rows)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Profiles per correction RPC")
+    parser.add_argument("--output", help="Write mismatches to this CSV file")
+    parser.add_argument("--show", type=int, default=20, help="Rows of each report to print")
+    args = parser.parse_args()
+
+    client = get_supabase_client()
+    report = run_reconciliation(client, page_size=args.page_size)
+
+    print(f"Scanned {report.transactions_scanned} ledger rows, {report.profiles_checked} profiles "
+          f"in {report.elapsed:.1f}s (skipped {report.skipped_active} active during the run)")
+
+    print(f"\n⚠️  {len(report.mismatches)} profile(s) disagree with the ledger")
+    if not report.mismatches.empty:
+        print(report.mismatches.head(args.show).to_string())
+
+    print(f"\n🔒 {len(report.stuck_reservations)} stuck reservation(s), "
+          f"{int(report.stuck_reservations['stuck'].sum()) if not report.stuck_reservations.empty else 0} credits")
+    if not report.stuck_reservations.empty:
+        print(report.stuck_reservations.head(args.show).to_string())
+
+    if args.output:
+        report.mismatches.to_csv(args.output, index_label="user_id")
+        print(f"\nMismatches written to {args.output}")
+
+    stuck = report.stuck_reservations
+    if args.apply and not report.mismatches.empty:
+        updated = apply_corrections(client, report.mismatches, batch_size=args.batch_size)
+        print(f"\n✅ Corrected {len(updated)}/{len(report.mismatches)} profile(s)")
+        # Corrected profiles now hold the ledger's reserved credits
+        corrected = stuck.index.intersection(updated)
+        stuck = stuck.copy()
+        stuck.loc[corrected, "observed_credits_reserved"] = stuck.loc[corrected, "credits_reserved"]
+
+    if args.release_stuck and not stuck.empty:
+        released = release_stuck_reservations(client, stuck, batch_size=args.batch_size)
+        print(f"✅ Released {len(released)}/{len(stuck)} reservation(s)")
+        skipped = stuck.loc[stuck.index.difference(released)]
+        if not skipped.empty:
+            print(f"⚠️  {len(skipped)} skipped (profile changed since the scan, or reserved below the stuck amount):")
+            print(skipped.head(args.show).to_string())
+
+    if not (args.apply or args.release_stuck) and not (report.mismatches.empty and report.stuck_reservations.empty):
+        print("\nDry run: pass --apply and/or --release-stuck to fix")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ export OBJC_DISABLE_INITIALIZE_FORK_SAFETY=YES
 
 for i in $(seq 1 $NUM_WORKERS); do
     echo "Starting worker $i..."
-    rq worker music_generation --url "$REDIS_URL" &
+    rq worker music_generation media_postprocess --url "$REDIS_URL" --worker-class app.workers.rq_worker.MusicWorker &
 done
 
 echo "All workers started. Press Ctrl+C to stop."
@@ -0,0 +1,17 @@
+-- Migration: Store generated media in our own storage (app.workers.ingest_worker)
+-- Run this on Supabase SQL editor
+
+-- Public bucket for ingested mp3s, covers and video clips
+insert into storage.buckets (id, name, public)
+values ('generated-media', 'generated-media', true)
+on conflict (id) do nothing;
+
+-- Public read (share pages and players link to these files); writes use the service key
+create policy "Public can read generated media"
+on storage.objects for select
+to public
+using ( bucket_id = 'generated-media' );
+
+-- SHA-256 of the stored mp3, and when all of a track's assets were copied
+ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS storage_checksum TEXT;
+ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS ingested_at TIMESTAMPTZ;
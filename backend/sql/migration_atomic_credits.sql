@@ -0,0 +1,106 @@
+-- Migration: Atomic credit operations
+-- Run this on Supabase SQL editor
+--
+-- Each function performs the conditional balance update and the ledger insert
+-- in a single statement (one REST round trip, no read-modify-write race).
+-- Modelled on add_credits_atomic in schema_payments.sql.
+--
+-- Returns the inserted transactions row as JSON, or NULL when the balance
+-- check fails (profile not found or insufficient credits).
+
+-- Move credits from available to reserved before a generation
+CREATE OR REPLACE FUNCTION reserve_credits_atomic(
+    p_user_id uuid,
+    p_amount integer,
+    p_metadata jsonb DEFAULT '{}'::jsonb
+) RETURNS jsonb AS $$
+    WITH updated AS (
+        UPDATE profiles
+        SET credits_reserved = credits_reserved + p_amount
+        WHERE id = p_user_id
+          AND credits - credits_reserved >= p_amount
+        RETURNING id
+    ), ledger AS (
+        INSERT INTO transactions (user_id, type, amount, status, metadata)
+        SELECT id, 'reserve', p_amount, 'completed', p_metadata
+        FROM updated
+        RETURNING *
+    )
+    SELECT to_jsonb(ledger) FROM ledger;
+$$ LANGUAGE sql;
+
+-- Spend credits, either from a prior reservation or directly from available credits
+CREATE OR REPLACE FUNCTION debit_credits_atomic(
+    p_user_id uuid,
+    p_amount integer,
+    p_from_reserved boolean DEFAULT true,
+    p_metadata jsonb DEFAULT '{}'::jsonb
+) RETURNS jsonb AS $$
+    WITH updated AS (
+        UPDATE profiles
+        SET credits = credits - p_amount,
+            credits_reserved = credits_reserved - CASE WHEN p_from_reserved THEN p_amount ELSE 0 END,
+            total_credits_spent = total_credits_spent + p_amount
+        WHERE id = p_user_id
+          AND CASE
+                WHEN p_from_reserved THEN credits_reserved >= p_amount
+                ELSE credits - credits_reserved >= p_amount
+              END
+        RETURNING id
+    ), ledger AS (
+        INSERT INTO transactions (user_id, type, amount, status, metadata)
+        SELECT id, 'debit', p_amount, 'completed',
+               p_metadata || jsonb_build_object('from_reserved', p_from_reserved)
+        FROM updated
+        RETURNING *
+    )
+    SELECT to_jsonb(ledger) FROM ledger;
+$$ LANGUAGE sql;
+
+-- Give credits back: release a reservation (p_from_reserved = true)
+-- or re-credit a direct debit such as a failed video clip (p_from_reserved = false)
+CREATE OR REPLACE FUNCTION refund_credits_atomic(
+    p_user_id uuid,
+    p_amount integer,
+    p_from_reserved boolean DEFAULT true,
+    p_metadata jsonb DEFAULT '{}'::jsonb
+) RETURNS jsonb AS $$
+    WITH updated AS (
+        UPDATE profiles
+        SET credits_reserved = credits_reserved - CASE WHEN p_from_reserved THEN p_amount ELSE 0 END,
+            credits = credits + CASE WHEN p_from_reserved THEN 0 ELSE p_amount END
+        WHERE id = p_user_id
+          AND (NOT p_from_reserved OR credits_reserved >= p_amount)
+        RETURNING id
+    ), ledger AS (
+        INSERT INTO transactions (user_id, type, amount, status, metadata)
+        SELECT id, 'refund', p_amount, 'completed',
+               p_metadata || jsonb_build_object('from_reserved', p_from_reserved)
+        FROM updated
+        RETURNING *
+    )
+    SELECT to_jsonb(ledger) FROM ledger;
+$$ LANGUAGE sql;
+
+-- Record a completed credit purchase
+CREATE OR REPLACE FUNCTION purchase_credits_atomic(
+    p_user_id uuid,
+    p_amount integer,
+    p_price numeric,
+    p_payment_provider text,
+    p_payment_id text
+) RETURNS jsonb AS $$
+    WITH updated AS (
+        UPDATE profiles
+        SET credits = credits + p_amount
+        WHERE id = p_user_id
+        RETURNING id
+    ), ledger AS (
+        INSERT INTO transactions (user_id, type, amount, price, payment_provider, payment_id, status, metadata)
+        SELECT id, 'purchase', p_amount, p_price, p_payment_provider, p_payment_id, 'completed',
+               jsonb_build_object('payment_provider', p_payment_provider, 'payment_id', p_payment_id)
+        FROM updated
+        RETURNING *
+    )
+    SELECT to_jsonb(ledger) FROM ledger;
+$$ LANGUAGE sql;
@@ -0,0 +1,66 @@
+-- Migration: Credit reconciliation corrections
+-- Run this on Supabase SQL editor
+--
+-- Batched correction RPCs used by scripts/reconcile_credits.py.
+-- Both are compare-and-set: a profile is only touched if it still holds the
+-- values the reconciler read, so a concurrent credit operation is never lost.
+-- Each returns the ids of the profiles updated; the caller reports the others
+-- as skipped.
+
+-- Earlier versions returned a count: the return type can't be replaced in place
+DROP FUNCTION IF EXISTS apply_credit_corrections(jsonb);
+DROP FUNCTION IF EXISTS release_stuck_reservations(jsonb);
+
+-- Set profile balances to the values derived from the ledger
+CREATE OR REPLACE FUNCTION apply_credit_corrections(
+    p_corrections jsonb
+) RETURNS SETOF uuid AS $$
+    WITH updated AS (
+        UPDATE profiles p
+        SET credits = c.credits,
+            credits_reserved = c.credits_reserved,
+            total_credits_spent = c.total_credits_spent
+        FROM jsonb_to_recordset(p_corrections) AS c(
+            user_id uuid,
+            credits integer,
+            credits_reserved integer,
+            total_credits_spent integer,
+            observed_credits integer,
+            observed_credits_reserved integer,
+            observed_total_credits_spent integer
+        )
+        WHERE p.id = c.user_id
+          AND p.credits = c.observed_credits
+          AND p.credits_reserved = c.observed_credits_reserved
+          AND p.total_credits_spent = c.observed_total_credits_spent
+        RETURNING p.id
+    )
+    SELECT id FROM updated;
+$$ LANGUAGE sql;
+
+-- Release reservations no live job accounts for, with a refund ledger row each
+CREATE OR REPLACE FUNCTION release_stuck_reservations(
+    p_releases jsonb
+) RETURNS SETOF uuid AS $$
+    WITH updated AS (
+        UPDATE profiles p
+        SET credits_reserved = p.credits_reserved - r.amount
+        FROM jsonb_to_recordset(p_releases) AS r(
+            user_id uuid,
+            amount integer,
+            observed_credits_reserved integer
+        )
+        WHERE p.id = r.user_id
+          AND r.amount > 0
+          AND p.credits_reserved = r.observed_credits_reserved
+          AND p.credits_reserved >= r.amount
+        RETURNING p.id, r.amount
+    ), ledger AS (
+        INSERT INTO transactions (user_id, type, amount, status, metadata)
+        SELECT id, 'refund', amount, 'completed',
+               jsonb_build_object('reason', 'stuck_reservation', 'from_reserved', true)
+        FROM updated
+        RETURNING user_id
+    )
+    SELECT user_id FROM ledger;
+$$ LANGUAGE sql;
@@ -0,0 +1,56 @@
+-- Migration: Ledger write-behind for the Redis hot wallet (CREDITS_HOT_WALLET=true)
+-- Run this on Supabase SQL editor
+--
+-- apply_wallet_ledger inserts a batch of ledger entries queued by
+-- app/utils/hot_wallet.py and applies their balance deltas to profiles,
+-- in one statement. Entries carry their own transaction id, so re-sending
+-- a batch (after a crashed flush) is a no-op: only newly inserted rows
+-- contribute deltas.
+--
+-- p_entries: [{"id", "user_id", "type", "amount", "status", "metadata",
+--              "created_at", "d_credits", "d_reserved", "d_spent"}, ...]
+-- Returns the number of entries applied.
+
+CREATE OR REPLACE FUNCTION apply_wallet_ledger(
+    p_entries jsonb
+) RETURNS integer AS $$
+    WITH entries AS (
+        SELECT *
+        FROM jsonb_to_recordset(p_entries) AS e(
+            id uuid,
+            user_id uuid,
+            type text,
+            amount integer,
+            status text,
+            metadata jsonb,
+            created_at timestamptz,
+            d_credits integer,
+            d_reserved integer,
+            d_spent integer
+        )
+    ), inserted AS (
+        INSERT INTO transactions (id, user_id, type, amount, status, metadata, created_at)
+        SELECT id, user_id, type, amount, status, metadata, created_at
+        FROM entries
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id
+    ), deltas AS (
+        SELECT e.user_id,
+               sum(e.d_credits) AS d_credits,
+               sum(e.d_reserved) AS d_reserved,
+               sum(e.d_spent) AS d_spent,
+               count(*) AS applied
+        FROM entries e
+        JOIN inserted i ON i.id = e.id
+        GROUP BY e.user_id
+    ), updated AS (
+        UPDATE profiles p
+        SET credits = p.credits + d.d_credits,
+            credits_reserved = p.credits_reserved + d.d_reserved,
+            total_credits_spent = p.total_credits_spent + d.d_spent
+        FROM deltas d
+        WHERE p.id = d.user_id
+        RETURNING d.applied
+    )
+    SELECT coalesce(sum(applied), 0)::integer FROM updated;
+$$ LANGUAGE sql;
@@ -0,0 +1,13 @@
+-- Migration: Background payment reconciler
+-- Run this on Supabase SQL editor
+
+-- Stale pending payments are marked 'expired' (previously rejected by the check)
+ALTER TABLE transactions DROP CONSTRAINT IF EXISTS transactions_status_check;
+ALTER TABLE transactions ADD CONSTRAINT transactions_status_check check (
+  status = any (array['pending'::text, 'completed'::text, 'failed'::text, 'expired'::text])
+);
+
+-- The reconciler loads pending purchases oldest first every few seconds
+CREATE INDEX IF NOT EXISTS idx_transactions_pending
+  ON transactions USING btree (created_at)
+  WHERE status = 'pending';
@@ -0,0 +1,103 @@
+-- Migration: Stale generation sweeper
+-- Run this on Supabase SQL editor
+--
+-- Used by app.workers.maintenance_worker. A worker that dies (OOM, deploy,
+-- RQ timeout) before its except path leaves its job 'processing', the
+-- project 'generating' and the credits reserved. This fails up to p_limit
+-- such jobs whose processing started before p_cutoff in one statement,
+-- fails their projects and, unless the hot wallet owns balances
+-- (p_release_credits = false), releases their reservations with a refund
+-- ledger row per job.
+--
+-- 'queued' jobs are never swept: they may simply be waiting in a long RQ
+-- backlog, and the worker claims them (queued -> processing, started_at)
+-- with a conditional update before running them.
+--
+-- Returns {"jobs": [{id, user_id, project_id, credits_cost, released}],
+--          "projects": <projects failed with no live job>}.
+
+-- Set by the worker when it claims the job
+ALTER TABLE generation_jobs ADD COLUMN IF NOT EXISTS started_at TIMESTAMPTZ;
+
+CREATE OR REPLACE FUNCTION sweep_stale_generations(
+    p_cutoff timestamptz,
+    p_limit integer DEFAULT 500,
+    p_release_credits boolean DEFAULT true
+) RETURNS jsonb AS $$
+    WITH stale AS (
+        SELECT id FROM generation_jobs
+        WHERE status = 'processing'
+          -- Jobs claimed before started_at existed fall back to created_at
+          AND coalesce(started_at, created_at) < p_cutoff
+        ORDER BY coalesce(started_at, created_at)
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ), failed AS (
+        UPDATE generation_jobs j
+        SET status = 'failed',
+            error_message = 'Generation interrupted, credits refunded',
+            completed_at = now()
+        FROM stale
+        WHERE j.id = stale.id
+          AND j.status = 'processing'
+        RETURNING j.id, j.user_id, j.project_id, j.credits_cost
+    ), owed AS (
+        SELECT user_id, sum(credits_cost)::integer AS amount
+        FROM failed
+        WHERE p_release_credits
+        GROUP BY user_id
+    ), released AS (
+        UPDATE profiles p
+        SET credits_reserved = p.credits_reserved - owed.amount
+        FROM owed
+        WHERE p.id = owed.user_id
+          AND p.credits_reserved >= owed.amount
+        RETURNING p.id
+    ), ledger AS (
+        INSERT INTO transactions (user_id, type, amount, status, metadata)
+        SELECT f.user_id, 'refund', f.credits_cost, 'completed',
+               jsonb_build_object('reason', 'stale_job_swept', 'job_id', f.id, 'from_reserved', true)
+        FROM failed f
+        JOIN released r ON r.id = f.user_id
+        RETURNING user_id
+    ), job_projects AS (
+        UPDATE projects p
+        SET status = 'failed'
+        FROM failed
+        WHERE p.id = failed.project_id
+          AND p.status = 'generating'
+        RETURNING p.id
+    ), orphaned_projects AS (
+        -- Projects left 'generating' after their job ended (or was never created)
+        UPDATE projects p
+        SET status = 'failed'
+        WHERE p.status = 'generating'
+          AND p.updated_at < p_cutoff
+          AND NOT EXISTS (
+              SELECT 1 FROM generation_jobs j
+              WHERE j.project_id = p.id
+                AND j.status IN ('queued', 'processing')
+          )
+          AND NOT EXISTS (SELECT 1 FROM failed WHERE failed.project_id = p.id)
+        RETURNING p.id
+    )
+    SELECT jsonb_build_object(
+        'jobs', coalesce((
+            SELECT jsonb_agg(jsonb_build_object(
+                'id', f.id,
+                'user_id', f.user_id,
+                'project_id', f.project_id,
+                'credits_cost', f.credits_cost,
+                'released', EXISTS (SELECT 1 FROM released r WHERE r.id = f.user_id)
+            ))
+            FROM failed f
+        ), '[]'::jsonb),
+        'projects', (SELECT count(*) FROM orphaned_projects)
+    );
+$$ LANGUAGE sql;
+
+-- The sweeper looks up processing jobs by the time they started
+DROP INDEX IF EXISTS idx_jobs_live_created_at;
+CREATE INDEX IF NOT EXISTS idx_jobs_processing_started_at
+  ON generation_jobs USING btree (coalesce(started_at, created_at))
+  WHERE status = 'processing';
@@ -0,0 +1,139 @@
+-- Migration: Wallet history and ledger balance snapshots
+-- Run this on Supabase SQL editor
+
+-- Keyset pagination of a user's ledger (GET /users/wallet/history)
+CREATE INDEX IF NOT EXISTS idx_transactions_user_created
+  ON transactions USING btree (user_id, created_at DESC, id DESC);
+
+-- Per-user running totals of completed ledger rows created before as_of.
+-- Maintained incrementally by snapshot_wallet_balances(), so computing a
+-- balance from the ledger only scans rows newer than the snapshot.
+--
+-- "from reserved" debits/refunds move credits_reserved; the others move the
+-- balance directly (lyrics, video clips). Rows written before the atomic
+-- credit RPCs carry no from_reserved flag and are classified from metadata.
+CREATE TABLE IF NOT EXISTS wallet_balance_snapshots (
+  user_id uuid PRIMARY KEY REFERENCES profiles(id) ON DELETE CASCADE,
+  as_of timestamptz NOT NULL,
+  credits_purchased bigint NOT NULL DEFAULT 0,
+  credits_reserved bigint NOT NULL DEFAULT 0,
+  credits_debited bigint NOT NULL DEFAULT 0,
+  credits_debited_from_reserved bigint NOT NULL DEFAULT 0,
+  credits_released bigint NOT NULL DEFAULT 0,
+  credits_refunded bigint NOT NULL DEFAULT 0,
+  transaction_count bigint NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE wallet_balance_snapshots ENABLE ROW LEVEL SECURITY;
+
+-- Ledger totals for a set of rows (shared by the snapshot job and wallet_ledger_balance)
+CREATE OR REPLACE FUNCTION wallet_ledger_totals(
+    p_user_id uuid,
+    p_from timestamptz,
+    p_to timestamptz
+) RETURNS TABLE (
+    credits_purchased bigint,
+    credits_reserved bigint,
+    credits_debited bigint,
+    credits_debited_from_reserved bigint,
+    credits_released bigint,
+    credits_refunded bigint,
+    transaction_count bigint
+) AS $$
+    SELECT
+        coalesce(sum(amount) FILTER (WHERE type = 'purchase'), 0),
+        coalesce(sum(amount) FILTER (WHERE type = 'reserve'), 0),
+        coalesce(sum(amount) FILTER (WHERE type = 'debit'), 0),
+        coalesce(sum(amount) FILTER (
+            WHERE type = 'debit'
+              AND coalesce((metadata->>'from_reserved')::boolean, metadata->>'action' IS NULL)
+        ), 0),
+        coalesce(sum(amount) FILTER (
+            WHERE type = 'refund'
+              AND coalesce((metadata->>'from_reserved')::boolean, coalesce(metadata->>'reason', '') NOT LIKE 'video%')
+        ), 0),
+        coalesce(sum(amount) FILTER (
+            WHERE type = 'refund'
+              AND NOT coalesce((metadata->>'from_reserved')::boolean, coalesce(metadata->>'reason', '') NOT LIKE 'video%')
+        ), 0),
+        count(*)
+    FROM transactions
+    WHERE user_id = p_user_id
+      AND status = 'completed'
+      AND created_at >= p_from
+      AND created_at < p_to;
+$$ LANGUAGE sql STABLE;
+
+-- Advance every user's snapshot to now() - p_lag.
+-- A user's snapshot never moves past their oldest pending transaction, so a
+-- purchase completed later is still counted. Returns the number of users updated.
+CREATE OR REPLACE FUNCTION snapshot_wallet_balances(
+    p_lag interval DEFAULT interval '5 minutes'
+) RETURNS integer AS $$
+DECLARE
+    v_cutoff timestamptz := now() - p_lag;
+    v_count integer;
+BEGIN
+    WITH frontier AS (
+        SELECT t.user_id,
+               coalesce(s.as_of, '-infinity'::timestamptz) AS prev_as_of,
+               least(v_cutoff, coalesce(min(t.created_at) FILTER (WHERE t.status = 'pending'), v_cutoff)) AS as_of
+        FROM transactions t
+        LEFT JOIN wallet_balance_snapshots s ON s.user_id = t.user_id
+        WHERE t.created_at >= coalesce(s.as_of, '-infinity'::timestamptz)
+          AND t.created_at < v_cutoff
+        GROUP BY t.user_id, s.as_of
+    )
+    INSERT INTO wallet_balance_snapshots AS s (
+        user_id, as_of, credits_purchased, credits_reserved, credits_debited,
+        credits_debited_from_reserved, credits_released, credits_refunded, transaction_count, updated_at
+    )
+    SELECT f.user_id, f.as_of, d.credits_purchased, d.credits_reserved, d.credits_debited,
+           d.credits_debited_from_reserved, d.credits_released, d.credits_refunded, d.transaction_count, now()
+    FROM frontier f
+    CROSS JOIN LATERAL wallet_ledger_totals(f.user_id, f.prev_as_of, f.as_of) d
+    WHERE f.as_of > f.prev_as_of
+    ON CONFLICT (user_id) DO UPDATE SET
+        as_of = EXCLUDED.as_of,
+        credits_purchased = s.credits_purchased + EXCLUDED.credits_purchased,
+        credits_reserved = s.credits_reserved + EXCLUDED.credits_reserved,
+        credits_debited = s.credits_debited + EXCLUDED.credits_debited,
+        credits_debited_from_reserved = s.credits_debited_from_reserved + EXCLUDED.credits_debited_from_reserved,
+        credits_released = s.credits_released + EXCLUDED.credits_released,
+        credits_refunded = s.credits_refunded + EXCLUDED.credits_refunded,
+        transaction_count = s.transaction_count + EXCLUDED.transaction_count,
+        updated_at = now();
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Balance derived from the ledger: latest snapshot + rows created since.
+CREATE OR REPLACE FUNCTION wallet_ledger_balance(
+    p_user_id uuid
+) RETURNS jsonb AS $$
+    WITH snap AS (
+        SELECT * FROM wallet_balance_snapshots WHERE user_id = p_user_id
+        UNION ALL
+        SELECT p_user_id, '-infinity'::timestamptz, 0, 0, 0, 0, 0, 0, 0, now()
+        WHERE NOT EXISTS (SELECT 1 FROM wallet_balance_snapshots WHERE user_id = p_user_id)
+    ), tail AS (
+        SELECT d.*
+        FROM snap
+        CROSS JOIN LATERAL wallet_ledger_totals(p_user_id, snap.as_of, 'infinity'::timestamptz) d
+    )
+    SELECT jsonb_build_object(
+        'snapshot_as_of', CASE WHEN snap.as_of = '-infinity'::timestamptz THEN NULL ELSE snap.as_of END,
+        'credits', snap.credits_purchased + tail.credits_purchased
+                 + snap.credits_refunded + tail.credits_refunded
+                 - snap.credits_debited - tail.credits_debited,
+        'credits_reserved', snap.credits_reserved + tail.credits_reserved
+                 - snap.credits_debited_from_reserved - tail.credits_debited_from_reserved
+                 - snap.credits_released - tail.credits_released,
+        'total_credits_spent', snap.credits_debited + tail.credits_debited,
+        'transaction_count', snap.transaction_count + tail.transaction_count
+    )
+    FROM snap, tail;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,5 @@
+-- Migration: Waveform peaks of generated tracks (app.utils.waveform)
+-- Run this on Supabase SQL editor
+
+-- Min/max peaks at several resolutions, written by app.workers.analysis_worker
+ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS waveform_peaks BYTEA;
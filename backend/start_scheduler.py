@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Scheduler starter script.
+
+Runs periodic background tasks (payment webhook queue, pending payment
+reconciliation, stale record sweeps, wallet snapshots, hot wallet ledger flush and reconciliation).
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.workers.scheduler import run_scheduler
+
+
+def main():
+    """Start the periodic task loop."""
+    print("⏰ MusicApp Scheduler Starting...")
+    print("=" * 60)
+    run_scheduler()
+
+
+if __name__ == "__main__":
+    main()
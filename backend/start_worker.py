@@ -13,9 +13,10 @@ backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
 from redis import Redis
-from rq import Worker, Queue
+from rq import Queue
 
 from app.config import settings
+from app.workers.rq_worker import MusicWorker
 
 def main():
     """Start RQ worker."""
@@ -26,15 +27,15 @@ def main():
     # Connect to Redis
     redis_conn = Redis.from_url(settings.REDIS_URL)
     
-    # Listen to queue
-    queue = Queue("music_generation", connection=redis_conn)
+    # Listen to queues, in priority order (generations before post-processing)
+    queues = [Queue(name, connection=redis_conn) for name in ("music_generation", "media_postprocess")]
     
-    print(f"Listening to queue: music_generation")
+    # Start worker (loads the style registry before forking job horses)
+    worker = MusicWorker(queues, connection=redis_conn)
+    print("Listening to queues: music_generation, media_postprocess")
     print("Worker ready! Waiting for jobs...")
     print("=" * 60)
     
-    # Start worker
-    worker = Worker([queue], connection=redis_conn)
     worker.work()
 
 
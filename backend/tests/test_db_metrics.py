@@ -0,0 +1,72 @@
+"""
+Tests for Supabase query accounting (no network: the HTTP session is stubbed).
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import requests
+
+from app.supabase_client import SupabaseClient
+from app.utils.db_metrics import get_query_metrics, query_scope, reset_query_metrics
+
+
+class _StubSession(requests.Session):
+    """Session answering every request with a single empty row."""
+
+    def request(self, method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"[{}]"
+        response.request = requests.Request(method, url, json=kwargs.get("json")).prepare()
+        return response
+
+
+def _client() -> SupabaseClient:
+    client = SupabaseClient("http://supabase.test", "key")
+    client.session = _StubSession()
+    return client
+
+
+def test_round_trips_attributed_to_scope():
+    reset_query_metrics()
+    client = _client()
+
+    with query_scope("POST /api/v1/generate/", budget=2) as scope:
+        client.select("projects", filters={"id": "p1"})
+        client.update("projects", {"status": "generating"}, {"id": "p1"})
+        client.insert("generation_jobs", {"id": "j1"})
+
+    assert scope.round_trips == 3
+    metrics = get_query_metrics()
+    endpoint = metrics["endpoints"]["POST /api/v1/generate/"]
+    assert endpoint["calls"] == 1
+    assert endpoint["round_trips_total"] == 3
+    assert endpoint["over_budget"] == 1
+    assert metrics["tables"]["select projects"]["count"] == 1
+    assert endpoint["bytes_sent"] > 0
+
+
+def test_n_plus_one_detected():
+    reset_query_metrics()
+    client = _client()
+
+    with query_scope("job:test", n_plus_one_threshold=3) as scope:
+        for i in range(4):
+            client.select("audio_files", filters={"id": str(i)})
+
+    assert scope.repeated_queries() == [(("audio_files", "select"), 4)]
+    assert get_query_metrics()["endpoints"]["job:test"]["n_plus_one"] == 1
+
+
+def test_calls_outside_scope_only_count_per_table():
+    reset_query_metrics()
+    _client().delete("transactions", {"id": "t1"})
+
+    metrics = get_query_metrics()
+    assert metrics["endpoints"] == {}
+    assert metrics["tables"]["delete transactions"]["count"] == 1
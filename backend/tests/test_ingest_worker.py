@@ -0,0 +1,97 @@
+"""
+Tests for generated media ingestion, against the local storage backend.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.asset_storage import LocalStorage
+from app.workers import ingest_worker
+
+AUDIO = b"ID3" + bytes(range(256)) * 2000
+COVER = b"\xff\xd8" + b"jpeg" * 1000
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+
+    def select(self, table, columns="*", filters=None, order=None, limit=None):
+        return self.rows
+
+    def update(self, table, data, filters, returning="representation"):
+        self.updates.append((filters["id"], data))
+        return []
+
+
+def test_assets_are_copied_verified_and_urls_rewritten(tmp_path, monkeypatch):
+    flaky = {"cover": 1}
+
+    def origin(request):
+        if request.url.path.endswith(".mp3"):
+            return httpx.Response(200, headers={"content-type": "audio/mpeg"}, content=AUDIO)
+        if flaky["cover"]:
+            flaky["cover"] -= 1
+            return httpx.Response(503)
+        return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=COVER)
+
+    client = FakeSupabase([{
+        "id": "af1", "project_id": "p1", "video_url": None,
+        "file_url": "https://cdn.example/a.mp3", "image_url": "https://cdn.example/a.jpg",
+    }])
+    monkeypatch.setattr(ingest_worker, "get_supabase_client", lambda: client)
+    monkeypatch.setattr(ingest_worker, "publish_share_payload", lambda client, project_id: None)
+    monkeypatch.setattr(ingest_worker.settings, "ASSET_INGEST_RETRIES", 2)
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(ingest_worker.asyncio, "sleep", lambda seconds: real_sleep(0))
+
+    storage = LocalStorage(str(tmp_path), "http://assets.test")
+    asyncio.run(ingest_worker._ingest_assets_impl(["af1"], storage, httpx.MockTransport(origin)))
+
+    [(audio_file_id, data)] = client.updates
+    assert audio_file_id == "af1"
+    assert data["file_url"] == data["stream_url"] == "http://assets.test/p1/af1/audio.mp3"
+    assert data["image_url"] == "http://assets.test/p1/af1/cover.jpg"
+    assert data["ingested_at"]
+    assert (tmp_path / "p1/af1/audio.mp3").read_bytes() == AUDIO
+    assert (tmp_path / "p1/af1/cover.jpg").read_bytes() == COVER
+
+
+def test_retry_backoff_does_not_hold_a_transfer_slot(tmp_path, monkeypatch):
+    requests = []
+    flaky = {"audio": 1}
+
+    def origin(request):
+        requests.append(request.url.path)
+        if request.url.path.endswith(".mp3"):
+            if flaky["audio"]:
+                flaky["audio"] -= 1
+                return httpx.Response(503)
+            return httpx.Response(200, headers={"content-type": "audio/mpeg"}, content=AUDIO)
+        return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=COVER)
+
+    client = FakeSupabase([{
+        "id": "af1", "project_id": "p1", "video_url": None,
+        "file_url": "https://cdn.example/a.mp3", "image_url": "https://cdn.example/a.jpg",
+    }])
+    monkeypatch.setattr(ingest_worker, "get_supabase_client", lambda: client)
+    monkeypatch.setattr(ingest_worker, "publish_share_payload", lambda client, project_id: None)
+    monkeypatch.setattr(ingest_worker.settings, "ASSET_INGEST_RETRIES", 2)
+    monkeypatch.setattr(ingest_worker.settings, "ASSET_INGEST_CONCURRENCY", 1)
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(ingest_worker.asyncio, "sleep", lambda seconds: real_sleep(0))
+
+    storage = LocalStorage(str(tmp_path), "http://assets.test")
+    asyncio.run(ingest_worker._ingest_assets_impl(["af1"], storage, httpx.MockTransport(origin)))
+
+    # The cover is fetched while the audio waits to retry
+    assert requests == ["/a.mp3", "/a.jpg", "/a.mp3"]
+    assert client.updates[0][1]["file_url"] == "http://assets.test/p1/af1/audio.mp3"
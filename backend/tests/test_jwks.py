@@ -0,0 +1,93 @@
+"""
+Tests for the JWKS manager (mock transport, no network).
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk, jwt
+
+from app.jwks import JWKSManager
+from app.jwt_verifiers import BACKENDS, TokenError, create_verifier
+
+
+def _signing_key(kid):
+    pem = ec.generate_private_key(ec.SECP256R1()).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public = jwk.construct(pem, algorithm="ES256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "use": "sig", "alg": "ES256"}
+
+
+class _JWKSServer:
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.requests = 0
+
+    def handler(self, request):
+        self.requests += 1
+        return httpx.Response(200, json={"keys": self.keys})
+
+
+def _manager(server, **kwargs):
+    return JWKSManager("https://example.test/jwks.json", transport=httpx.MockTransport(server.handler), **kwargs)
+
+
+def test_keys_are_fetched_once_and_verify_tokens():
+    pem, public = _signing_key("k1")
+    server = _JWKSServer(public)
+    manager = _manager(server)
+    token = jwt.encode({"sub": "user-1"}, pem, algorithm="ES256", headers={"kid": "k1"})
+
+    async def verify_many():
+        keys = await asyncio.gather(*(manager.get_key("k1") for _ in range(20)))
+        return [jwt.decode(token, key, algorithms=["ES256"])["sub"] for key in keys]
+
+    assert asyncio.run(verify_many()) == ["user-1"] * 20
+    assert server.requests == 1
+
+
+def test_unknown_kid_refetches_once_per_interval():
+    _, old = _signing_key("old")
+    _, new = _signing_key("new")
+    server = _JWKSServer(old)
+    manager = _manager(server, miss_refetch_interval=60)
+
+    async def scenario():
+        assert await manager.get_key("old") is not None
+        server.keys.append(new)  # rotation after the first fetch
+        manager._attempted_at -= 60
+        found = await manager.get_key("new")
+        missing = [await manager.get_key("bogus") for _ in range(5)]
+        return found, missing
+
+    found, missing = asyncio.run(scenario())
+    assert found is not None
+    assert missing == [None] * 5
+    assert server.requests == 2
+
+
+def test_backends_verify_and_reject_alike():
+    pem, public = _signing_key("k1")
+    token = jwt.encode({"sub": "user-1"}, pem, algorithm="ES256", headers={"kid": "k1"})
+    tampered = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+
+    for name in BACKENDS:
+        verifier = create_verifier(name)
+        key = verifier.load_jwk(public)
+        assert verifier.get_unverified_header(token)["kid"] == "k1"
+        assert verifier.decode(token, key, ["ES256"])["sub"] == "user-1"
+        for bad in (tampered, "not-a-token"):
+            try:
+                verifier.decode(bad, key, ["ES256"])
+            except TokenError:
+                continue
+            raise AssertionError(f"{name} accepted {bad!r}")
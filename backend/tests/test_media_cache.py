@@ -0,0 +1,98 @@
+"""
+Tests for the audio proxy disk cache.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.utils.media_cache import MediaCache, parse_range
+
+FILE_ID = "00000000-0000-0000-0000-00000000000{}"
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("bytes=abc", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+
+
+def test_concurrent_readers_share_one_download_and_lru_evicts(tmp_path):
+    body = bytes(range(256)) * 400
+    requests = []
+
+    async def origin(request):
+        requests.append(request.url)
+
+        async def chunks():
+            for i in range(0, len(body), 10000):
+                await asyncio.sleep(0)
+                yield body[i:i + 10000]
+        return httpx.Response(200, headers={"content-type": "audio/mpeg", "content-length": str(len(body))},
+                              content=chunks())
+
+    cache = MediaCache(str(tmp_path), max_bytes=len(body) + 1, chunk_size=4096,
+                       transport=httpx.MockTransport(origin))
+
+    async def read(file_id, start, end):
+        download = cache.in_progress(file_id) or cache.download(file_id, "https://cdn.example/a.mp3")
+        return b"".join([chunk async for chunk in cache.read_download(download, start, end)])
+
+    async def scenario():
+        full, part = await asyncio.gather(read(FILE_ID.format(1), 0, None), read(FILE_ID.format(1), 5000, 5099))
+        assert full == body and part == body[5000:5100]
+        assert len(requests) == 1
+        cached = cache.get(FILE_ID.format(1))
+        assert cached.size == len(body) and cached.content_type == "audio/mpeg"
+
+        await read(FILE_ID.format(2), 0, None)
+        assert cache.get(FILE_ID.format(1)) is None
+        assert [p.name for p in tmp_path.iterdir()] == [FILE_ID.format(2) + ".mp3"]
+
+    asyncio.run(scenario())
+
+
+def test_startup_scan_keeps_recent_partial_downloads(tmp_path):
+    complete = tmp_path / (FILE_ID.format(1) + ".mp3")
+    complete.write_bytes(b"x" * 10)
+    in_progress = tmp_path / (FILE_ID.format(2) + ".123-abcd1234.part")
+    in_progress.write_bytes(b"partial")
+    abandoned = tmp_path / (FILE_ID.format(3) + ".456-abcd1234.part")
+    abandoned.write_bytes(b"partial")
+    old = time.time() - 2 * 3600
+    os.utime(abandoned, (old, old))
+
+    cache = MediaCache(str(tmp_path), max_bytes=1000)
+    assert cache.get(FILE_ID.format(1)).size == 10
+    assert in_progress.exists() and not abandoned.exists()
+
+
+def test_processes_sharing_the_directory_write_separate_partial_files(tmp_path):
+    async def origin(request):
+        return httpx.Response(200, content=b"audio")
+
+    caches = [MediaCache(str(tmp_path), max_bytes=1000, transport=httpx.MockTransport(origin)) for _ in range(2)]
+
+    async def scenario():
+        downloads = [cache.download(FILE_ID.format(1), "https://cdn.example/a.mp3") for cache in caches]
+        assert downloads[0].part_path != downloads[1].part_path
+        for download in downloads:
+            await download.wait_done()
+
+    asyncio.run(scenario())
+    assert [p.name for p in tmp_path.iterdir()] == [FILE_ID.format(1) + ".mp3"]
@@ -0,0 +1,76 @@
+"""
+Tests for the pending payment reconciler (in-memory client, Flutterwave stubbed).
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.workers import payment_worker
+
+
+class _FakeClient:
+    """Pending transactions, served in keyset pages capped at `max_rows` like PostgREST."""
+
+    def __init__(self, rows, max_rows=100):
+        self.rows = rows
+        self.max_rows = max_rows
+
+    def select(self, table, columns="*", filters=None, order=None, limit=None, offset=None):
+        rows = sorted(self.rows, key=lambda r: r["id"])
+        for key, value in (filters or {}).items():
+            if isinstance(value, tuple):
+                rows = [r for r in rows if r[key] > value[1]]
+            else:
+                rows = [r for r in rows if r[key] == value]
+        return rows[:min(limit or self.max_rows, self.max_rows)]
+
+    def update(self, table, data, filters, returning="representation"):
+        return []
+
+
+def _pending(tx_id, method, age):
+    created_at = datetime.now(timezone.utc) - timedelta(seconds=age)
+    return {
+        "id": tx_id, "user_id": "u1", "type": "purchase", "status": "pending", "amount": 10, "price": 1000,
+        "metadata": {"payment_method": method}, "created_at": created_at.isoformat(),
+    }
+
+
+def test_card_backlog_does_not_starve_new_mobile_money_payments(monkeypatch):
+    # Abandoned card checkouts sort first by id and by age, and outnumber the batch
+    rows = [_pending(f"a-card-{n:03d}", "card", age=1800) for n in range(250)]
+    rows.append(_pending("z-momo", "mobile_money", age=10))
+    client = _FakeClient(rows)
+
+    checked, completed = [], []
+
+    async def check_all(transactions, concurrency):
+        checked.append([tx["id"] for tx in transactions])
+        return [
+            (tx, {"status": "successful" if tx["id"] == "z-momo" else "pending", "amount": 1000, "flw_id": 1})
+            for tx in transactions
+        ]
+
+    monkeypatch.setattr(payment_worker, "get_supabase_client", lambda: client)
+    monkeypatch.setattr(payment_worker, "_check_all", check_all)
+    monkeypatch.setattr(payment_worker, "complete_purchase_supabase",
+                        lambda client, tx_ref, payment_id: completed.append(tx_ref) or True)
+    monkeypatch.setattr(payment_worker, "publish_event", lambda *args, **kwargs: None)
+    monkeypatch.setattr(payment_worker.settings, "PAYMENT_RECONCILE_BATCH", 200)
+    monkeypatch.setattr(payment_worker, "_last_checked", {})
+
+    stats = payment_worker.reconcile_pending_payments()
+    assert stats["pending"] == 251
+    assert len(checked[0]) == 200 and checked[0][0] == "z-momo"
+    assert completed == ["z-momo"]
+
+    # The card rows left out are checked on the next pass
+    client.rows = [row for row in rows if row["id"] != "z-momo"]
+    payment_worker.reconcile_pending_payments()
+    assert len(checked[1]) == 51  # 250 card rows, 199 checked with the Mobile Money one
+    assert set(checked[0][1:]) | set(checked[1]) == {row["id"] for row in client.rows}
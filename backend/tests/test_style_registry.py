@@ -0,0 +1,143 @@
+"""
+Tests for the style registry index and precomputed prompts.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.styles import registry
+from app.styles.registry import (
+    _load_index,
+    build_prompt,
+    compose_style_text,
+    get_all_styles,
+    get_style_by_id,
+    get_styles_by_category,
+    match_styles,
+)
+
+
+def test_lookups_use_ids_aliases_and_categories():
+    styles = get_all_styles()
+    for style in styles:
+        assert get_style_by_id(style["id"]) is style
+        assert get_style_by_id(style["id"].replace("_", "-")) is style
+        assert style in get_styles_by_category(style["category"])
+    assert get_style_by_id("no-such-style") is None
+    assert get_styles_by_category("NOPE") == []
+    assert sum(len(get_styles_by_category(c)) for c in {s["category"] for s in styles}) == len(styles)
+
+
+def test_precomputed_style_text_matches_composition():
+    index = _load_index()
+    for style in get_all_styles():
+        for voice in (None, "male", "female"):
+            for language in ("fr", "en", "es"):
+                suffix = f":{voice}" if voice else ""
+                prompt = build_prompt(style["id"] + suffix, "la la", language)
+                assert prompt["style_text"] == compose_style_text(style, voice, language)
+                assert prompt["lyrics"] == "la la"
+        assert (style["id"], "male", "fr") in index.style_texts
+
+
+def test_voice_preference_tags():
+    style_id = get_all_styles()[0]["id"]
+    male = build_prompt(f"{style_id}:Male", "", "en")["style_text"]
+    female = build_prompt(f"{style_id}:female", "", "en")["style_text"]
+    assert male.startswith("Male vocals, ") and "no Female vocals" in male
+    assert female.startswith("Female vocals, ") and "no Male vocals" in female
+    assert build_prompt(f"{style_id}:duet", "", "en")["style_text"] == build_prompt(style_id, "", "en")["style_text"]
+
+
+def test_match_styles_ranks_the_described_style_first():
+    for style in get_all_styles():
+        description = f"{style['label']} {' '.join(style['instrumentation'])}"
+        matches = match_styles(description, limit=3)
+        assert matches[0][0]["id"] == style["id"]
+        assert [score for _, score in matches] == sorted((score for _, score in matches), reverse=True)
+        assert 0 < matches[0][1] <= 1.0001
+    assert match_styles("zzzz qqqq") == []
+
+
+def test_reload_swaps_valid_registry_and_keeps_current_on_invalid(tmp_path, monkeypatch):
+    path = tmp_path / "registry.json"
+    data = json.loads(registry._REGISTRY_PATH.read_text(encoding="utf-8"))
+    path.write_text(json.dumps(data), encoding="utf-8")
+    monkeypatch.setattr(registry, "_REGISTRY_PATH", path)
+    monkeypatch.setattr(registry, "_INDEX", None)
+    reloaded = []
+    monkeypatch.setattr(registry, "_RELOAD_LISTENERS", [reloaded.append])
+
+    version = registry.get_registry_version()
+    assert registry.reload_registry() is False  # unchanged
+
+    data["styles"][0]["label"] = "Renamed"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    assert registry.reload_registry() is True
+    assert registry.get_registry_version() != version
+    assert get_style_by_id(data["styles"][0]["id"])["label"] == "Renamed"
+    assert [index.version for index in reloaded] == [registry.get_registry_version()]
+
+    data["styles"].append(dict(data["styles"][0]))  # duplicate id
+    path.write_text(json.dumps(data), encoding="utf-8")
+    assert registry.reload_registry() is False
+    assert len(get_all_styles()) == len(data["styles"]) - 1
+
+
+def test_compiled_artifact_is_used_only_for_its_registry_version(tmp_path, monkeypatch):
+    artifact = tmp_path / "registry.pickle"
+    monkeypatch.setattr(registry, "_ARTIFACT_PATH", artifact)
+    raw = registry._REGISTRY_PATH.read_bytes()
+    compiled = registry.compile_registry(raw, artifact)
+
+    loaded = registry._build_index(raw)
+    assert loaded.version == compiled.version
+    assert loaded.style_texts == compiled.style_texts
+    assert loaded.find("coupe-decale")["id"] == "coupe_decale"
+    with pytest.raises(TypeError):
+        loaded.by_id["new"] = {}
+
+    # Edited registry: the stale artifact is ignored
+    data = json.loads(raw)
+    data["styles"] = data["styles"][:2]
+    edited = json.dumps(data).encode()
+    assert len(registry._build_index(edited).styles) == 2
+
+    # Artifact built by different style text / matcher code: ignored
+    monkeypatch.setattr(registry, "_CODE_VERSION", "other-code")
+    assert registry._load_artifact(compiled.version) is None
+    monkeypatch.setattr(registry, "_CODE_VERSION", None)
+    assert registry._load_artifact(compiled.version) is not None
+
+    artifact.write_bytes(b"not a pickle")
+    assert registry._build_index(raw).version == compiled.version
+
+
+def test_build_script_runs_without_app_settings():
+    """Images compile the registry at build time, where no .env or secrets exist."""
+    import os
+    import subprocess
+
+    result = subprocess.run(
+        [sys.executable, str(backend_dir / "scripts" / "build_registry.py")],
+        env={"PATH": os.environ.get("PATH", "")},
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_unknown_category_is_empty_and_bypasses_the_catalog_cache(monkeypatch):
+    import asyncio
+    from app.api.v1 import styles as styles_api
+
+    monkeypatch.setattr(styles_api.catalog_cache, "get", lambda *args: pytest.fail("cache reached"))
+    assert asyncio.run(styles_api.get_styles_by_cat(None, "no-such-category")) == []
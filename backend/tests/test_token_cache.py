@@ -0,0 +1,104 @@
+"""
+Tests for the verified token cache (in-process Redis stand-in, no server).
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app import token_cache as token_cache_module
+from app.token_cache import EXPIRY_MARGIN, VerifiedTokenCache
+
+
+class _FakeRedis:
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.data[key] = value.encode()
+
+
+def _claims(sub="user-1", ttl=3600):
+    return {"sub": sub, "exp": int(time.time()) + ttl}
+
+
+def test_tokens_expire_from_the_cache_before_their_exp():
+    async def scenario():
+        cache = VerifiedTokenCache()
+        await cache.put("fresh", _claims())
+        await cache.put("expiring", _claims(ttl=EXPIRY_MARGIN - 1))
+        assert (await cache.get("fresh"))["sub"] == "user-1"
+        assert await cache.get("expiring") is None
+
+        # Cached while valid, dropped once within the margin of exp
+        await cache.put("soon", _claims(ttl=EXPIRY_MARGIN + 60))
+        digest = cache._digest("soon")
+        exp, claims = cache._entries[digest]
+        cache._entries[digest] = (time.time() + EXPIRY_MARGIN - 1, claims)
+        assert await cache.get("soon") is None
+        assert digest not in cache._entries
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_tokens_are_evicted():
+    async def scenario():
+        cache = VerifiedTokenCache(max_entries=2)
+        await cache.put("a", _claims("a"))
+        await cache.put("b", _claims("b"))
+        assert await cache.get("a") is not None  # "b" is now least recently used
+        await cache.put("c", _claims("c"))
+        assert await cache.get("b") is None
+        assert (await cache.get("a"))["sub"] == "a"
+        assert (await cache.get("c"))["sub"] == "c"
+
+    asyncio.run(scenario())
+
+
+def test_only_claims_with_sub_and_exp_are_cached():
+    async def scenario():
+        cache = VerifiedTokenCache()
+        await cache.put("no-sub", {"exp": int(time.time()) + 3600})
+        await cache.put("no-exp", {"sub": "user-1"})
+        assert await cache.get("no-sub") is None
+        assert await cache.get("no-exp") is None
+
+        claims = _claims()
+        await cache.put("token", claims)
+        claims["sub"] = "mutated"
+        assert (await cache.get("token"))["sub"] == "user-1"
+
+    asyncio.run(scenario())
+
+
+def test_redis_shares_tokens_and_errors_degrade_to_a_miss(monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(token_cache_module, "get_async_redis", lambda: redis)
+
+    async def scenario():
+        await VerifiedTokenCache(use_redis=True).put("raw.jwt.value", _claims())
+        assert not any("raw.jwt.value" in key for key in redis.data)  # stored by hash only
+
+        other_worker = VerifiedTokenCache(use_redis=True)
+        assert (await other_worker.get("raw.jwt.value"))["sub"] == "user-1"
+
+        redis.fail = True
+        cold = VerifiedTokenCache(use_redis=True)
+        assert await cold.get("raw.jwt.value") is None
+        await cold.put("other", _claims())  # write failure is swallowed
+        assert (await cold.get("other"))["sub"] == "user-1"
+
+    asyncio.run(scenario())
@@ -0,0 +1,40 @@
+"""
+Tests for waveform peak extraction and encoding.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.utils.waveform import RESOLUTIONS, compute_peaks, decode_peaks, encode_peaks
+
+
+def test_peaks_are_bucket_min_max_scaled_to_int8():
+    samples = np.zeros(1000, dtype=np.int16)
+    samples[10] = 32767
+    samples[990] = -32768
+    peaks = compute_peaks(samples, 4)
+    assert peaks.dtype == np.int8
+    assert peaks.tolist() == [[0, 127], [0, 0], [0, 0], [-128, 0]]
+    # Fewer samples than buckets, and silence
+    assert compute_peaks(np.array([256, -512], dtype=np.int16), 4).shape == (4, 2)
+    assert not compute_peaks(np.array([], dtype=np.int16), 8).any()
+
+
+def test_blob_round_trip():
+    rng = np.random.default_rng(0)
+    samples = rng.integers(-32768, 32767, 8000 * 3, dtype=np.int16)
+    levels = {buckets: compute_peaks(samples, buckets) for buckets in RESOLUTIONS}
+    blob = encode_peaks(levels, 8000, samples.size)
+    assert len(blob) < 2 * sum(RESOLUTIONS) + 64
+
+    decoded, duration = decode_peaks(blob)
+    assert duration == 3.0
+    assert list(decoded) == list(RESOLUTIONS)
+    for buckets in RESOLUTIONS:
+        assert np.array_equal(decoded[buckets], levels[buckets])
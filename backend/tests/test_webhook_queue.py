@@ -0,0 +1,86 @@
+"""
+Tests for the webhook queue's dead-letter handling (minimal in-memory Redis).
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add backend to path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.utils import webhook_queue
+
+
+class _FakeRedis:
+    """Just the stream commands process_webhook_events uses, for one consumer."""
+
+    def __init__(self):
+        self.keys = {}
+        self.streams = {}
+        self.deliveries = {}
+
+    def delete(self, *keys):
+        for key in keys:
+            self.keys.pop(key, None)
+
+    def xgroup_create(self, *args, **kwargs):
+        pass
+
+    def xadd(self, stream, fields):
+        entries = self.streams.setdefault(stream, [])
+        entry_id = f"{len(entries) + 1}-0"
+        entries.append((entry_id, {k.encode(): v.encode() for k, v in fields.items()}))
+        return entry_id
+
+    def xautoclaim(self, stream, group, consumer, min_idle_time, start_id, count):
+        # Every pending entry counts as idle: each pass redelivers failures
+        pending = [entry for entry in self.streams.get(stream, []) if entry[0] in self.deliveries]
+        for entry_id, _ in pending:
+            self.deliveries[entry_id] += 1
+        return "0-0", pending[:count], []
+
+    def xreadgroup(self, group, consumer, streams, count):
+        [(stream, _)] = streams.items()
+        new = [entry for entry in self.streams.get(stream, []) if entry[0] not in self.deliveries][:count]
+        for entry_id, _ in new:
+            self.deliveries[entry_id] = 1
+        return [(stream, new)] if new else []
+
+    def xpending_range(self, stream, group, min, max, count):
+        return [{"times_delivered": self.deliveries[min]}] if min in self.deliveries else []
+
+    def pipeline(self):
+        return self
+
+    def xack(self, stream, group, *entry_ids):
+        for entry_id in entry_ids:
+            self.deliveries.pop(entry_id, None)
+
+    def xdel(self, stream, *entry_ids):
+        self.streams[stream] = [entry for entry in self.streams[stream] if entry[0] not in entry_ids]
+
+    def execute(self):
+        pass
+
+
+def test_dead_lettered_event_can_be_queued_again(monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(webhook_queue, "get_redis", lambda: redis)
+    monkeypatch.setattr(webhook_queue, "_group_ready", False)
+    monkeypatch.setattr(webhook_queue.settings, "WEBHOOK_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(webhook_queue, "handle_events",
+                        lambda client, events: {entry_id: RuntimeError("db down") for entry_id in events})
+
+    event = {"event": "charge.completed", "data": {"id": 1, "tx_ref": "tx1", "status": "successful"}}
+    key = webhook_queue.dedup_key(event)
+    # What the enqueue script does: mark as seen, then append
+    redis.keys[key] = b"1"
+    redis.xadd(webhook_queue.STREAM_KEY, {"body": json.dumps(event)})
+
+    assert webhook_queue.process_webhook_events(None)["failed"] == 1
+    assert key in redis.keys  # retried deliveries are still deduplicated
+    assert webhook_queue.process_webhook_events(None)["dead"] == 1
+    assert len(redis.streams[webhook_queue.DEAD_LETTER_KEY]) == 1
+    assert key not in redis.keys
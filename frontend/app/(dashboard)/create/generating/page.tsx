@@ -219,6 +219,9 @@ function GeneratingContent() {
         let delay = 3000;
         let consecutiveErrors = 0;
         let timeoutId: NodeJS.Timeout;
+        let progressId: NodeJS.Timeout | undefined;
+        let source: EventSource | null = null;
+        let finished = false;
         const controller = new AbortController();
 
         const getToken = async () => {
@@ -231,6 +234,35 @@ function GeneratingContent() {
             return session.access_token;
         };
 
+        // Apply a job status (poll response or SSE event). Returns true once final.
+        const applyStatus = (data: any): boolean => {
+            if (data.project_id && !projectId) {
+                setProjectId(data.project_id);
+            }
+
+            if (data.video_status === "processing") {
+                setVideoPhase(true);
+                setProgress(92);
+            }
+
+            if (data.status === "completed" && data.video_status !== "processing") {
+                finished = true;
+                setStatus("completed");
+                setProgress(100);
+                setTimeout(() => {
+                    window.location.href = `/projects/${data.project_id}`;
+                }, 1000);
+                return true;
+            }
+            if (data.status === "failed") {
+                finished = true;
+                setStatus("failed");
+                setError(data.error_message || data.error || t("generating.descFailed"));
+                return true;
+            }
+            return false;
+        };
+
         const checkStatus = async () => {
             attempts++;
             if (attempts > maxAttempts) {
@@ -268,33 +300,11 @@ function GeneratingContent() {
                 consecutiveErrors = 0;
                 const data = await response.json();
 
-                if (data.project_id && !projectId) {
-                    setProjectId(data.project_id);
-                }
-
-                if (data.status === "completed") {
-                    const vs = data.video_status;
-                    if (vs === "processing") {
-                        setVideoPhase(true);
-                        setProgress(92);
-                    } else {
-                        setStatus("completed");
-                        setProgress(100);
-                        setTimeout(() => {
-                            window.location.href = `/projects/${data.project_id}`;
-                        }, 1000);
-                        return;
-                    }
-                } else if (data.status === "failed") {
-                    setStatus("failed");
-                    setError(data.error_message || data.error || t("generating.descFailed"));
-                    return;
-                } else {
-                    setProgress((prev) => {
-                        if (prev >= 90) return 90;
-                        return prev + 3;
-                    });
-                }
+                if (applyStatus(data)) return;
+                setProgress((prev) => {
+                    if (prev >= 90) return 90;
+                    return prev + 3;
+                });
             } catch (error: any) {
                 if (error.name === "AbortError") return;
                 consecutiveErrors++;
@@ -310,11 +320,71 @@ function GeneratingContent() {
             timeoutId = setTimeout(checkStatus, delay);
         };
 
-        checkStatus();
+        // Short-lived ticket opening the event stream (tokens never go in URLs)
+        const getStreamTicket = async (): Promise<string | null> => {
+            const token = await getToken();
+            if (!token) return null;
+            try {
+                const response = await fetch(`${API_BASE_URL}/api/v1/events/ticket?job_id=${jobId}`, {
+                    method: "POST",
+                    headers: { Authorization: `Bearer ${token}` },
+                    signal: controller.signal,
+                });
+                if (!response.ok) return null;
+                return (await response.json()).ticket;
+            } catch {
+                return null;
+            }
+        };
+
+        // Prefer the server-sent event stream; fall back to polling if it cannot connect
+        const startStream = async () => {
+            const ticket = typeof EventSource === "undefined" ? null : await getStreamTicket();
+            if (controller.signal.aborted) return;
+            if (!ticket) {
+                checkStatus();
+                return;
+            }
+
+            let connected = false;
+            source = new EventSource(
+                `${API_BASE_URL}/api/v1/events/stream?job_id=${jobId}&ticket=${encodeURIComponent(ticket)}`
+            );
+            clearInterval(progressId);
+            progressId = setInterval(() => {
+                setProgress((prev) => (prev >= 90 ? 90 : prev + 1));
+            }, 3000);
+
+            source.onopen = () => {
+                connected = true;
+            };
+            source.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                if (data.type === "job" && applyStatus(data)) {
+                    source?.close();
+                    clearInterval(progressId);
+                }
+            };
+            source.onerror = () => {
+                if (finished) return;
+                if (!connected) {
+                    source?.close();
+                    clearInterval(progressId);
+                    checkStatus();
+                } else if (source?.readyState === EventSource.CLOSED) {
+                    // The ticket expired before the browser reconnected: get a new one
+                    startStream();
+                }
+            };
+        };
+
+        startStream();
 
         return () => {
             controller.abort();
             clearTimeout(timeoutId);
+            clearInterval(progressId);
+            source?.close();
         };
     }, [jobId]);
 
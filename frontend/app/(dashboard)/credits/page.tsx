@@ -137,48 +137,130 @@ export default function CreditsPage() {
       let attempts = 0;
       const maxAttempts = 24;
       const controller = new AbortController();
-
-      const interval = setInterval(async () => {
-        attempts++;
-        if (attempts > maxAttempts) {
-          clearInterval(interval);
+      let interval: NodeJS.Timeout | undefined;
+      let streamTimeout: NodeJS.Timeout | undefined;
+      let source: EventSource | null = null;
+      let cancelled = false;
+
+      // Returns true once the payment reached a final state
+      const applyStatus = (data: { status: string; message?: string }): boolean => {
+        if (data.status === "successful") {
+          setPaymentStatus("successful");
+          setProcessing(false);
+          return true;
+        }
+        if (data.status === "failed") {
           setPaymentStatus("failed");
-          setError(t("credits.timeoutError"));
+          setError(data.message || "Payment failed");
           setProcessing(false);
+          return true;
+        }
+        return false;
+      };
+
+      const startPolling = () => {
+        interval = setInterval(async () => {
+          attempts++;
+          if (attempts > maxAttempts) {
+            clearInterval(interval);
+            setPaymentStatus("failed");
+            setError(t("credits.timeoutError"));
+            setProcessing(false);
+            return;
+          }
+
+          try {
+            const supabase = createClient();
+            const { data: { session } } = await supabase.auth.getSession();
+
+            const res = await fetch(`${API_BASE}/payments/charge-status/${txRef}`, {
+              headers: session?.access_token
+                ? { Authorization: `Bearer ${session.access_token}` }
+                : {},
+              signal: controller.signal,
+            });
+            const data: ChargeStatusResponse = await res.json();
+
+            if (applyStatus(data)) {
+              clearInterval(interval);
+            }
+          } catch (err: any) {
+            if (err.name !== "AbortError") {
+              console.error("Status check error:", err);
+            }
+          }
+        }, 5000);
+      };
+
+      // Status is pushed over server-sent events; polling is the fallback
+      const startStream = async () => {
+        const supabase = createClient();
+        const { data: { session } } = await supabase.auth.getSession();
+        if (cancelled) return;
+        if (!session?.access_token || typeof EventSource === "undefined") {
+          startPolling();
           return;
         }
 
+        // Short-lived ticket opening the stream (tokens never go in URLs)
+        let ticket: string | null = null;
         try {
-          const supabase = createClient();
-          const { data: { session } } = await supabase.auth.getSession();
-
-          const res = await fetch(`${API_BASE}/payments/charge-status/${txRef}`, {
-            headers: session?.access_token
-              ? { Authorization: `Bearer ${session.access_token}` }
-              : {},
+          const res = await fetch(`${API_BASE}/events/ticket?tx_ref=${txRef}`, {
+            method: "POST",
+            headers: { Authorization: `Bearer ${session.access_token}` },
             signal: controller.signal,
           });
-          const data: ChargeStatusResponse = await res.json();
+          if (res.ok) ticket = (await res.json()).ticket;
+        } catch {
+          ticket = null;
+        }
+        if (cancelled) return;
+        if (!ticket) {
+          startPolling();
+          return;
+        }
 
-          if (data.status === "successful") {
-            setPaymentStatus("successful");
-            setProcessing(false);
-            clearInterval(interval);
-          } else if (data.status === "failed") {
-            setPaymentStatus("failed");
-            setError(data.message || "Payment failed");
-            setProcessing(false);
-            clearInterval(interval);
+        let connected = false;
+        source = new EventSource(
+          `${API_BASE}/events/stream?tx_ref=${txRef}&ticket=${encodeURIComponent(ticket)}`
+        );
+        // The server expires pending Mobile Money charges after 5 minutes
+        streamTimeout ??= setTimeout(() => {
+          source?.close();
+          setPaymentStatus("failed");
+          setError(t("credits.timeoutError"));
+          setProcessing(false);
+        }, 6 * 60 * 1000);
+
+        source.onopen = () => {
+          connected = true;
+        };
+        source.onmessage = (event) => {
+          const data = JSON.parse(event.data);
+          if (data.type === "payment" && applyStatus(data)) {
+            source?.close();
+            clearTimeout(streamTimeout);
           }
-        } catch (err: any) {
-          if (err.name !== "AbortError") {
-            console.error("Status check error:", err);
+        };
+        source.onerror = () => {
+          if (!connected) {
+            source?.close();
+            clearTimeout(streamTimeout);
+            startPolling();
+          } else if (source?.readyState === EventSource.CLOSED && !cancelled) {
+            // The ticket expired before the browser reconnected: get a new one
+            startStream();
           }
-        }
-      }, 5000);
+        };
+      };
+
+      startStream();
 
       return () => {
+        cancelled = true;
         clearInterval(interval);
+        clearTimeout(streamTimeout);
+        source?.close();
         controller.abort();
       };
     }
@@ -25,5 +25,5 @@ export NO_PROXY="*"
 
 # Run the worker for 'music_generation' queue
 # Use SimpleWorker to avoid fork() crashes on macOS
-echo "🚀 Listening for jobs on queue: music_generation..."
-rq worker music_generation --with-scheduler --worker-class rq.worker.SimpleWorker
+echo "🚀 Listening for jobs on queues: music_generation, media_postprocess..."
+rq worker music_generation media_postprocess --with-scheduler --worker-class rq.worker.SimpleWorker